@@ -1,28 +1,42 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-import pandas as pd
 import numpy as np
+import os
+import sys
+
+# Score with the Shamba Score model through its shared inference core
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shamba-score-ai', 'api'))
+from inference_core import FLASK_FIELD_MAP, core_from_env
 
 app = Flask(__name__)
 CORS(app)
 
+core = core_from_env(explain=False)
+
 @app.route('/api/credit-score', methods=['POST'])
 def calculate_credit_score():
     try:
         data = request.json
-        
-        # Mock credit scoring (replace with your Jupyter model)
-        score = np.random.randint(60, 95)
-        loan_eligibility = score * 3000
-        
-        return jsonify({
-            'credit_score': score,
-            'loan_eligibility': loan_eligibility,
-            'risk_level': 'Low' if score > 80 else 'Medium'
-        })
-        
+        records = data if isinstance(data, list) else [data]
+
+        # Fields by model feature name or by Shamba Score API field name
+        scored = core.score_records(records, FLASK_FIELD_MAP)
+        if not scored['ok'].all():
+            invalid = np.flatnonzero(~scored['ok']).tolist()
+            return jsonify({'error': 'Invalid farmer data', 'invalid_rows': invalid}), 400
+
+        results = []
+        for score, category in zip(np.rint(scored['scores']).astype(int).tolist(), scored['categories'].tolist()):
+            results.append({
+                'credit_score': score,
+                'loan_eligibility': score * 3000,
+                'risk_level': category
+            })
+
+        return jsonify(results if isinstance(data, list) else results[0])
+
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    app.run(debug=True, port=5000)
@@ -0,0 +1,330 @@
+"""
+Shamba Score: Prediction Audit Log
+Append-only record of every scoring decision, written off the request path
+"""
+
+import glob
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+# Segment files are audit-<writer start>-<pid>-<sequence>.jsonl, so sorting
+# the names orders segments by writer and then by rotation
+SEGMENT_PATTERN = "audit-*.jsonl"
+
+# Queue-full policies
+BLOCK = "block"
+DROP = "drop"
+
+_STOP = object()
+
+
+def _record_count(item) -> int:
+    """Records in a queue item: a record, a list of records, or the stop marker"""
+    if item is _STOP:
+        return 0
+    return len(item) if isinstance(item, list) else 1
+
+
+def _dumps(record: Dict[str, Any]) -> bytes:
+    return json.dumps(record, separators=(",", ":"), default=str).encode() + b"\n"
+
+
+class AuditLog:
+    """
+    Batched, non-blocking audit writer
+
+    record() only puts the entry on a queue bounded at max_queue records
+    (a record counts until it has been written). A background thread takes
+    whatever has queued up (up to batch_size records), serializes it as
+    JSON lines and appends it to the current segment with one write.
+    Segments rotate at segment_bytes and are fsynced at most every
+    fsync_interval seconds, on rotation and on close.
+
+    When the queue is full, the "block" policy waits up to block_timeout
+    seconds (then drops), "drop" drops immediately; drops are counted.
+    "block" waits on a lock, so callers on an event loop should use "drop".
+
+    The writer thread starts on first use and restarts after a fork, so
+    one AuditLog can be created before serve.py forks its workers. If it
+    dies (e.g. the directory can't be written) the error is kept in
+    last_error, the records it still held are counted as dropped and the
+    next record starts a new writer.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024,
+                 max_queue: int = 10000, batch_size: int = 512, fsync_interval: float = 1.0,
+                 policy: str = BLOCK, block_timeout: Optional[float] = 1.0):
+        if policy not in (BLOCK, DROP):
+            raise ValueError(f"Unknown queue-full policy: {policy}")
+
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.fsync_interval = fsync_interval
+        self.policy = policy
+        self.block_timeout = block_timeout
+
+        self._lock = threading.Lock()
+        self._counter_lock = threading.Lock()
+        self._space = threading.Condition()
+        self._pending = 0
+        self._queue = None
+        self._thread = None
+        self._pid = None
+
+        # Metrics
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.write_errors = 0
+        self.batches = 0
+        self.fsyncs = 0
+        self.segments = 0
+        self.bytes_written = 0
+        self.last_error: Optional[str] = None
+
+    def _ensure_writer(self):
+        """Start the writer thread (again, if this process was forked or it died)"""
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                if self._thread.is_alive():
+                    return
+                # The writer died: what it hadn't written is lost with its queue
+                with self._counter_lock:
+                    self.dropped += self._pending
+            self._pid = os.getpid()
+            self._space = threading.Condition()
+            self._pending = 0
+            self._queue = queue.Queue()
+            self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+            self._thread.start()
+
+    def record(self, entry: Dict[str, Any]) -> bool:
+        """
+        Queue one audit record
+
+        Returns:
+            False if the record was dropped because the queue was full
+        """
+        return self._put(entry, 1)
+
+    def record_many(self, entries: List[Dict[str, Any]]) -> bool:
+        """
+        Queue a list of records (e.g. a scored batch), in chunks of at most
+        batch_size records
+
+        Returns:
+            False if any chunk was dropped because the queue was full
+        """
+        size = max(1, min(self.batch_size, self.max_queue))
+        accepted = True
+        for start in range(0, len(entries), size):
+            chunk = entries[start:start + size]
+            accepted = self._put(chunk, len(chunk)) and accepted
+        return accepted
+
+    def _put(self, item, count: int) -> bool:
+        self._ensure_writer()
+        with self._space:
+            if self._pending + count > self.max_queue and self.policy == BLOCK:
+                self._space.wait_for(lambda: self._pending + count <= self.max_queue, self.block_timeout)
+            if self._pending + count > self.max_queue:
+                with self._counter_lock:
+                    self.dropped += count
+                return False
+            self._pending += count
+            self._queue.put_nowait(item)
+        with self._counter_lock:
+            self.enqueued += count
+        return True
+
+    def _release(self, count: int):
+        """Free queue space for count records once they have been handled"""
+        with self._space:
+            self._pending -= count
+            self._space.notify_all()
+
+    def _open_segment(self, started: str, sequence: int):
+        path = os.path.join(self.directory, f"audit-{started}-{self._pid}-{sequence:06d}.jsonl")
+        self.segments += 1
+        return open(path, "ab")
+
+    def _fsync(self, f):
+        f.flush()
+        os.fsync(f.fileno())
+        self.fsyncs += 1
+
+    def _run(self):
+        try:
+            self._write_batches()
+        except Exception as e:
+            self.last_error = f"Audit writer stopped: {e}"
+
+    def _write_batches(self):
+        os.makedirs(self.directory, exist_ok=True)
+        started = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+        sequence = 0
+        f = self._open_segment(started, sequence)
+        size = 0
+        last_fsync = time.monotonic()
+        unsynced = False
+        stopping = False
+
+        try:
+            while not stopping:
+                try:
+                    items = [self._queue.get(timeout=self.fsync_interval)]
+                except queue.Empty:
+                    # Idle: make sure the tail of the last batch reaches disk
+                    if unsynced:
+                        self._fsync(f)
+                        unsynced = False
+                        last_fsync = time.monotonic()
+                    continue
+                taken = _record_count(items[0])
+                while taken < self.batch_size:
+                    try:
+                        items.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                    taken += _record_count(items[-1])
+
+                chunks = []
+                count = 0
+                for item in items:
+                    if item is _STOP:
+                        stopping = True
+                        continue
+                    for entry in (item if isinstance(item, list) else (item,)):
+                        try:
+                            chunks.append(_dumps(entry))
+                            count += 1
+                        except (TypeError, ValueError) as e:
+                            self.write_errors += 1
+                            self.last_error = f"Unserializable audit record: {e}"
+
+                if chunks:
+                    data = b"".join(chunks)
+                    try:
+                        f.write(data)
+                        f.flush()
+                    except OSError as e:
+                        self.write_errors += count
+                        self.last_error = str(e)
+                        self._release(taken)
+                        continue
+                    size += len(data)
+                    unsynced = True
+                    self.written += count
+                    self.bytes_written += len(data)
+                    self.batches += 1
+                self._release(taken)
+
+                if size >= self.segment_bytes:
+                    self._fsync(f)
+                    f.close()
+                    sequence += 1
+                    f = self._open_segment(started, sequence)
+                    size = 0
+                    unsynced = False
+                    last_fsync = time.monotonic()
+                elif unsynced and (stopping or time.monotonic() - last_fsync >= self.fsync_interval):
+                    self._fsync(f)
+                    unsynced = False
+                    last_fsync = time.monotonic()
+        finally:
+            f.close()
+
+    def close(self, timeout: float = 10.0):
+        """Write out everything queued so far and stop the writer thread"""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directory": self.directory,
+            "policy": self.policy,
+            "queue_depth": self._pending,
+            "max_queue": self.max_queue,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "write_errors": self.write_errors,
+            "batches": self.batches,
+            "fsyncs": self.fsyncs,
+            "segments": self.segments,
+            "bytes_written": self.bytes_written,
+            "last_error": self.last_error
+        }
+
+
+def audit_log_from_env(default_directory: str, policy: Optional[str] = None) -> Optional[AuditLog]:
+    """
+    AuditLog configured from SHAMBA_AUDIT_* environment variables
+
+    SHAMBA_AUDIT_LOG=0 disables auditing (returns None). SHAMBA_AUDIT_LOG_DIR,
+    SHAMBA_AUDIT_SEGMENT_MB, SHAMBA_AUDIT_QUEUE_SIZE, SHAMBA_AUDIT_FSYNC_INTERVAL
+    and SHAMBA_AUDIT_POLICY ("block" or "drop") override the defaults.
+
+    Args:
+        default_directory: Segment directory unless SHAMBA_AUDIT_LOG_DIR is set
+        policy: Queue-full policy to use whatever SHAMBA_AUDIT_POLICY says
+            (async services pass DROP so the event loop never waits)
+    """
+    if os.environ.get("SHAMBA_AUDIT_LOG", "1") != "1":
+        return None
+    return AuditLog(
+        os.environ.get("SHAMBA_AUDIT_LOG_DIR") or default_directory,
+        segment_bytes=int(float(os.environ.get("SHAMBA_AUDIT_SEGMENT_MB", "64")) * 1024 * 1024),
+        max_queue=int(os.environ.get("SHAMBA_AUDIT_QUEUE_SIZE", "10000")),
+        fsync_interval=float(os.environ.get("SHAMBA_AUDIT_FSYNC_INTERVAL", "1.0")),
+        policy=policy or os.environ.get("SHAMBA_AUDIT_POLICY", BLOCK).lower()
+    )
+
+
+def audit_segments(directory: str) -> List[str]:
+    """Segment files in directory, oldest writer first"""
+    return sorted(glob.glob(os.path.join(directory, SEGMENT_PATTERN)))
+
+
+def read_audit_log(directory: str) -> Iterator[Dict[str, Any]]:
+    """
+    Replay every audit record in directory, segment by segment
+
+    A final line cut short by a crash (no trailing newline) is skipped.
+    """
+    for path in audit_segments(directory):
+        with open(path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                yield json.loads(line)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay audit log segments as JSON lines")
+    parser.add_argument('directory', help="Audit log directory")
+    parser.add_argument('--farmer-id', help="Only records for this farmer")
+    args = parser.parse_args(argv)
+
+    for record in read_audit_log(args.directory):
+        if args.farmer_id is None or record.get("farmer_id") == args.farmer_id:
+            print(json.dumps(record))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,144 @@
+"""
+Shamba Score: Micro-batching
+Coalesces concurrent single-farmer predictions into one model call
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Any, Sequence
+
+import numpy as np
+
+# Upper bounds of the batch-size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+
+class MicroBatcher:
+    """
+    Async request coalescer in front of a vectorized async predict function
+
+    Requests queue up while a batch is being scored and are taken together
+    as the next batch, so batches grow with load on their own. A batch only
+    waits (up to max_wait) for more rows when recent batches show
+    concurrent traffic, so a lone request is dispatched immediately.
+    """
+
+    def __init__(self, predict_fn: Callable[[np.ndarray], Awaitable[np.ndarray]],
+                 max_batch_size: int = 64, max_wait: float = 0.002):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        self._loop = None
+        self._queue = None
+        self._worker = None
+        self._lock = threading.Lock()
+
+        # Exponentially weighted average batch size, used to decide whether to wait
+        self._avg_batch_size = 1.0
+
+        # Metrics
+        self.requests = 0
+        self.batches = 0
+        self.max_queue_depth = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.batch_size_counts = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+
+    def _ensure_worker(self):
+        """Start the dispatch task on the running event loop (restarting if the loop changed)"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            # In a fresh context: the task serves every request, not the one that started it
+            self._worker = contextvars.Context().run(loop.create_task, self._run())
+
+    async def submit(self, feature_values: Sequence[float]) -> Any:
+        """Queue one feature row and wait for its row of predict_fn output"""
+        self._ensure_worker()
+        future = self._loop.create_future()
+        self._queue.put_nowait((np.asarray(feature_values, dtype=float), future, time.perf_counter()))
+
+        depth = self._queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+
+        return await future
+
+    async def _collect(self):
+        """Take the next batch from the queue"""
+        batch = [await self._queue.get()]
+        self._drain(batch)
+
+        # Only hold the batch open when traffic is concurrent
+        if len(batch) < self.max_batch_size and self.max_wait > 0 and self._avg_batch_size > 1.5:
+            await asyncio.sleep(self.max_wait)
+            self._drain(batch)
+
+        return batch
+
+    def _drain(self, batch):
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            dispatched = time.perf_counter()
+            self._record(batch, dispatched)
+
+            try:
+                X = np.vstack([row for row, _, _ in batch])
+                outputs = await self.predict_fn(X)
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            # One result per row: a float for score vectors, a list for 2-D outputs
+            for (_, future, _), result in zip(batch, outputs.tolist()):
+                if not future.done():
+                    future.set_result(result)
+
+    def close(self):
+        """Stop the dispatch task (requests already batched have been answered)"""
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+        self._worker = None
+
+    def _record(self, batch, dispatched: float):
+        size = len(batch)
+        self._avg_batch_size = 0.8 * self._avg_batch_size + 0.2 * size
+
+        with self._lock:
+            self.requests += size
+            self.batches += 1
+            for _, _, enqueued in batch:
+                waited = dispatched - enqueued
+                self.wait_time_total += waited
+                if waited > self.wait_time_max:
+                    self.wait_time_max = waited
+            bucket = next((i for i, bound in enumerate(BATCH_SIZE_BUCKETS) if size <= bound),
+                          len(BATCH_SIZE_BUCKETS))
+            self.batch_size_counts[bucket] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, batch-size histogram and added wait time"""
+        with self._lock:
+            labels = [f"le_{bound}" for bound in BATCH_SIZE_BUCKETS] + ["inf"]
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+                "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+                "max_queue_depth": self.max_queue_depth,
+                "requests": self.requests,
+                "batches": self.batches,
+                "mean_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+                "batch_size_histogram": dict(zip(labels, self.batch_size_counts)),
+                "mean_wait_ms": round(self.wait_time_total / self.requests * 1000, 3) if self.requests else 0.0,
+                "max_wait_observed_ms": round(self.wait_time_max * 1000, 3)
+            }
@@ -0,0 +1,231 @@
+"""
+Shamba Score: Bulk Scoring CLI
+Scores CSV/Parquet farmer extracts offline in fixed-size chunks
+
+Usage:
+    python bulk_score.py input.csv output.csv [--chunk-size 50000] [--workers 4]
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from model_loader import MODELS_DIR, load_artifacts as load_model_artifacts
+from utils import (
+    calculate_confidence_scores,
+    calculate_risk_categories,
+    feature_validation_errors,
+    validate_feature_matrix
+)
+
+# Failing row indices kept in score_file's summary
+MAX_REPORTED_INVALID_ROWS = 1000
+
+# Set in each worker process by _init_worker
+_artifacts = None
+
+
+def load_artifacts(models_dir=MODELS_DIR):
+    """Load model, scaler and feature names"""
+    artifacts = load_model_artifacts(models_dir)
+    return artifacts.model, artifacts.scaler, artifacts.feature_names
+
+
+def _file_format(path):
+    """Infer csv/parquet from the file extension"""
+    return 'parquet' if path.lower().endswith(('.parquet', '.pq')) else 'csv'
+
+
+def iter_chunks(path, chunk_size):
+    """Yield DataFrames of at most chunk_size rows without reading the whole file"""
+    if _file_format(path) == 'parquet':
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        # Read as text so IDs and phone numbers pass through unchanged
+        yield from pd.read_csv(path, chunksize=chunk_size, dtype=str)
+
+
+def score_chunk(df, model, scaler, feature_names):
+    """
+    Score one chunk with a single scale+predict pass
+
+    Args:
+        df: Chunk in the farmers_training_data.csv column layout
+        model: Trained model
+        scaler: Fitted scaler
+        feature_names: Model feature order
+
+    Returns:
+        df with predicted score, risk category, loan terms, confidence and
+        validation errors appended. Rows that fail validation (out of range,
+        or a value that isn't a number, which is scored as missing) are
+        still scored; validation_errors lists what failed ("" if valid)
+    """
+    missing = [name for name in feature_names if name not in df.columns]
+    if missing:
+        raise ValueError(f"Missing feature columns: {missing}")
+
+    raw = df[feature_names]
+    X = raw.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+    not_numeric = np.isnan(X) & raw.notna().to_numpy()
+    # The scaler was fitted on named columns; a bare array warns on every chunk
+    scaled = scaler.transform(pd.DataFrame(X, columns=feature_names))
+    scores = np.clip(model.predict(scaled).astype(float), 0, 100).round(1)
+    categories, loan_amounts, interest_rates, approval_probs = calculate_risk_categories(scores)
+
+    error_mask = validate_feature_matrix(X, feature_names)
+    errors = feature_validation_errors(X, feature_names, error_mask)
+    for i, j in zip(*np.nonzero(not_numeric)):
+        errors.setdefault(int(i), {})[feature_names[j]] = f"Not a number: {raw.iat[i, j]!r}"
+    validation_errors = np.full(len(df), "", dtype=object)
+    for i, row_errors in errors.items():
+        validation_errors[i] = "; ".join(f"{name}: {message}" for name, message in row_errors.items())
+
+    return df.assign(
+        predicted_credit_score=scores,
+        risk_category=categories,
+        recommended_loan_amount=loan_amounts,
+        interest_rate=interest_rates,
+        approval_probability=approval_probs,
+        confidence_score=calculate_confidence_scores(X, feature_names).round(2),
+        validation_errors=validation_errors
+    )
+
+
+def _init_worker(models_dir):
+    global _artifacts
+    _artifacts = load_artifacts(models_dir)
+
+
+def _score_in_worker(df):
+    return score_chunk(df, *_artifacts)
+
+
+class ChunkWriter:
+    """Appends scored chunks to a CSV or Parquet file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file_format = _file_format(path)
+        self._parquet_writer = None
+        self._csv_header = True
+        if os.path.exists(path):
+            os.remove(path)
+
+    def write(self, df):
+        if self.file_format == 'parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            self._parquet_writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode='a', header=self._csv_header, index=False)
+            self._csv_header = False
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+def score_file(input_path, output_path, chunk_size=50000, workers=1, models_dir=MODELS_DIR,
+               progress=None):
+    """
+    Score a CSV/Parquet file chunk by chunk
+
+    At most 2 * workers chunks are in memory at once, so files larger than
+    RAM can be scored. Output rows keep the input order.
+
+    Args:
+        input_path: Input CSV/Parquet file
+        output_path: Output CSV/Parquet file (format from extension)
+        chunk_size: Rows per chunk
+        workers: Number of scoring processes (1 = score in this process)
+        models_dir: Directory with the model artifacts
+        progress: Optional callback(rows_done, elapsed_seconds)
+
+    Returns:
+        Dictionary with row count, elapsed time, rows/sec and the number
+        and (first MAX_REPORTED_INVALID_ROWS) positions of rows that failed
+        validation
+    """
+    start = time.perf_counter()
+    rows = 0
+    invalid_rows = 0
+    invalid_row_indices = []
+    writer = ChunkWriter(output_path)
+
+    def done(scored):
+        nonlocal rows, invalid_rows
+        writer.write(scored)
+        invalid = np.flatnonzero(scored['validation_errors'].to_numpy() != "")
+        invalid_rows += len(invalid)
+        room = MAX_REPORTED_INVALID_ROWS - len(invalid_row_indices)
+        if room > 0:
+            invalid_row_indices.extend((invalid[:room] + rows).tolist())
+        rows += len(scored)
+        if progress:
+            progress(rows, time.perf_counter() - start)
+
+    try:
+        if workers <= 1:
+            artifacts = load_artifacts(models_dir)
+            for chunk in iter_chunks(input_path, chunk_size):
+                done(score_chunk(chunk, *artifacts))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(models_dir,)) as pool:
+                pending = deque()
+                for chunk in iter_chunks(input_path, chunk_size):
+                    pending.append(pool.submit(_score_in_worker, chunk))
+                    if len(pending) >= 2 * workers:
+                        done(pending.popleft().result())
+                while pending:
+                    done(pending.popleft().result())
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "rows": rows,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(rows / elapsed, 1) if elapsed > 0 else 0.0,
+        "invalid_rows": invalid_rows,
+        "invalid_row_indices": invalid_row_indices
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a CSV/Parquet file of farmers")
+    parser.add_argument('input', help="Input file (.csv or .parquet)")
+    parser.add_argument('output', help="Output file (.csv or .parquet)")
+    parser.add_argument('--chunk-size', type=int, default=50000, help="Rows per chunk")
+    parser.add_argument('--workers', type=int, default=1, help="Scoring processes")
+    parser.add_argument('--models-dir', default=MODELS_DIR, help="Model artifact directory")
+    args = parser.parse_args(argv)
+
+    def report(rows, elapsed):
+        print(f"\r   Scored {rows:,} rows ({rows / max(elapsed, 1e-9):,.0f} rows/s)", end="", flush=True)
+
+    print(f"Scoring {args.input} -> {args.output}")
+    stats = score_file(args.input, args.output, chunk_size=args.chunk_size,
+                       workers=args.workers, models_dir=args.models_dir, progress=report)
+    print(f"\nDone: {stats['rows']:,} rows in {stats['elapsed_seconds']}s "
+          f"({stats['rows_per_second']:,.0f} rows/s)")
+    if stats['invalid_rows']:
+        print(f"   {stats['invalid_rows']:,} rows failed validation (see the validation_errors column), "
+              f"first at row {stats['invalid_row_indices'][0]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
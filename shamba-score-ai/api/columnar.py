@@ -0,0 +1,150 @@
+"""
+Shamba Score: Columnar Batch Format
+NumPy .npy/.npz request and response bodies for machine-to-machine batch scoring
+
+A request is either an .npy feature matrix (n_rows x n_features, columns
+in feature_names.json order) or an .npz archive holding that matrix as
+"features", or one 1-D array per feature name, plus an optional
+"farmer_id" string array. Uncompressed members are wrapped in place with
+np.frombuffer, so a float64 matrix reaches the model without a copy.
+Responses are .npz archives with one array per output column.
+"""
+
+import io
+import struct
+import zipfile
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+NPY = "application/x-npy"
+NPZ = "application/x-npz"
+
+COLUMNAR_TYPES = (NPY, NPZ)
+
+# Name of the full feature matrix inside an .npz request
+FEATURES_KEY = "features"
+FARMER_ID_KEY = "farmer_id"
+
+Buffer = Union[bytes, memoryview]
+
+
+def media_type(header: Optional[str]) -> str:
+    """Bare media type of a Content-Type header"""
+    return (header or "").split(";")[0].strip().lower()
+
+
+def accepts(accept: Optional[str], media: str) -> bool:
+    """Whether an Accept header explicitly lists media (wildcards don't count)"""
+    return any(media_type(part) == media for part in (accept or "").split(","))
+
+
+def read_npy(buffer: Buffer) -> np.ndarray:
+    """
+    Array view of an .npy buffer, without copying the data
+
+    The result is read-only and shares memory with buffer.
+
+    Raises:
+        ValueError: If the buffer isn't a valid .npy array or holds objects
+    """
+    view = memoryview(buffer)
+    # Only the header goes through a stream: magic, version, header length, header
+    if len(view) < 10 or bytes(view[6:8]) not in (b"\x01\x00", b"\x02\x00", b"\x03\x00"):
+        raise ValueError("Not an .npy array")
+    if view[6] == 1:
+        prefix = 10 + struct.unpack_from("<H", view, 8)[0]
+    else:
+        prefix = 12 + struct.unpack_from("<I", view, 8)[0]
+    stream = io.BytesIO(bytes(view[:prefix]))
+    version = np.lib.format.read_magic(stream)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(stream)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(stream)
+    if dtype.hasobject:
+        raise ValueError("Object arrays are not accepted")
+
+    count = int(np.prod(shape)) if shape else 1
+    if len(view) - prefix < count * dtype.itemsize:
+        raise ValueError("Truncated .npy array")
+    array = np.frombuffer(view, dtype=dtype, count=count, offset=prefix)
+    return array.reshape(shape, order="F" if fortran_order else "C")
+
+
+def read_npz(buffer: Buffer) -> Dict[str, np.ndarray]:
+    """
+    Arrays in an .npz buffer by name (".npy" suffix dropped)
+
+    Stored (uncompressed) members are wrapped in place with read_npy;
+    compressed ones are decompressed.
+
+    Raises:
+        ValueError: If the buffer isn't a valid .npz archive
+    """
+    view = memoryview(buffer)
+    arrays = {}
+    try:
+        with zipfile.ZipFile(io.BytesIO(buffer)) as archive:
+            for info in archive.infolist():
+                name = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+                if info.compress_type == zipfile.ZIP_STORED:
+                    # Local file header: 30 fixed bytes, then the name and extra field
+                    name_length, extra_length = struct.unpack_from("<HH", view, info.header_offset + 26)
+                    start = info.header_offset + 30 + name_length + extra_length
+                    arrays[name] = read_npy(view[start:start + info.file_size])
+                else:
+                    arrays[name] = read_npy(archive.read(info))
+    except (zipfile.BadZipFile, struct.error) as e:
+        raise ValueError(f"Invalid .npz archive: {e}")
+    return arrays
+
+
+def decode_matrix(buffer: Buffer, content_type: str,
+                  feature_names: List[str]) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Feature matrix (and farmer IDs, if given) from a columnar request body
+
+    A float64 matrix is returned as a view of the body; other numeric
+    dtypes are converted once. Per-feature .npz columns are stacked into
+    one matrix.
+
+    Returns:
+        Tuple of (feature matrix in feature_names order, farmer IDs or None)
+
+    Raises:
+        ValueError: If the body is malformed or doesn't match feature_names
+    """
+    farmer_ids = None
+    if content_type == NPY:
+        X = read_npy(buffer)
+    else:
+        arrays = read_npz(buffer)
+        farmer_ids = arrays.get(FARMER_ID_KEY)
+        if FEATURES_KEY in arrays:
+            X = arrays[FEATURES_KEY]
+        else:
+            missing = [name for name in feature_names if name not in arrays]
+            if missing:
+                raise ValueError(f"Missing feature columns: {missing}")
+            columns = [arrays[name] for name in feature_names]
+            if any(column.ndim != 1 or len(column) != len(columns[0]) for column in columns):
+                raise ValueError("Feature columns must be 1-D arrays of equal length")
+            X = np.column_stack(columns)
+
+    if X.ndim != 2 or X.shape[1] != len(feature_names):
+        raise ValueError(f"Feature matrix must have shape (n_rows, {len(feature_names)}), got {X.shape}")
+    if X.dtype.kind not in "fiub":
+        raise ValueError(f"Feature matrix must be numeric, got dtype {X.dtype}")
+    if farmer_ids is not None:
+        if farmer_ids.shape != (len(X),) or farmer_ids.dtype.kind not in "US":
+            raise ValueError(f"{FARMER_ID_KEY} must be a string array with one entry per row")
+        farmer_ids = farmer_ids.astype(str)
+    return np.asarray(X, dtype=np.float64), farmer_ids
+
+
+def encode_npz(columns: Dict[str, np.ndarray]) -> bytes:
+    """Uncompressed .npz archive of the given columns"""
+    out = io.BytesIO()
+    np.savez(out, **columns)
+    return out.getvalue()
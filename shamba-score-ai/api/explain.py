@@ -0,0 +1,298 @@
+"""
+Shamba Score: Model Explanations
+Per-feature SHAP contributions computed from the trained trees
+"""
+
+from math import factorial
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from tree_engine import TreeEnsemble, load_tree_ensemble
+from utils import format_feature_name, get_feature_category
+
+# Leaves whose path uses more distinct features than this fall back to XGBoost
+MAX_TABLE_DEPTH = 10
+
+
+class _LeafGroup:
+    """Leaves whose root-to-leaf path splits on the same number (d) of distinct features"""
+
+    def __init__(self, d: int, features, lo, hi, missing_ok, table, n_features: int):
+        n_leaves = len(features)
+        self.d = d
+        self.n_leaves = n_leaves
+        self.columns = features.ravel()   # feature index per (leaf, path position)
+        self.lo = lo                      # (n_leaves, d) row follows the path if lo <= x < hi
+        self.hi = hi
+        self.missing_ok = missing_ok      # (n_leaves, d) NaN follows the path (default directions)
+        # (n_leaves * 2**d, d) contribution per (leaf, follow-pattern)
+        self.table = table.reshape(n_leaves << d, d)
+        self.table_offset = np.arange(n_leaves, dtype=np.intp) << d
+        self.bits = (1 << np.arange(d)).astype(np.float32)
+        # One-hot (leaf, position) -> feature, so the scatter-add is a matmul
+        self.scatter = np.zeros((n_leaves * d, n_features), dtype=np.float64)
+        self.scatter[np.arange(n_leaves * d), self.columns] = 1.0
+
+
+class TreeShapExplainer:
+    """
+    Exact (path-dependent) TreeSHAP over a TreeEnsemble
+
+    For one leaf, a feature's SHAP value depends on the row only through
+    which of the path's features the row "follows" (falls on the path side
+    of every split on that feature). With d <= max_depth distinct features
+    per path there are only 2**d such patterns, so all contributions are
+    tabulated once per model and explaining a row is comparisons plus
+    table lookups. Values match XGBoost's pred_contribs.
+    """
+
+    def __init__(self, ensemble: TreeEnsemble, feature_names: List[str], chunk_size: int = 32):
+        if ensemble.cover is None:
+            raise ValueError("Tree ensemble has no cover statistics")
+
+        self.feature_names = list(feature_names)
+        self.n_features = len(feature_names)
+        self.chunk_size = chunk_size
+        self.expected_value = float(ensemble.base_score)
+        self.groups: List[_LeafGroup] = []
+
+        paths = {}
+        for root in np.asarray(ensemble.roots).tolist():
+            self.expected_value += self._collect_paths(ensemble, root, paths)
+
+        for d, leaves in sorted(paths.items()):
+            if d == 0:
+                continue
+            if d > MAX_TABLE_DEPTH:
+                raise ValueError(f"Tree paths split on {d} distinct features; too deep to tabulate")
+            features, lo, hi, missing_ok, zero_fraction, value = (
+                np.array(column) for column in zip(*leaves)
+            )
+            table = _shap_table(zero_fraction, value)
+            self.groups.append(_LeafGroup(d, features.astype(np.intp), lo, hi, missing_ok, table,
+                                          self.n_features))
+
+    @staticmethod
+    def _collect_paths(ensemble: TreeEnsemble, root: int, paths: Dict[int, list]) -> float:
+        """
+        Record every leaf of one tree with its per-feature path summary
+
+        Returns:
+            The tree's cover-weighted mean leaf value (its expected output)
+        """
+        feature = ensemble.feature
+        threshold = ensemble.threshold
+        left = ensemble.left
+        right = ensemble.right
+        default_left = ensemble.default_left
+        cover = ensemble.cover
+        root_cover = float(cover[root])
+        expected = 0.0
+
+        # Stack of (node, {feature: [lo, hi, missing_ok, zero_fraction]})
+        stack = [(root, {})]
+        while stack:
+            node, conditions = stack.pop()
+            if left[node] == node:
+                value = float(ensemble.value[node])
+                expected += value * float(cover[node]) / root_cover
+                d = len(conditions)
+                items = sorted(conditions.items())
+                paths.setdefault(d, []).append((
+                    [f for f, _ in items],
+                    [c[0] for _, c in items],
+                    [c[1] for _, c in items],
+                    [c[2] for _, c in items],
+                    [c[3] for _, c in items],
+                    value
+                ))
+                continue
+
+            f = int(feature[node])
+            t = float(threshold[node])
+            for child, goes_left in ((int(left[node]), True), (int(right[node]), False)):
+                lo, hi, missing_ok, zero_fraction = conditions.get(f, (-np.inf, np.inf, True, 1.0))
+                if goes_left:
+                    hi = min(hi, t)
+                else:
+                    lo = max(lo, t)
+                child_conditions = dict(conditions)
+                child_conditions[f] = (
+                    lo, hi,
+                    missing_ok and bool(default_left[node]) == goes_left,
+                    zero_fraction * float(cover[child]) / float(cover[node])
+                )
+                stack.append((child, child_conditions))
+
+        return expected
+
+    def shap_values(self, X) -> np.ndarray:
+        """
+        SHAP contribution of every feature for every row
+
+        Args:
+            X: Raw (unscaled) feature matrix (n_rows x n_features)
+
+        Returns:
+            Array (n_rows x n_features); each row sums to the model output
+            minus expected_value
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        out = np.empty((len(X), self.n_features), dtype=np.float64)
+        for start in range(0, len(X), self.chunk_size):
+            stop = start + self.chunk_size
+            out[start:stop] = self._shap_chunk(X[start:stop])
+        return out
+
+    def _shap_chunk(self, X: np.ndarray) -> np.ndarray:
+        n_rows = len(X)
+        has_missing = np.isnan(X).any()
+        totals = np.zeros((n_rows, self.n_features), dtype=np.float64)
+
+        for group in self.groups:
+            x = X.take(group.columns, axis=1).reshape(n_rows, group.n_leaves, group.d)
+            follows = (x >= group.lo) & (x < group.hi)
+            if has_missing:
+                follows |= np.isnan(x) & group.missing_ok
+            # Pattern index per (row, leaf); a float32 matmul is faster than an integer one
+            pattern = (follows.reshape(-1, group.d).astype(np.float32) @ group.bits).astype(np.intp)
+            pattern = pattern.reshape(n_rows, group.n_leaves) + group.table_offset
+            contrib = group.table.take(pattern, axis=0)                # (rows, leaves, d)
+            totals += contrib.reshape(n_rows, -1) @ group.scatter
+
+        return totals
+
+
+class XGBoostContribExplainer:
+    """Fallback: XGBoost's own pred_contribs on the scaled features"""
+
+    def __init__(self, model, scaler, feature_names: List[str]):
+        self.booster = model.get_booster() if hasattr(model, "get_booster") else model
+        self.scaler = scaler
+        self.feature_names = list(feature_names)
+        self.expected_value = None
+
+    def shap_values(self, X) -> np.ndarray:
+        import xgboost as xgb
+
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        contribs = self.booster.predict(xgb.DMatrix(self.scaler.transform(X)), pred_contribs=True)
+        self.expected_value = float(contribs[0, -1]) if len(contribs) else None
+        return contribs[:, :-1].astype(np.float64)
+
+
+def load_explainer(model, scaler, feature_names: List[str], tree_engine: Optional[TreeEnsemble] = None):
+    """
+    Best available SHAP explainer for a model
+
+    Returns:
+        TreeShapExplainer, or XGBoostContribExplainer if the trees can't be
+        tabulated, or None if there is no model
+    """
+    if model is None:
+        return None
+    try:
+        ensemble = tree_engine if tree_engine is not None and tree_engine.cover is not None \
+            else load_tree_ensemble(model, scaler)
+        return TreeShapExplainer(ensemble, feature_names)
+    except Exception as e:
+        print(f"Falling back to XGBoost pred_contribs for explanations: {e}")
+        return XGBoostContribExplainer(model, scaler, feature_names)
+
+
+def top_contributing_factors(shap_values: np.ndarray, X: np.ndarray, feature_names: List[str],
+                             top_k: int = 3) -> List[List[Dict[str, Any]]]:
+    """
+    Largest contributions (by magnitude) for each row, most important first
+
+    Args:
+        shap_values: SHAP matrix from an explainer (n_rows x n_features)
+        X: Raw feature matrix the values were computed for
+        feature_names: Column names
+        top_k: Factors per row
+
+    Returns:
+        List (one entry per row) of {"factor", "contribution", "category", "raw_value"}
+        where contribution is in credit-score points (negative lowers the score)
+    """
+    shap_values = np.asarray(shap_values)
+    X = np.asarray(X, dtype=float).reshape(len(shap_values), -1)
+    top_k = min(top_k, shap_values.shape[1])
+    if top_k <= 0 or len(shap_values) == 0:
+        return [[] for _ in range(len(shap_values))]
+
+    magnitude = -np.abs(shap_values)
+    if top_k < shap_values.shape[1]:
+        candidates = np.argpartition(magnitude, top_k - 1, axis=1)[:, :top_k]
+    else:
+        candidates = np.broadcast_to(np.arange(top_k), shap_values.shape).copy()
+    order = np.take_along_axis(
+        candidates,
+        np.argsort(np.take_along_axis(magnitude, candidates, axis=1), axis=1, kind="stable"),
+        axis=1
+    )
+
+    values = np.round(np.take_along_axis(shap_values, order, axis=1), 2).tolist()
+    raw = np.take_along_axis(X, order, axis=1).tolist()
+    labels = [(format_feature_name(name), get_feature_category(name)) for name in feature_names]
+
+    return [
+        [
+            {
+                "factor": labels[c][0],
+                "contribution": value,
+                "category": labels[c][1],
+                "raw_value": raw_value
+            }
+            for c, value, raw_value in zip(row_order, row_values, row_raw)
+        ]
+        for row_order, row_values, row_raw in zip(order.tolist(), values, raw)
+    ]
+
+
+def _shap_table(zero_fraction: np.ndarray, value: np.ndarray) -> np.ndarray:
+    """
+    Tabulate path-dependent TreeSHAP contributions for leaves with d path features
+
+    For follow-pattern o (o_j = 1 if the row follows the path on feature j)
+    and zero fractions z (share of training cover that follows the path on
+    j), feature i receives
+
+        v * (o_i - z_i) * sum_{S in O minus i} |S|! (d-|S|-1)! / d! * prod_{j not in S, j != i} z_j
+
+    where O is the set of followed features (subsets with an unfollowed
+    feature contribute nothing).
+
+    Args:
+        zero_fraction: (n_leaves, d)
+        value: (n_leaves,) leaf values
+
+    Returns:
+        (n_leaves, 2**d, d) contributions
+    """
+    n_leaves, d = zero_fraction.shape
+    weights = [factorial(s) * factorial(d - s - 1) / factorial(d) for s in range(d)]
+    table = np.zeros((n_leaves, 1 << d, d), dtype=np.float64)
+
+    for pattern in range(1 << d):
+        follows = [(pattern >> j) & 1 for j in range(d)]
+        for i in range(d):
+            others = [j for j in range(d) if j != i]
+            followed = [j for j in others if follows[j]]
+            total = np.zeros(n_leaves)
+            for mask in range(1 << len(followed)):
+                subset = {followed[k] for k in range(len(followed)) if (mask >> k) & 1}
+                term = np.full(n_leaves, weights[len(subset)])
+                for j in others:
+                    if j not in subset:
+                        term = term * zero_fraction[:, j]
+                total += term
+            table[:, pattern, i] = value * (follows[i] - zero_fraction[:, i]) * total
+
+    return table
@@ -0,0 +1,133 @@
+"""
+Shamba Score: Single-Request Fast Path
+Decodes and validates a /predict body straight into the model's feature
+array, and encodes responses without going back through Pydantic
+
+The checks are compiled once per (schema, feature order) from the Pydantic
+model's own field constraints, so FarmerFeatures stays the one definition
+of what is valid. The fast check only accepts what the model would accept
+unchanged (exact int/float types, in range); anything else returns None
+and the caller falls back to full Pydantic validation, which produces
+the usual 422 errors.
+"""
+
+import json
+import math
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple, Type
+
+import numpy as np
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # stdlib json fallback
+    orjson = None
+
+
+def loads(body: bytes) -> Any:
+    """Decode a JSON body (None if it isn't valid JSON to the fast decoder)"""
+    try:
+        return orjson.loads(body) if orjson is not None else json.loads(body)
+    except ValueError:
+        return None
+
+
+def dumps(obj: Any) -> bytes:
+    """Compact JSON bytes, as FastAPI's JSONResponse renders them"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class FeatureValidator:
+    """
+    Compiled feature checks for one schema and feature order
+
+    Calling the validator on a decoded body returns the features as a new
+    float64 array, or None if the fast check can't vouch for the body.
+    Bounds are checked as lower <= value <= upper; exclusive bounds
+    (gt/lt) additionally reject the bound itself.
+    """
+
+    def __init__(self, checks: List[Tuple[str, tuple, float, bool, float, bool]],
+                 optional_str: Tuple[str, ...]):
+        self.names = [name for name, *_ in checks]
+        self.bounds = [(types, lower, upper) for _, types, lower, _, upper, _ in checks]
+        self.exclusive = [
+            (j, lower if not lower_inclusive else None, upper if not upper_inclusive else None)
+            for j, (_, _, lower, lower_inclusive, upper, upper_inclusive) in enumerate(checks)
+            if not (lower_inclusive and upper_inclusive)
+        ]
+        self.optional_str = optional_str
+
+    def __call__(self, data: Any) -> Optional[np.ndarray]:
+        if type(data) is not dict:
+            return None
+        for name in self.optional_str:
+            value = data.get(name)
+            if value is not None and type(value) is not str:
+                return None
+
+        values = [data.get(name) for name in self.names]
+        for value, (types, lower, upper) in zip(values, self.bounds):
+            if type(value) not in types or not lower <= value <= upper:
+                return None
+        for j, lower, upper in self.exclusive:
+            if values[j] == lower or values[j] == upper:
+                return None
+        try:
+            return np.array(values, dtype=np.float64)
+        except OverflowError:
+            return None
+
+
+@lru_cache(maxsize=8)
+def feature_validator(model: Type[BaseModel], feature_names: Tuple[str, ...]) -> Optional[FeatureValidator]:
+    """
+    Fast validator for model's feature fields, in feature_names order
+
+    Returns None (no fast path) if the model has custom validators or a
+    field type/constraint the fast check doesn't understand.
+    """
+    decorators = model.__pydantic_decorators__
+    if decorators.field_validators or decorators.model_validators or decorators.validators:
+        return None
+
+    fields = model.model_fields
+    checks = []
+    for name in feature_names:
+        field = fields.get(name)
+        if field is None or not field.is_required():
+            return None
+        if field.annotation is float:
+            types = (float, int)
+        elif field.annotation is int:
+            types = (int,)
+        else:
+            return None
+
+        lower, lower_inclusive, upper, upper_inclusive = -math.inf, True, math.inf, True
+        for constraint in field.metadata:
+            kind = type(constraint).__name__
+            if kind == "Ge":
+                lower, lower_inclusive = constraint.ge, True
+            elif kind == "Gt":
+                lower, lower_inclusive = constraint.gt, False
+            elif kind == "Le":
+                upper, upper_inclusive = constraint.le, True
+            elif kind == "Lt":
+                upper, upper_inclusive = constraint.lt, False
+            else:
+                return None
+        checks.append((name, types, lower, lower_inclusive, upper, upper_inclusive))
+
+    # Other fields must be optional strings (e.g. farmer_id)
+    optional_str = []
+    for name, field in fields.items():
+        if name in feature_names:
+            continue
+        if field.is_required() or field.annotation is not Optional[str] or field.metadata:
+            return None
+        optional_str.append(name)
+    return FeatureValidator(checks, tuple(optional_str))
@@ -0,0 +1,32 @@
+"""
+Shamba Score: Feature Definitions
+The model's input features and their order, in one place
+
+train_model.py trains on FEATURE_NAMES and writes them to
+feature_names.json, which the services read back with the artifacts; the
+grouped request schema (schemas.CreditScoreRequest) follows FEATURE_GROUPS.
+"""
+
+from operator import attrgetter
+from typing import Any, Callable, List, Tuple
+
+# Request group -> features, in model column order
+FEATURE_GROUPS = {
+    "satellite": ("mean_ndvi", "ndvi_trend", "growing_season_match"),
+    "financial": ("transaction_velocity", "savings_rate", "loan_repayment_history"),
+    "community": ("cooperative_endorsement", "chama_participation", "neighbor_vouches"),
+    "agricultural": ("fertilizer_purchase_timing", "seed_quality_tier", "advisory_usage"),
+    "climate": ("drought_exposure_index", "rainfall_deviation", "temperature_anomaly")
+}
+
+FEATURE_NAMES = [name for names in FEATURE_GROUPS.values() for name in names]
+
+FEATURE_GROUP = {name: group for group, names in FEATURE_GROUPS.items() for name in names}
+
+
+def grouped_feature_getter(feature_names: List[str]) -> Callable[[Any], Tuple[Any, ...]]:
+    """
+    Function returning a grouped request's features (e.g. request.satellite.mean_ndvi)
+    as a tuple in feature_names order
+    """
+    return attrgetter(*(f"{FEATURE_GROUP[name]}.{name}" for name in feature_names))
@@ -0,0 +1,252 @@
+"""
+Shamba Score: Inference Core
+One loaded model with vectorized scoring, banding and explanations, shared by
+the FastAPI service, the Flask service and ai-services/credit_model.py
+"""
+
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from explain import load_explainer, top_contributing_factors
+from inference_executor import make_predict_fn
+from model_loader import MODELS_DIR, ModelArtifacts, load_artifacts, validate_artifacts
+from tree_engine import load_tree_ensemble
+from utils import calculate_confidence_scores, calculate_risk_categories
+
+# Value types accepted in a feature field (bool scores as 0/1)
+NUMERIC_TYPES = {int, float, bool}
+
+
+class InferenceCore:
+    """
+    A loaded set of artifacts plus everything needed to serve them
+
+    Scoring takes a raw (unscaled) feature matrix in feature_names order
+    and returns 0-100 scores; banding, confidence and SHAP explanations
+    work on the same matrix. records_to_matrix() turns request records
+    (model feature names, or another service's field names via a field
+    map) into that matrix with a per-row validity mask. With metrics (a
+    metrics.ServiceMetrics) the features, scale, predict and explain stages
+    are timed.
+    """
+
+    def __init__(self, artifacts: ModelArtifacts, engine: str = "xgboost", numpy_max_rows: int = 256,
+                 mmap_dir: Optional[str] = None, explain: bool = True, metrics=None):
+        self.artifacts = artifacts
+        self.model = artifacts.model
+        self.scaler = artifacts.scaler
+        self.feature_names = list(artifacts.feature_names)
+        self.version = artifacts.version
+        self.engine = engine
+
+        self.tree_engine = load_tree_ensemble(
+            artifacts.model, artifacts.scaler,
+            mmap_dir=os.path.join(mmap_dir, artifacts.version) if mmap_dir else None
+        ) if engine in ("numpy", "auto") else None
+        self.metrics = metrics
+        self.predict_scores = make_predict_fn(artifacts.model, artifacts.scaler, engine,
+                                              numpy_max_rows, self.tree_engine, metrics=metrics)
+
+        # TreeSHAP contributions from the same trees (tabulated once per model)
+        self.explainer = load_explainer(artifacts.model, artifacts.scaler, self.feature_names,
+                                        self.tree_engine) if explain else None
+
+        # Value used for a feature a record leaves out: the training mean
+        mean = getattr(artifacts.scaler, "mean_", None)
+        self.defaults = np.asarray(mean, dtype=float) if mean is not None \
+            else np.zeros(len(self.feature_names))
+
+    @classmethod
+    def load(cls, models_dir: str = MODELS_DIR, validate: bool = True, **kwargs) -> "InferenceCore":
+        """
+        Load (and by default validate) the artifacts in models_dir
+
+        Raises:
+            FileNotFoundError: If an artifact is missing
+            ValueError: If validation fails
+        """
+        artifacts = load_artifacts(models_dir)
+        if validate:
+            validate_artifacts(artifacts)
+        return cls(artifacts, **kwargs)
+
+    def score(self, X: np.ndarray) -> np.ndarray:
+        """Credit scores (0-100) for a raw feature matrix"""
+        return self.predict_scores(np.asarray(X, dtype=float))
+
+    def band(self, scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Risk category, loan amount, interest rate and approval probability per score"""
+        return calculate_risk_categories(scores)
+
+    def confidence(self, X: np.ndarray) -> np.ndarray:
+        """Confidence (0-1) per row"""
+        return calculate_confidence_scores(X, self.feature_names)
+
+    def shap_values(self, X: np.ndarray) -> np.ndarray:
+        """Per-feature SHAP contributions (score points) per row"""
+        if self.metrics is None:
+            return self.explainer.shap_values(X)
+        start = time.perf_counter()
+        contributions = self.explainer.shap_values(X)
+        self.metrics.stage("explain").observe(time.perf_counter() - start)
+        return contributions
+
+    def explain(self, X: np.ndarray, top_k: int = 3) -> List[List[Dict[str, Any]]]:
+        """Largest contributing factors per row"""
+        X = np.asarray(X, dtype=float)
+        return top_contributing_factors(self.shap_values(X), X, self.feature_names, top_k=top_k)
+
+    def records_to_matrix(self, records: Sequence[Any],
+                          field_map: Optional[Dict[str, Tuple[str, float, float, float]]] = None,
+                          fill_missing: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Feature matrix for a list of request records
+
+        A feature is read from the record by its model name; failing that,
+        from field_map's (field, default, scale, offset) as
+        record.get(field, default) * scale + offset; failing that (or if
+        the value is NaN) it is missing and the training mean is used. A
+        row is invalid if the record isn't a dict or a value it supplies
+        is non-numeric or infinite.
+
+        Args:
+            records: Request records (dicts)
+            field_map: Optional feature name -> (field, default, scale, offset)
+            fill_missing: Fill missing features (False leaves them NaN)
+
+        Returns:
+            Tuple of (feature matrix, per-row valid mask)
+        """
+        start = time.perf_counter()
+        n = len(records)
+        ok = np.ones(n, dtype=bool)
+        if not set(map(type, records)) <= {dict}:
+            ok = np.fromiter((type(r) is dict for r in records), dtype=bool, count=n)
+            records = [r if type(r) is dict else {} for r in records]
+
+        X = np.empty((n, len(self.feature_names)), dtype=float)
+        for j, name in enumerate(self.feature_names):
+            mapped = field_map.get(name) if field_map else None
+            if mapped is None:
+                values = [r.get(name, np.nan) for r in records]
+                native = None
+            else:
+                field, default, _, _ = mapped
+                native = [name in r for r in records]
+                values = [r[name] if own else r.get(field, default) for r, own in zip(records, native)]
+
+            if not set(map(type, values)) <= NUMERIC_TYPES:
+                numeric = np.fromiter((type(v) in NUMERIC_TYPES for v in values), dtype=bool, count=n)
+                ok &= numeric
+                values = [v if good else np.nan for v, good in zip(values, numeric.tolist())]
+
+            with np.errstate(over="ignore", invalid="ignore"):
+                column = np.array(values, dtype=float)
+                if mapped is not None:
+                    _, _, scale, offset = mapped
+                    converted = ~np.array(native, dtype=bool)
+                    column[converted] = column[converted] * scale + offset
+            X[:, j] = column
+
+        # Absent (or NaN) features are missing; infinities are invalid
+        ok &= ~np.isinf(X).any(axis=1)
+        if fill_missing:
+            X = self.fill_missing(X)
+        if self.metrics is not None:
+            self.metrics.stage("features").observe(time.perf_counter() - start)
+        return X, ok
+
+    def fill_missing(self, X: np.ndarray) -> np.ndarray:
+        """Replace NaN (missing) features with the training mean"""
+        missing = np.isnan(X)
+        return np.where(missing, self.defaults, X) if missing.any() else X
+
+    def score_records(self, records: Sequence[Any],
+                      field_map: Optional[Dict[str, Tuple[str, float, float, float]]] = None,
+                      explain: bool = False, top_k: int = 3) -> Dict[str, Any]:
+        """
+        Score, band and optionally explain a list of request records
+
+        Invalid rows are left out of the model call; their outputs are
+        placeholders and ok is False. With a field_map, only the mapped
+        features count as missing for confidence; the rest can't come from
+        such a record and take the training mean.
+
+        Returns:
+            Dictionary with ok, X, scores, confidence, categories,
+            loan_amounts, interest_rates, approval_probabilities and (if
+            explain) top_factors (a list, [] for invalid rows)
+        """
+        X, ok = self.records_to_matrix(records, field_map, fill_missing=False)
+        if field_map:
+            # Features the field map can't supply are filled by design, not missing
+            unmapped = np.array([name not in field_map for name in self.feature_names])
+            X = np.where(np.isnan(X) & unmapped, self.defaults, X)
+        # Confidence is lowered for missing features, so take it before filling
+        confidence = self.confidence(X)
+        X = self.fill_missing(X)
+        scores = np.zeros(len(X))
+        valid = np.flatnonzero(ok)
+        if len(valid):
+            scores[valid] = self.score(X[valid])
+        categories, loan_amounts, interest_rates, approval_probs = self.band(scores)
+
+        result = {
+            "ok": ok,
+            "X": X,
+            "scores": scores,
+            "confidence": confidence,
+            "categories": categories,
+            "loan_amounts": loan_amounts,
+            "interest_rates": interest_rates,
+            "approval_probabilities": approval_probs
+        }
+        if explain:
+            factors = [[] for _ in range(len(X))]
+            if len(valid) and self.explainer is not None:
+                for i, row_factors in zip(valid.tolist(), self.explain(X[valid], top_k=top_k)):
+                    factors[i] = row_factors
+            result["top_factors"] = factors
+        return result
+
+
+# Compatibility layer for the Flask service's request fields and 300-850 scale
+
+# Model feature -> (Flask field, default when absent, scale, offset)
+FLASK_FIELD_MAP = {
+    "mean_ndvi": ("ndvi_current", 0.7, 1.0, 0.0),
+    "growing_season_match": ("crop_health_score", 75, 0.01, 0.0),
+    "savings_rate": ("savings_rate", 0.2, 1.0, 0.0),
+    "loan_repayment_history": ("payment_consistency", 0.8, 1.0, 0.0),
+    "cooperative_endorsement": ("community_trust_score", 70, 0.04, 1.0),
+    "drought_exposure_index": ("drought_risk_score", 30, 0.01, 0.0),
+}
+
+FLASK_SCORE_MIN = 300
+FLASK_SCORE_MAX = 850
+
+
+def to_flask_scale(scores: np.ndarray) -> np.ndarray:
+    """Map 0-100 model scores onto the Flask service's 300-850 scale (rounded)"""
+    scores = np.asarray(scores, dtype=float)
+    scaled = FLASK_SCORE_MIN + scores / 100 * (FLASK_SCORE_MAX - FLASK_SCORE_MIN)
+    return np.rint(scaled).astype(np.int64)
+
+
+def from_flask_scale(credit_scores: np.ndarray) -> np.ndarray:
+    """Inverse of to_flask_scale (0-100)"""
+    credit_scores = np.asarray(credit_scores, dtype=float)
+    return (credit_scores - FLASK_SCORE_MIN) / (FLASK_SCORE_MAX - FLASK_SCORE_MIN) * 100
+
+
+def core_from_env(models_dir: Optional[str] = None, **kwargs) -> InferenceCore:
+    """InferenceCore using the SHAMBA_INFERENCE_ENGINE/SHAMBA_NUMPY_ENGINE_MAX_ROWS settings"""
+    return InferenceCore.load(
+        models_dir or MODELS_DIR,
+        engine=os.environ.get("SHAMBA_INFERENCE_ENGINE", "xgboost").lower(),
+        numpy_max_rows=int(os.environ.get("SHAMBA_NUMPY_ENGINE_MAX_ROWS", "256")),
+        **kwargs
+    )
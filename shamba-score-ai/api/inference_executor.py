@@ -0,0 +1,188 @@
+"""
+Shamba Score: Inference Executor
+Dedicated, core-aware pool that runs model inference off the event loop
+"""
+
+import asyncio
+import contextvars
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Any, Optional
+
+import numpy as np
+
+from model_loader import ModelArtifacts
+from tree_engine import TreeEnsemble, load_tree_ensemble
+
+# Set in each worker process by _init_process_worker
+_process_predict_fn = None
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on (respects affinity/cgroup pinning)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def set_model_threads(model, nthread: int):
+    """Pin XGBoost's per-call thread count"""
+    if model is not None and hasattr(model, "set_params"):
+        model.set_params(n_jobs=nthread)
+
+
+def make_predict_fn(model, scaler, engine: str = "xgboost", numpy_max_rows: int = 256,
+                    tree_engine: Optional[TreeEnsemble] = None, metrics=None) -> Callable[[np.ndarray], np.ndarray]:
+    """
+    Build predict_scores(X) for the configured engine
+
+    Args:
+        model: Trained XGBRegressor
+        scaler: Fitted StandardScaler
+        engine: "xgboost", "numpy" or "auto" (numpy up to numpy_max_rows rows)
+        numpy_max_rows: Largest batch sent to the NumPy engine in auto mode
+        tree_engine: Prebuilt TreeEnsemble (built from model/scaler if omitted)
+        metrics: Optional metrics.ServiceMetrics; the scale and predict stages
+            are timed (the NumPy engine folds scaling into predict)
+
+    Returns:
+        Function mapping a raw (unscaled) feature matrix to scores clipped to 0-100
+    """
+    if engine in ("numpy", "auto") and tree_engine is None:
+        tree_engine = load_tree_ensemble(model, scaler)
+
+    def predict_scores(X: np.ndarray) -> np.ndarray:
+        if tree_engine is not None and (engine == "numpy" or len(X) <= numpy_max_rows):
+            raw_scores = tree_engine.predict(X)
+        else:
+            raw_scores = model.predict(scaler.transform(X))
+        return np.clip(raw_scores.astype(float), 0, 100)
+
+    if metrics is None:
+        return predict_scores
+
+    observe_scale = metrics.stage("scale").observe
+    observe_predict = metrics.stage("predict").observe
+
+    def timed_predict_scores(X: np.ndarray) -> np.ndarray:
+        start = time.perf_counter()
+        if tree_engine is not None and (engine == "numpy" or len(X) <= numpy_max_rows):
+            raw_scores = tree_engine.predict(X)
+        else:
+            scaled = scaler.transform(X)
+            scaled_at = time.perf_counter()
+            observe_scale(scaled_at - start)
+            raw_scores, start = model.predict(scaled), scaled_at
+        scores = np.clip(raw_scores.astype(float), 0, 100)
+        observe_predict(time.perf_counter() - start)
+        return scores
+
+    return timed_predict_scores
+
+
+def _init_process_worker(artifacts: ModelArtifacts, engine: str, numpy_max_rows: int, nthread: int):
+    global _process_predict_fn
+    set_model_threads(artifacts.model, nthread)
+    _process_predict_fn = make_predict_fn(artifacts.model, artifacts.scaler, engine, numpy_max_rows)
+
+
+def _predict_in_process(X: np.ndarray) -> np.ndarray:
+    return _process_predict_fn(X)
+
+
+class InferenceExecutor:
+    """
+    Runs predict_scores on a dedicated pool sized from the CPU count
+
+    Thread backend: workers share the in-process model; each call uses
+    nthread XGBoost threads so workers * nthread never exceeds the cores.
+    Process backend: each worker process gets its own copy of the
+    executor's loaded artifacts (not a fresh read of models_dir, which may
+    have changed since), which sidesteps the GIL for the Python parts of
+    inference.
+    Workers can't record metrics, so with metrics the parent times each
+    call (including the round trip) as the predict stage.
+
+    With propagate_context, thread-backend calls run in a copy of the
+    caller's contextvars context (as asyncio.to_thread does), so stage
+    timers on the pool reach the caller's request profile.
+    """
+
+    def __init__(self, predict_fn: Callable[[np.ndarray], np.ndarray], backend: str = "thread",
+                 workers: Optional[int] = None, nthread: Optional[int] = None,
+                 model=None, artifacts: Optional[ModelArtifacts] = None, engine: str = "xgboost",
+                 numpy_max_rows: int = 256, metrics=None, propagate_context: bool = False):
+        if backend not in ("thread", "process"):
+            raise ValueError(f"Unsupported inference backend: {backend}")
+        if backend == "process" and artifacts is None:
+            raise ValueError("The process backend needs the artifacts to serve")
+
+        cpus = available_cpus()
+        self.backend = backend
+        self.workers = workers or cpus
+        self.nthread = nthread or max(1, cpus // self.workers)
+        self.predict_fn = predict_fn
+        self.propagate_context = propagate_context
+        self._observe_predict = metrics.stage("predict").observe if metrics is not None and backend == "process" \
+            else None
+
+        if backend == "thread":
+            set_model_threads(model, self.nthread)
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        else:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_process_worker,
+                # Workers spawned later (the pool starts them on demand) get these
+                # same artifacts, so they always serve the version this executor reports
+                initargs=(artifacts, engine, numpy_max_rows, self.nthread)
+            )
+
+    def _submit(self, fn: Callable[[np.ndarray], Any], X: np.ndarray):
+        if self.propagate_context:
+            return self._pool.submit(contextvars.copy_context().run, fn, X)
+        return self._pool.submit(fn, X)
+
+    def predict_sync(self, X: np.ndarray) -> np.ndarray:
+        """Blocking predict on the pool"""
+        if self.backend == "thread":
+            return self._submit(self.predict_fn, X).result()
+        start = time.perf_counter()
+        scores = self._pool.submit(_predict_in_process, X).result()
+        if self._observe_predict is not None:
+            self._observe_predict(time.perf_counter() - start)
+        return scores
+
+    async def predict(self, X: np.ndarray) -> np.ndarray:
+        """Predict on the pool without blocking the event loop"""
+        if self.backend == "thread":
+            return await asyncio.wrap_future(self._submit(self.predict_fn, X))
+        start = time.perf_counter()
+        scores = await asyncio.wrap_future(self._pool.submit(_predict_in_process, X))
+        if self._observe_predict is not None:
+            self._observe_predict(time.perf_counter() - start)
+        return scores
+
+    async def run(self, fn: Callable[[np.ndarray], Any], X: np.ndarray) -> Any:
+        """
+        Run another in-process model function (e.g. explanations) off the event loop
+
+        The process backend's workers only hold predict_scores, so there fn
+        runs on the event loop's default thread pool instead.
+        """
+        if self.backend == "thread":
+            return await asyncio.wrap_future(self._submit(fn, X))
+        return await asyncio.to_thread(fn, X)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "workers": self.workers,
+            "nthread_per_call": self.nthread,
+            "cpus": available_cpus()
+        }
@@ -0,0 +1,139 @@
+"""
+Shamba Score: NDJSON Ingest
+Splits a newline-delimited upload into fixed-size chunks of parsed records,
+so an upload of any size is scored chunk by chunk in bounded memory
+
+Results stream back while the upload is still being read, so a client
+has to read the response as it sends (as curl does); one that writes the
+whole body first stalls once the socket buffers fill.
+"""
+
+import json
+import os
+from typing import Any, AsyncIterator, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+# Records parsed, validated and scored per chunk
+INGEST_CHUNK_SIZE = int(os.environ.get("SHAMBA_INGEST_CHUNK_SIZE", "5000"))
+
+# A longer line is reported as an error and skipped rather than buffered
+MAX_LINE_BYTES = int(os.environ.get("SHAMBA_INGEST_MAX_LINE_BYTES", str(64 * 1024)))
+
+# Bytes read from the request body per call
+READ_SIZE = 256 * 1024
+
+NDJSON = "application/x-ndjson"
+
+# (line numbers, raw lines); a raw line is None if it exceeded MAX_LINE_BYTES
+LineChunk = Tuple[List[int], List[Optional[bytes]]]
+
+
+class LineChunker:
+    """
+    Incremental NDJSON line splitter
+
+    feed() takes body bytes as they arrive and returns the chunks of
+    chunk_size non-blank lines completed so far; finish() returns the rest.
+    Only the unfinished tail line is buffered, and it is dropped (and
+    reported as oversized) once it passes max_line_bytes.
+    """
+
+    def __init__(self, chunk_size: int = INGEST_CHUNK_SIZE, max_line_bytes: int = MAX_LINE_BYTES):
+        self.chunk_size = chunk_size
+        self.max_line_bytes = max_line_bytes
+        self.line_no = 0
+        self._tail = b""
+        self._oversized = False
+        self._numbers: List[int] = []
+        self._lines: List[Optional[bytes]] = []
+
+    def _add(self, line: bytes):
+        self.line_no += 1
+        if self._oversized:
+            self._oversized = False
+            self._numbers.append(self.line_no)
+            self._lines.append(None)
+        elif line.strip():
+            self._numbers.append(self.line_no)
+            self._lines.append(line)
+
+    def _take(self, final: bool) -> List[LineChunk]:
+        chunks = []
+        while len(self._lines) >= self.chunk_size or (final and self._lines):
+            chunks.append((self._numbers[:self.chunk_size], self._lines[:self.chunk_size]))
+            del self._numbers[:self.chunk_size], self._lines[:self.chunk_size]
+        return chunks
+
+    def feed(self, data: bytes) -> List[LineChunk]:
+        lines = (self._tail + data).split(b"\n") if self._tail else data.split(b"\n")
+        self._tail = lines.pop()
+        for line in lines:
+            self._add(line)
+        if len(self._tail) > self.max_line_bytes:
+            self._oversized = True
+            self._tail = b""
+        return self._take(final=False)
+
+    def finish(self) -> List[LineChunk]:
+        if self._tail or self._oversized:
+            self._add(self._tail)
+            self._tail = b""
+        return self._take(final=True)
+
+
+def iter_line_chunks(stream: BinaryIO, chunk_size: int = INGEST_CHUNK_SIZE,
+                     max_line_bytes: int = MAX_LINE_BYTES) -> Iterator[LineChunk]:
+    """Line chunks from a file-like request body (e.g. Flask's request.stream)"""
+    chunker = LineChunker(chunk_size, max_line_bytes)
+    while True:
+        data = stream.read(READ_SIZE)
+        if not data:
+            break
+        yield from chunker.feed(data)
+    yield from chunker.finish()
+
+
+async def aiter_line_chunks(body: AsyncIterator[bytes], chunk_size: int = INGEST_CHUNK_SIZE,
+                            max_line_bytes: int = MAX_LINE_BYTES) -> AsyncIterator[LineChunk]:
+    """Line chunks from an async request body (e.g. Starlette's request.stream())"""
+    chunker = LineChunker(chunk_size, max_line_bytes)
+    async for data in body:
+        for chunk in chunker.feed(data):
+            yield chunk
+    for chunk in chunker.finish():
+        yield chunk
+
+
+def parse_lines(lines: List[Optional[bytes]]) -> Tuple[List[Any], Dict[int, str]]:
+    """
+    Parse a chunk of NDJSON lines
+
+    The chunk is parsed as a single JSON array when every line is valid,
+    which is much faster than one json.loads per line; otherwise lines
+    are parsed one by one.
+
+    Returns:
+        Tuple of (records, errors): records has None where a line failed,
+        errors maps those positions to a message
+    """
+    if None not in lines:
+        try:
+            records = json.loads(b"[" + b",".join(lines) + b"]")
+            # A line like `1, 2` would add two elements
+            if len(records) == len(lines):
+                return records, {}
+        except ValueError:
+            pass
+
+    records: List[Any] = []
+    errors: Dict[int, str] = {}
+    for i, line in enumerate(lines):
+        if line is None:
+            records.append(None)
+            errors[i] = f"Line exceeds {MAX_LINE_BYTES} bytes"
+            continue
+        try:
+            records.append(json.loads(line))
+        except ValueError as e:
+            records.append(None)
+            errors[i] = f"Invalid JSON: {e}"
+    return records, errors
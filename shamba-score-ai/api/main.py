@@ -3,34 +3,222 @@ Shamba Score: FastAPI Application
 Provides credit scoring API endpoints
 """
 
-from fastapi import FastAPI, HTTPException
+import time
+
+STARTUP_STARTED = time.perf_counter()
+
+import asyncio
+import hmac
+import json
+from contextlib import asynccontextmanager
+from datetime import datetime
+from fastapi import APIRouter, FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.routing import APIRoute
+from starlette.requests import ClientDisconnect
 from pydantic import BaseModel, Field
-import joblib
 import numpy as np
-import json
-from typing import Dict, List
-import uvicorn
+from typing import Any, Dict, List, Optional, Sequence
 import os
 
-# Load model artifacts
-try:
-    model = joblib.load('../models/shamba_score_model.pkl')
-    scaler = joblib.load('../models/scaler.pkl')
-    with open('../models/feature_names.json', 'r') as f:
-        feature_names = json.load(f)
-    print("Model artifacts loaded successfully")
-except Exception as e:
-    print(f"Error loading model artifacts: {e}")
-    model = None
-    scaler = None
-    feature_names = []
+from audit_log import DROP as AUDIT_DROP, audit_log_from_env
+from batching import MicroBatcher
+from columnar import COLUMNAR_TYPES, NPY, NPZ, accepts, decode_matrix, encode_npz, media_type
+from explain import top_contributing_factors
+from fast_path import dumps as fast_dumps, feature_validator, loads as fast_loads
+from features import FEATURE_GROUPS, grouped_feature_getter
+from ingest import INGEST_CHUNK_SIZE, NDJSON, aiter_line_chunks, parse_lines
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, ASGIRequestMetrics, metrics_from_env
+from model_loader import API_DIR, MODELS_DIR, ModelArtifacts, StartupTimings
+from model_registry import ModelRegistry, ServingModel
+from prediction_cache import PredictionCache, feature_key
+from profiling import INPUT_RECORDS, ASGIRequestProfiler, current_profile, profiler_from_env
+from schemas import BatchScoreRequest, BatchScoreResponse, LatestScoresRequest
+from score_store import score_store_from_env
+from inference_core import InferenceCore
+from inference_executor import InferenceExecutor
+from utils import (
+    calculate_batch_statistics,
+    calculate_confidence_scores,
+    calculate_risk_categories,
+    calculate_risk_category,
+    feature_validation_errors,
+    generate_improvement_suggestions,
+    generate_improvement_suggestions_batch,
+    log_prediction,
+    validate_feature_matrix,
+)
+
+startup_timings = StartupTimings(origin=STARTUP_STARTED)
+startup_timings.mark("imports")
+
+# Inference engine: "xgboost" (XGBRegressor.predict), "numpy" (flattened trees
+# in tree_engine.py) or "auto" (numpy for small batches, xgboost for large ones)
+INFERENCE_ENGINE = os.environ.get("SHAMBA_INFERENCE_ENGINE", "xgboost").lower()
+NUMPY_ENGINE_MAX_ROWS = int(os.environ.get("SHAMBA_NUMPY_ENGINE_MAX_ROWS", "256"))
+
+# SHAMBA_TREE_ENGINE_MMAP_DIR: serve the tree arrays memory-mapped from this
+# directory so pre-forked workers (serve.py) share one physical copy
+TREE_ENGINE_MMAP_DIR = os.environ.get("SHAMBA_TREE_ENGINE_MMAP_DIR")
+
+# Run the /demo profiles through the prediction path before reporting ready
+WARMUP_ENABLED = os.environ.get("SHAMBA_WARMUP", "1") == "1"
+
+# Poll the artifact directory every N seconds and hot-reload on change (0 = off)
+MODEL_WATCH_INTERVAL = float(os.environ.get("SHAMBA_MODEL_WATCH_INTERVAL", "0"))
+
+# Validate and encode /predict without Pydantic when the body allows (see FastPredictRoute)
+FAST_PREDICT = os.environ.get("SHAMBA_FAST_PREDICT", "1") == "1"
+
+# Admin endpoints (/admin/*) require this value in the X-Admin-Token header;
+# they are disabled when it is unset
+ADMIN_TOKEN = os.environ.get("SHAMBA_ADMIN_TOKEN")
+
+# Audit trail of every scoring decision, written by a background thread
+# (SHAMBA_AUDIT_LOG=0 disables it; other SHAMBA_AUDIT_* settings in audit_log.py).
+# Records are queued from the event loop, so a full queue drops rather than blocks
+audit_log = audit_log_from_env(os.path.join(API_DIR, '..', 'audit_logs'), policy=AUDIT_DROP)
+
+# Score history behind /farmers/*/scores (SHAMBA_SCORE_STORE=0 disables it,
+# SHAMBA_SCORE_DB sets the SQLite file). Opened in lifespan, so importing this
+# module doesn't create the database; None until startup
+SCORE_DB_PATH = os.path.join(API_DIR, '..', 'data', 'score_history.sqlite3')
+score_store = None
+
+# Per-stage latency histograms, request counters and batch sizes behind
+# /metrics (SHAMBA_METRICS=0 disables them)
+metrics = metrics_from_env("fastapi")
+
+# Opt-in request profiles and slow-request capture behind /admin/profiles
+# (off unless SHAMBA_PROFILE_* or SHAMBA_SLOW_REQUEST_MS is set, see profiling.py)
+profiler = profiler_from_env()
+if profiler is not None:
+    profiler.attach(metrics)
+
+ready = False
+
+# Cache of /predict responses, keyed by feature vector + model version
+prediction_cache = PredictionCache(
+    max_size=int(os.environ.get("SHAMBA_CACHE_SIZE", "10000")),
+    ttl=float(os.environ.get("SHAMBA_CACHE_TTL", "0")),
+    model_version=""
+)
+
+def build_serving_model(artifacts: ModelArtifacts) -> ServingModel:
+    """
+    Build the inference pipeline for one set of artifacts
+
+    Args:
+        artifacts: Loaded model, scaler and feature names
+
+    Returns:
+        ServingModel with its own executor, explainer and micro-batcher
+    """
+    # Loaded model, scoring function and explainer, shared with the Flask service
+    core = InferenceCore(artifacts, engine=INFERENCE_ENGINE, numpy_max_rows=NUMPY_ENGINE_MAX_ROWS,
+                         mmap_dir=TREE_ENGINE_MMAP_DIR, metrics=metrics)
+    
+    # Dedicated inference pool: SHAMBA_INFERENCE_BACKEND is "thread" or "process";
+    # workers and per-call XGBoost threads default from the CPU count
+    inference_executor = InferenceExecutor(
+        core.predict_scores,
+        backend=os.environ.get("SHAMBA_INFERENCE_BACKEND", "thread"),
+        workers=int(os.environ.get("SHAMBA_INFERENCE_WORKERS", "0")) or None,
+        nthread=int(os.environ.get("SHAMBA_INFERENCE_NTHREAD", "0")) or None,
+        model=artifacts.model,
+        artifacts=artifacts,
+        engine=INFERENCE_ENGINE,
+        numpy_max_rows=NUMPY_ENGINE_MAX_ROWS,
+        metrics=metrics,
+        propagate_context=profiler is not None
+    )
+    
+    serving = ServingModel(core, inference_executor)
+    
+    # Coalesce concurrent /predict calls into one score + explain call
+    if os.environ.get("SHAMBA_MICROBATCH", "1") == "1":
+        serving.micro_batcher = MicroBatcher(
+            serving.predict_and_explain,
+            max_batch_size=int(os.environ.get("SHAMBA_MICROBATCH_MAX_SIZE", "64")),
+            max_wait=float(os.environ.get("SHAMBA_MICROBATCH_MAX_WAIT_MS", "2")) / 1000
+        )
+    
+    return serving
+
+async def warm_up(serving: ServingModel):
+    """Score the /demo profiles singly and as a batch so the first request is warm"""
+    for profile in DEMO_PROFILES.values():
+        await score_farmer(serving, farmer_feature_values(FarmerFeatures(**profile), serving.feature_names))
+    X = np.array([[profile[name] for name in serving.feature_names] for profile in DEMO_PROFILES.values()],
+                 dtype=float)
+    scores = await serving.inference_executor.predict(X)
+    calculate_risk_categories(scores)
+    contributions = await serving.inference_executor.run(serving.explainer.shap_values, X)
+    top_contributing_factors(contributions, X, serving.feature_names, top_k=3)
+    generate_improvement_suggestions_batch(X, serving.feature_names, scores)
+
+def on_model_swap(serving: ServingModel):
+    """Point the prediction cache (and the metrics' info line) at the new version"""
+    prediction_cache.set_model_version(serving.version)
+    if metrics is not None:
+        metrics.info["model_version"] = serving.version
+
+model_registry = ModelRegistry(
+    build_serving_model,
+    models_dir=MODELS_DIR,
+    warm_up=warm_up,
+    on_swap=on_model_swap
+)
+
+def load_model() -> bool:
+    """
+    Load the artifacts and build the inference pipeline (idempotent)
+
+    Called from the startup hook, or earlier by serve.py so that pre-forked
+    workers inherit the loaded model.
+
+    Returns:
+        True if the model is loaded
+    """
+    if model_registry.current is not None:
+        return True
+    with startup_timings.phase("load_artifacts"):
+        return model_registry.load_sync()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global ready, score_store
+    score_store = score_store_from_env(SCORE_DB_PATH)
+    if load_model():
+        if WARMUP_ENABLED:
+            with startup_timings.phase("warm_up"):
+                await warm_up(model_registry.current)
+        ready = True
+    startup_timings.mark("time_to_ready")
+    print(f"Startup timings (ms): {startup_timings.as_dict()}")
+    
+    watcher = asyncio.create_task(model_registry.watch(MODEL_WATCH_INTERVAL)) if MODEL_WATCH_INTERVAL > 0 else None
+    yield
+    if watcher is not None:
+        watcher.cancel()
+    if model_registry.current is not None:
+        model_registry.current.inference_executor.shutdown()
+        # Drop the shut-down model so a later startup in this process reloads
+        model_registry.current = None
+        ready = False
+    if audit_log is not None:
+        audit_log.close()
+    if score_store is not None:
+        score_store.close()
+        score_store = None
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Shamba Score API",
     description="AI-powered credit scoring for smallholder farmers",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Enable CORS
@@ -42,9 +230,74 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency and status counts per route for /metrics
+if metrics is not None:
+    app.add_middleware(ASGIRequestMetrics, metrics=metrics)
+
+# Per-request profiles (X-Shamba-Profile header, sampling) and slow-request capture
+if profiler is not None:
+    app.add_middleware(ASGIRequestProfiler, profiler=profiler)
+
+# Sample farmers served by /demo and used for the warm-up pass
+DEMO_PROFILES = {
+    "excellent_farmer": {
+        "mean_ndvi": 0.85,
+        "ndvi_trend": 0.05,
+        "growing_season_match": 0.92,
+        "transaction_velocity": 55,
+        "savings_rate": 0.45,
+        "loan_repayment_history": 1.0,
+        "cooperative_endorsement": 5,
+        "chama_participation": 1,
+        "neighbor_vouches": 6,
+        "fertilizer_purchase_timing": 0.88,
+        "seed_quality_tier": 3,
+        "advisory_usage": 1,
+        "drought_exposure_index": 0.15,
+        "rainfall_deviation": 5.2,
+        "temperature_anomaly": 1.1
+    },
+    "average_farmer": {
+        "mean_ndvi": 0.65,
+        "ndvi_trend": 0.01,
+        "growing_season_match": 0.75,
+        "transaction_velocity": 35,
+        "savings_rate": 0.25,
+        "loan_repayment_history": 0.5,
+        "cooperative_endorsement": 3,
+        "chama_participation": 1,
+        "neighbor_vouches": 2,
+        "fertilizer_purchase_timing": 0.65,
+        "seed_quality_tier": 2,
+        "advisory_usage": 0,
+        "drought_exposure_index": 0.25,
+        "rainfall_deviation": -8.5,
+        "temperature_anomaly": 2.1
+    },
+    "struggling_farmer": {
+        "mean_ndvi": 0.35,
+        "ndvi_trend": -0.08,
+        "growing_season_match": 0.45,
+        "transaction_velocity": 15,
+        "savings_rate": 0.08,
+        "loan_repayment_history": 0.0,
+        "cooperative_endorsement": 2,
+        "chama_participation": 0,
+        "neighbor_vouches": 0,
+        "fertilizer_purchase_timing": 0.25,
+        "seed_quality_tier": 1,
+        "advisory_usage": 0,
+        "drought_exposure_index": 0.45,
+        "rainfall_deviation": -15.2,
+        "temperature_anomaly": 3.5
+    }
+}
+
 # Request/Response models
 class FarmerFeatures(BaseModel):
     """Input features for credit scoring"""
+    farmer_id: Optional[str] = Field(None, description="Farmer ID; scores with an ID are kept in the score history")
+    
     # Satellite features
     mean_ndvi: float = Field(..., ge=0, le=1, description="Mean NDVI (0-1)")
     ndvi_trend: float = Field(..., ge=-1, le=1, description="NDVI trend")
@@ -77,12 +330,13 @@ class CreditScoreResponse(BaseModel):
     recommended_loan_amount: int
     interest_rate: float
     approval_probability: float
-    top_contributing_factors: List[Dict[str, float]]
+    top_contributing_factors: List[Dict[str, Any]]
     improvement_suggestions: List[str]
+    model_version: Optional[str] = None
 
 # API Endpoints
 @app.get("/")
-def root():
+async def root():
     """Health check endpoint"""
     return {
         "message": "Shamba Score API is running",
@@ -91,180 +345,694 @@ def root():
     }
 
 @app.get("/health")
-def health_check():
+async def health_check():
     """Detailed health check"""
+    serving = model_registry.current
     return {
         "status": "healthy",
-        "model_loaded": model is not None,
-        "scaler_loaded": scaler is not None,
-        "features_count": len(feature_names)
+        "ready": ready,
+        "model_loaded": serving is not None,
+        "scaler_loaded": serving is not None and serving.scaler is not None,
+        "features_count": len(serving.feature_names) if serving is not None else 0,
+        "inference_engine": INFERENCE_ENGINE if serving is not None and serving.tree_engine is not None else "xgboost",
+        "model_version": serving.version if serving is not None else None,
+        "load_error": model_registry.load_error,
+        "startup_timings_ms": startup_timings.as_dict(),
+        "model_registry": model_registry.stats(),
+        "inference_executor": serving.inference_executor.stats() if serving is not None else None,
+        "prediction_cache": prediction_cache.stats(),
+        "micro_batching": serving.micro_batcher.stats() if serving is not None and serving.micro_batcher is not None else None,
+        "audit_log": audit_log.stats() if audit_log is not None else None,
+        "score_store": score_store.stats() if score_store is not None else None
+    }
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 200 once the model is loaded and warmed up, 503 before"""
+    serving = model_registry.current
+    body = {
+        "ready": ready,
+        "model_version": serving.version if serving is not None else None,
+        "load_error": model_registry.load_error,
+        "startup_timings_ms": startup_timings.as_dict()
     }
+    return JSONResponse(status_code=200 if ready else 503, content=body)
 
-@app.post("/predict", response_model=CreditScoreResponse)
-def predict_credit_score(features: FarmerFeatures):
+@app.get("/metrics")
+async def get_metrics():
+    """Per-stage latency histograms, request counters and batch sizes (Prometheus text format)"""
+    if metrics is None:
+        raise HTTPException(status_code=404, detail="Metrics are disabled (SHAMBA_METRICS=0)")
+    return Response(metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+def require_admin(x_admin_token: Optional[str]):
+    """Raise unless admin endpoints are enabled and the X-Admin-Token header matches"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (set SHAMBA_ADMIN_TOKEN)")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+@app.post("/admin/reload")
+async def reload_model(force: bool = False, x_admin_token: Optional[str] = Header(None)):
     """
-    Predict credit score for a farmer
+    Hot-reload the model from the artifact directory
+
+    The new artifacts are validated and warmed before being swapped in;
+    requests already in flight finish on the previous version.
     """
-    if model is None or scaler is None:
-        raise HTTPException(status_code=500, detail="Model not loaded")
+    require_admin(x_admin_token)
     
     try:
-        # Prepare features
-        feature_values = [
-            features.mean_ndvi,
-            features.ndvi_trend,
-            features.growing_season_match,
-            features.transaction_velocity,
-            features.savings_rate,
-            features.loan_repayment_history,
-            features.cooperative_endorsement,
-            features.chama_participation,
-            features.neighbor_vouches,
-            features.fertilizer_purchase_timing,
-            features.seed_quality_tier,
-            features.advisory_usage,
-            features.drought_exposure_index,
-            features.rainfall_deviation,
-            features.temperature_anomaly
-        ]
+        return await model_registry.reload(force=force)
+    except Exception as e:
+        current = model_registry.current
+        raise HTTPException(
+            status_code=422,
+            detail=f"Reload failed, still serving {current.version if current else None}: {e}"
+        )
+
+@app.get("/admin/profiles")
+async def request_profiles(limit: int = 20, x_admin_token: Optional[str] = Header(None)):
+    """
+    Recent profiled requests and slow requests, newest first
+    
+    Each entry has the request's stage timings, its inputs reduced to
+    numeric model features and, if it ran under cProfile, the dump.
+    """
+    require_admin(x_admin_token)
+    if profiler is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Profiling is disabled (set SHAMBA_PROFILE_SAMPLE_RATE, SHAMBA_PROFILE_HEADER "
+                   "or SHAMBA_SLOW_REQUEST_MS)"
+        )
+    return profiler.snapshot(limit=max(limit, 0))
+
+def farmer_feature_values(features: FarmerFeatures, feature_names: List[str]) -> List[float]:
+    """Feature vector in model order"""
+    return [getattr(features, name) for name in feature_names]
+
+def profile_inputs(serving: ServingModel, rows: Sequence[Sequence[float]], n_records: Optional[int] = None):
+    """Keep the request's feature rows on its profile, if it has one"""
+    profile = current_profile()
+    if profile is not None:
+        records = [dict(zip(serving.feature_names, np.asarray(row, dtype=float).tolist())) for row in rows]
+        profile.set_inputs(records, serving.feature_names, n_records=n_records)
+
+async def score_farmer(serving: ServingModel, feature_values: Sequence[float]) -> Dict[str, Any]:
+    """
+    Score one farmer on a pinned model version (uncached)
+    
+    Args:
+        serving: Model version to score with
+        feature_values: Validated features in serving.feature_names order
         
-        # Scale and predict
-        X = np.array([feature_values])
-        X_scaled = scaler.transform(X)
-        score = float(model.predict(X_scaled)[0])
-        score = np.clip(score, 0, 100)
+    Returns:
+        CreditScoreResponse fields (as a dict) tagged with the model version
+    """
+    # Score and explain, coalesced with concurrent requests if micro-batching is on
+    if serving.micro_batcher is not None:
+        # The shared batch's stages aren't this request's, so a profile gets the whole wait
+        profile = current_profile() if profiler is not None else None
+        start = time.perf_counter() if profile is not None else 0.0
+        output = await serving.micro_batcher.submit(feature_values)
+        if profile is not None:
+            profile.add("microbatch", time.perf_counter() - start)
+    else:
+        output = (await serving.predict_and_explain(np.array([feature_values], dtype=float)))[0].tolist()
+    score = output[0]
+    
+    # Risk category and loan terms from the RISK_TIERS table shared with the
+    # batch paths, banded on the reported (rounded) score like they are
+    score = round(score, 1)
+    risk_category, recommended_loan, interest_rate, approval_prob = calculate_risk_category(score)
+    
+    # Per-feature SHAP contributions in score points, largest magnitude first
+    top_factors = top_contributing_factors(
+        np.array([output[1:]]), np.array([feature_values]), serving.feature_names, top_k=3
+    )[0]
+    
+    # Improvement suggestions: the same rules and score-band limits as /predict/batch
+    suggestions = generate_improvement_suggestions(dict(zip(serving.feature_names, feature_values)), score)
+    
+    return {
+        "credit_score": score,
+        "risk_category": risk_category,
+        "recommended_loan_amount": recommended_loan,
+        "interest_rate": interest_rate,
+        "approval_probability": approval_prob,
+        "top_contributing_factors": top_factors,
+        "improvement_suggestions": suggestions,
+        "model_version": serving.version
+    }
+
+async def predict_features(serving: ServingModel, feature_values: Sequence[float],
+                           farmer_id: Optional[str]) -> Dict[str, Any]:
+    """
+    /predict for validated features: cached or freshly scored, then audited and stored
+    
+    Returns:
+        CreditScoreResponse fields (as a dict)
+    """
+    if profiler is not None:
+        profile_inputs(serving, [feature_values])
+    
+    cache_key = feature_key(feature_values, serving.version)
+    response = prediction_cache.get(cache_key)
+    if response is None:
+        response = await score_farmer(serving, feature_values)
+        prediction_cache.put(cache_key, response)
+    
+    if audit_log is not None or (score_store is not None and farmer_id is not None):
+        features = dict(zip(serving.feature_names, np.asarray(feature_values, dtype=float).tolist()))
+        if audit_log is not None:
+            log_prediction(
+                None, features, response["credit_score"],
+                audit_log=audit_log,
+                source="/predict",
+                model_version=serving.version,
+                risk_category=response["risk_category"],
+                recommended_loan_amount=response["recommended_loan_amount"],
+                interest_rate=response["interest_rate"]
+            )
+        if score_store is not None and farmer_id is not None:
+            score_store.add({
+                "farmer_id": farmer_id,
+                "credit_score": response["credit_score"],
+                "risk_category": response["risk_category"],
+                "model_version": serving.version,
+                "source": "/predict",
+                "features": features
+            })
+    return response
+
+class FastPredictRoute(APIRoute):
+    """
+    /predict route that skips Pydantic for bodies the fast check accepts
+    
+    The body is decoded with the fast JSON decoder and validated straight
+    into a float array in feature order by a validator compiled once from
+    FarmerFeatures' constraints (fast_path.py); the response dict is
+    encoded directly, without the response_model round trip. A body the
+    fast check can't vouch for goes to the regular Pydantic handler, so
+    errors and edge cases behave exactly as before.
+    """
+    
+    def get_route_handler(self):
+        validated_handler = super().get_route_handler()
         
-        # Determine risk category
-        if score >= 80:
-            risk_category = "Excellent"
-            recommended_loan = 100000
-            interest_rate = 12.0
-            approval_prob = 0.95
-        elif score >= 60:
-            risk_category = "Good"
-            recommended_loan = 50000
-            interest_rate = 15.0
-            approval_prob = 0.85
-        elif score >= 40:
-            risk_category = "Medium Risk"
-            recommended_loan = 25000
-            interest_rate = 18.0
-            approval_prob = 0.65
+        async def route_handler(request: Request) -> Response:
+            if FAST_PREDICT:
+                with model_registry.use() as serving:
+                    validator = None
+                    if serving is not None:
+                        validator = feature_validator(FarmerFeatures, tuple(serving.feature_names))
+                    body = await request.body()
+                    start = time.perf_counter()
+                    data = fast_loads(body) if validator is not None else None
+                    feature_values = validator(data) if data is not None else None
+                    if feature_values is not None:
+                        if metrics is not None:
+                            metrics.stage("parse").observe(time.perf_counter() - start)
+                        try:
+                            response = await predict_features(serving, feature_values, data.get("farmer_id"))
+                        except Exception as e:
+                            raise HTTPException(status_code=500, detail=str(e))
+                        start = time.perf_counter()
+                        content = fast_dumps(response)
+                        if metrics is not None:
+                            metrics.stage("serialize").observe(time.perf_counter() - start)
+                        return Response(content, media_type="application/json")
+            return await validated_handler(request)
+        
+        return route_handler
+
+predict_router = APIRouter(route_class=FastPredictRoute)
+
+@predict_router.post("/predict", response_model=CreditScoreResponse)
+async def predict_credit_score(features: FarmerFeatures):
+    """
+    Predict credit score for a farmer
+    """
+    with model_registry.use() as serving:
+        if serving is None:
+            raise HTTPException(status_code=500, detail="Model not loaded")
+        
+        try:
+            start = time.perf_counter()
+            feature_values = farmer_feature_values(features, serving.feature_names)
+            if metrics is not None:
+                metrics.stage("features").observe(time.perf_counter() - start)
+            return await predict_features(serving, feature_values, features.farmer_id)
+            
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+app.include_router(predict_router)
+
+async def predict_batch_columnar(request: Request, content_type: str) -> Response:
+    """
+    /predict/batch for a columnar (.npy/.npz) body
+    
+    The feature matrix is wrapped straight from the body and validated
+    with one vectorized range check; the whole batch is rejected (422)
+    if any row is out of range. The response is an .npz archive of
+    output columns if the Accept header asks for application/x-npz,
+    otherwise the same columns as JSON lists.
+    """
+    with model_registry.use() as serving:
+        if serving is None:
+            raise HTTPException(status_code=500, detail="Model not loaded")
+        
+        body = await request.body()
+        start_time = time.perf_counter()
+        try:
+            X, farmer_ids = decode_matrix(body, content_type, serving.feature_names)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if metrics is not None:
+            metrics.stage("parse").observe(time.perf_counter() - start_time)
+            metrics.observe_batch("/predict/batch", len(X))
+        if profiler is not None:
+            profile_inputs(serving, X[:INPUT_RECORDS], n_records=len(X))
+        
+        error_mask = validate_feature_matrix(X, serving.feature_names)
+        invalid = np.flatnonzero(error_mask)
+        if len(invalid):
+            errors = feature_validation_errors(X, serving.feature_names, error_mask, rows=invalid[:20].tolist())
+            raise HTTPException(status_code=422, detail={
+                "invalid_rows": len(invalid),
+                "errors": {str(row): row_errors for row, row_errors in errors.items()}
+            })
+        
+        try:
+            scores = (await serving.inference_executor.predict(X)).round(1) if len(X) else np.zeros(0)
+            categories, loan_amounts, interest_rates, approval_probs = calculate_risk_categories(scores)
+            columns = {
+                "credit_score": scores,
+                "risk_category": categories.astype(str),
+                "confidence_score": calculate_confidence_scores(X, serving.feature_names).round(2),
+                "recommended_loan_amount": loan_amounts,
+                "interest_rate": interest_rates,
+                "approval_probability": approval_probs,
+                "climate_risk_score": (X[:, serving.feature_names.index("drought_exposure_index")] * 100).round(1)
+            }
+            if farmer_ids is not None:
+                columns["farmer_id"] = farmer_ids
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        
+        if (audit_log is not None or score_store is not None) and len(X):
+            timestamp = datetime.now().isoformat()
+            ids = farmer_ids.tolist() if farmer_ids is not None else [None] * len(X)
+            rows = list(zip(ids, scores.tolist(), columns["risk_category"].tolist(),
+                            [dict(zip(serving.feature_names, row)) for row in X.tolist()]))
+            if audit_log is not None:
+                audit_log.record_many([
+                    {
+                        "farmer_id": farmer_id,
+                        "timestamp": timestamp,
+                        "score": score,
+                        "features": features,
+                        "source": "/predict/batch",
+                        "model_version": serving.version,
+                        "risk_category": category
+                    }
+                    for farmer_id, score, category, features in rows
+                ])
+            if score_store is not None and farmer_ids is not None:
+                score_store.add_many([
+                    {
+                        "farmer_id": farmer_id,
+                        "scored_at": timestamp,
+                        "credit_score": score,
+                        "risk_category": category,
+                        "model_version": serving.version,
+                        "source": "/predict/batch",
+                        "features": features
+                    }
+                    for farmer_id, score, category, features in rows
+                ])
+        
+        serialize_start = time.perf_counter()
+        processing_time = round(serialize_start - start_time, 4)
+        if accepts(request.headers.get("accept"), NPZ):
+            response = Response(encode_npz(columns), media_type=NPZ, headers={
+                "X-Model-Version": serving.version,
+                "X-Processing-Time": str(processing_time)
+            })
         else:
-            risk_category = "High Risk"
-            recommended_loan = 10000
-            interest_rate = 22.0
-            approval_prob = 0.40
+            response = JSONResponse({
+                "columns": {name: column.tolist() for name, column in columns.items()},
+                "summary": {k: float(v) for k, v in calculate_batch_statistics(scores.tolist()).items()},
+                "processing_time": processing_time,
+                "model_version": serving.version
+            })
+        if metrics is not None:
+            metrics.stage("serialize").observe(time.perf_counter() - serialize_start)
+        return response
+
+class ColumnarBatchRoute(APIRoute):
+    """
+    Route that sends columnar request bodies to predict_batch_columnar
+    
+    The check runs before FastAPI parses the body, so JSON requests keep
+    the usual Pydantic validation and everything else skips it.
+    """
+    
+    def get_route_handler(self):
+        json_handler = super().get_route_handler()
         
-        # Calculate feature contributions (simplified)
-        contributions = {
-            "Crop Health": features.mean_ndvi * 25,
-            "Savings Rate": features.savings_rate * 20,
-            "Repayment History": features.loan_repayment_history * 20,
-            "Cooperative Rating": features.cooperative_endorsement * 10,
-            "Transaction Activity": (features.transaction_velocity / 60) * 15
-        }
+        async def route_handler(request: Request) -> Response:
+            content_type = media_type(request.headers.get("content-type"))
+            if content_type in COLUMNAR_TYPES:
+                return await predict_batch_columnar(request, content_type)
+            return await json_handler(request)
         
-        top_factors = [
-            {"factor": k, "contribution": round(v, 1)}
-            for k, v in sorted(contributions.items(), key=lambda x: x[1], reverse=True)[:3]
-        ]
+        return route_handler
+
+columnar_router = APIRouter(route_class=ColumnarBatchRoute)
+
+# Documents the columnar bodies alongside the JSON schema
+COLUMNAR_OPENAPI = {
+    "requestBody": {"content": {
+        NPY: {"schema": {"type": "string", "format": "binary",
+                         "description": "Feature matrix (n_rows x 15), columns in /features order"}},
+        NPZ: {"schema": {"type": "string", "format": "binary",
+                         "description": "'features' matrix or one array per feature, optional 'farmer_id'"}}
+    }},
+    "responses": {"200": {"content": {
+        NPZ: {"schema": {"type": "string", "format": "binary", "description": "One array per output column"}}
+    }}}
+}
+
+@columnar_router.post("/predict/batch", response_model=BatchScoreResponse, openapi_extra=COLUMNAR_OPENAPI)
+async def predict_batch(request: BatchScoreRequest):
+    """
+    Predict credit scores for many farmers in a single scale+predict pass
+    
+    JSON by default; an application/x-npy or application/x-npz body is
+    scored column-wise (see predict_batch_columnar).
+    """
+    with model_registry.use() as serving:
+        if serving is None:
+            raise HTTPException(status_code=500, detail="Model not loaded")
         
-        # Improvement suggestions
-        suggestions = []
-        if features.chama_participation == 0:
-            suggestions.append("Join a savings group (chama) to gain +10 points")
-        if features.advisory_usage == 0:
-            suggestions.append("Use agricultural extension services for +3 points")
-        if features.savings_rate < 0.3:
-            suggestions.append("Increase savings rate to 30%+ for +5 points")
-        if features.cooperative_endorsement < 4:
-            suggestions.append("Improve cooperative participation for +7 points")
+        start_time = time.perf_counter()
         
-        return CreditScoreResponse(
-            credit_score=round(score, 1),
-            risk_category=risk_category,
-            recommended_loan_amount=recommended_loan,
-            interest_rate=interest_rate,
-            approval_probability=approval_prob,
-            top_contributing_factors=top_factors,
-            improvement_suggestions=suggestions
-        )
+        if not request.farmers:
+            return BatchScoreResponse(results=[], summary={}, processing_time=0.0, model_version=serving.version)
         
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        try:
+            # Stack all farmers into one (n x 15) matrix
+            features_of = grouped_feature_getter(serving.feature_names)
+            X = np.array([features_of(f) for f in request.farmers], dtype=float)
+            if metrics is not None:
+                metrics.stage("features").observe(time.perf_counter() - start_time)
+                metrics.observe_batch("/predict/batch", len(X))
+            if profiler is not None:
+                profile_inputs(serving, X[:INPUT_RECORDS], n_records=len(X))
+            
+            # Scale and predict
+            scores = (await serving.inference_executor.predict(X)).round(1)
+            
+            # Banding, confidence and explanations for the whole array
+            categories, loan_amounts, interest_rates, approval_probs = calculate_risk_categories(scores)
+            confidence = calculate_confidence_scores(X, serving.feature_names)
+            
+            if request.include_explanations:
+                contributions = await serving.inference_executor.run(serving.core.shap_values, X)
+                factors = top_contributing_factors(contributions, X, serving.feature_names, top_k=3)
+                suggestions = generate_improvement_suggestions_batch(X, serving.feature_names, scores)
+            else:
+                factors = suggestions = [[] for _ in range(len(X))]
+            
+            # The XGBoost model does not separate climate risk, so report exposure directly
+            climate_risk = (X[:, serving.feature_names.index("drought_exposure_index")] * 100).round(1)
+            
+            results = [
+                {
+                    "credit_score": float(scores[i]),
+                    "risk_category": categories[i],
+                    "confidence_score": round(float(confidence[i]), 2),
+                    "recommended_loan_amount": int(loan_amounts[i]),
+                    "interest_rate": float(interest_rates[i]),
+                    "approval_probability": float(approval_probs[i]),
+                    "top_contributing_factors": factors[i],
+                    "improvement_suggestions": suggestions[i],
+                    "climate_risk_score": float(climate_risk[i])
+                }
+                for i in range(len(X))
+            ]
+            
+            summary = {k: float(v) for k, v in calculate_batch_statistics(scores.tolist()).items()}
+            
+            if audit_log is not None:
+                timestamp = datetime.now().isoformat()
+                audit_log.record_many([
+                    {
+                        "farmer_id": f.farmer_profile.farmer_id if f.farmer_profile is not None else None,
+                        "timestamp": timestamp,
+                        "score": result["credit_score"],
+                        "features": dict(zip(serving.feature_names, row)),
+                        "source": "/predict/batch",
+                        "model_version": serving.version,
+                        "risk_category": result["risk_category"],
+                        "recommended_loan_amount": result["recommended_loan_amount"],
+                        "interest_rate": result["interest_rate"]
+                    }
+                    for f, row, result in zip(request.farmers, X.tolist(), results)
+                ])
+            if score_store is not None:
+                scored_at = datetime.now().isoformat()
+                score_store.add_many([
+                    {
+                        "farmer_id": f.farmer_profile.farmer_id,
+                        "scored_at": scored_at,
+                        "credit_score": result["credit_score"],
+                        "risk_category": result["risk_category"],
+                        "model_version": serving.version,
+                        "source": "/predict/batch",
+                        "features": dict(zip(serving.feature_names, row))
+                    }
+                    for f, row, result in zip(request.farmers, X.tolist(), results)
+                    if f.farmer_profile is not None
+                ])
+            
+            return {
+                "results": results,
+                "summary": summary,
+                "processing_time": round(time.perf_counter() - start_time, 4),
+                "model_version": serving.version
+            }
+            
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+app.include_router(columnar_router)
+
+def prepare_ingest_chunk(serving: ServingModel, lines: List[Optional[bytes]]):
+    """
+    Parse and validate one chunk of /predict/ingest lines
+    
+    Returns:
+        Tuple of (records, feature matrix, valid mask, per-row error
+        messages for the invalid rows)
+    """
+    start = time.perf_counter()
+    records, errors = parse_lines(lines)
+    if metrics is not None:
+        metrics.stage("parse").observe(time.perf_counter() - start)
+        metrics.observe_batch("/predict/ingest", len(records))
+    X, ok = serving.core.records_to_matrix(records, fill_missing=False)
+    missing = np.isnan(X)
+    range_mask = validate_feature_matrix(X, serving.feature_names)
+    valid = ok & ~missing.any(axis=1) & (range_mask == 0)
+    
+    invalid = np.flatnonzero(~valid).tolist()
+    range_errors = feature_validation_errors(X, serving.feature_names, range_mask, rows=invalid)
+    for i in invalid:
+        if i in errors:
+            continue
+        if type(records[i]) is not dict:
+            errors[i] = "Record must be an object"
+        elif missing[i].any() and ok[i]:
+            errors[i] = "Missing fields: " + ", ".join(
+                name for name, absent in zip(serving.feature_names, missing[i].tolist()) if absent
+            )
+        elif not ok[i]:
+            errors[i] = "Feature values must be finite numbers"
+        else:
+            errors[i] = "; ".join(f"{name}: {message}" for name, message in range_errors[i].items())
+    return records, X, valid, errors
+
+def format_ingest_chunk(serving: ServingModel, numbers: List[int], records: List[Any], X: np.ndarray,
+                        valid: np.ndarray, errors: Dict[int, str], scores: np.ndarray) -> str:
+    """
+    NDJSON result lines for one scored chunk, in upload order
+    
+    Also queues the successful rows to the audit log and score history.
+    """
+    rows = np.flatnonzero(valid)
+    categories, loan_amounts, interest_rates, approval_probs = calculate_risk_categories(scores)
+    confidence = calculate_confidence_scores(X[rows], serving.feature_names).round(2)
+    scored = zip(rows.tolist(), scores.tolist(), categories.tolist(), confidence.tolist(),
+                 loan_amounts.tolist(), interest_rates.tolist(), approval_probs.tolist())
+    
+    results: List[Optional[Dict[str, Any]]] = [None] * len(records)
+    for i, score, category, conf, loan, rate, prob in scored:
+        farmer_id = records[i].get("farmer_id")
+        results[i] = {
+            "line": numbers[i],
+            "farmer_id": farmer_id if isinstance(farmer_id, str) else None,
+            "credit_score": score,
+            "risk_category": category,
+            "confidence_score": conf,
+            "recommended_loan_amount": int(loan),
+            "interest_rate": rate,
+            "approval_probability": prob,
+            "status": "success"
+        }
+    for i, error in errors.items():
+        farmer_id = records[i].get("farmer_id") if type(records[i]) is dict else None
+        results[i] = {
+            "line": numbers[i],
+            "farmer_id": farmer_id if isinstance(farmer_id, str) else None,
+            "status": "failed",
+            "error": error
+        }
+    
+    if len(rows) and (audit_log is not None or score_store is not None):
+        timestamp = datetime.now().isoformat()
+        features = [dict(zip(serving.feature_names, row)) for row in X[rows].tolist()]
+        succeeded = [results[i] for i in rows.tolist()]
+        if audit_log is not None:
+            audit_log.record_many([
+                {
+                    "farmer_id": result["farmer_id"],
+                    "timestamp": timestamp,
+                    "score": result["credit_score"],
+                    "features": row_features,
+                    "source": "/predict/ingest",
+                    "model_version": serving.version,
+                    "risk_category": result["risk_category"],
+                    "recommended_loan_amount": result["recommended_loan_amount"],
+                    "interest_rate": result["interest_rate"]
+                }
+                for result, row_features in zip(succeeded, features)
+            ])
+        if score_store is not None:
+            score_store.add_many([
+                {
+                    "farmer_id": result["farmer_id"],
+                    "scored_at": timestamp,
+                    "credit_score": result["credit_score"],
+                    "risk_category": result["risk_category"],
+                    "model_version": serving.version,
+                    "source": "/predict/ingest",
+                    "features": row_features
+                }
+                for result, row_features in zip(succeeded, features)
+                if result["farmer_id"] is not None
+            ])
+    
+    start = time.perf_counter()
+    content = "".join(json.dumps(result) + "\n" for result in results)
+    if metrics is not None:
+        metrics.stage("serialize").observe(time.perf_counter() - start)
+    return content
+
+class IngestResponse(StreamingResponse):
+    """
+    StreamingResponse whose body generator is still reading the request
+    
+    StreamingResponse polls receive() for a disconnect while it streams
+    (on ASGI servers older than spec 2.4), which would take request body
+    messages away from the generator, so this one only sends.
+    """
+    
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+
+async def stream_ingest_results(request: Request):
+    """Score the upload chunk by chunk, yielding each chunk's results as soon as it is scored"""
+    start_time = time.perf_counter()
+    total = successful = 0
+    with model_registry.use() as serving:
+        if serving is None:
+            yield json.dumps({"error": "Model not loaded"}) + "\n"
+            return
+        async for numbers, lines in aiter_line_chunks(request.stream(), INGEST_CHUNK_SIZE):
+            records, X, valid, errors = await asyncio.to_thread(prepare_ingest_chunk, serving, lines)
+            scores = np.zeros(0)
+            if valid.any():
+                scores = (await serving.inference_executor.predict(X[valid])).round(1)
+            yield await asyncio.to_thread(
+                format_ingest_chunk, serving, numbers, records, X, valid, errors, scores
+            )
+            total += len(records)
+            successful += len(scores)
+    
+    yield json.dumps({"summary": {
+        "total_records": total,
+        "successful_scores": successful,
+        "failed_scores": total - successful,
+        "processing_time": round(time.perf_counter() - start_time, 4),
+        "model_version": serving.version
+    }}) + "\n"
+
+@app.post("/predict/ingest")
+async def predict_ingest(request: Request):
+    """
+    Score an NDJSON upload of farmer records as it arrives
+    
+    Each line is a /predict record (the 15 features, optionally farmer_id).
+    The body is parsed, validated and scored INGEST_CHUNK_SIZE lines at a
+    time and the results stream back as NDJSON: one line per record in
+    upload order (with its line number; invalid records get status
+    "failed" and an error), then a {"summary": {...}} line. Only one chunk
+    is held in memory, whatever the upload size.
+    """
+    if model_registry.current is None:
+        raise HTTPException(status_code=500, detail="Model not loaded")
+    return IngestResponse(stream_ingest_results(request), media_type=NDJSON)
+
+@app.get("/farmers/{farmer_id}/scores")
+async def get_score_history(farmer_id: str, limit: int = 100, since: Optional[str] = None):
+    """A farmer's score history, newest first (since: ISO timestamp)"""
+    if score_store is None:
+        raise HTTPException(status_code=404, detail="Score history is disabled (SHAMBA_SCORE_STORE=0)")
+    limit = max(1, min(limit, 1000))
+    scores = await asyncio.to_thread(score_store.history, farmer_id, limit, since)
+    return {"farmer_id": farmer_id, "count": len(scores), "scores": scores}
+
+@app.post("/farmers/scores/latest")
+async def get_latest_scores(request: LatestScoresRequest):
+    """Latest score for each of a list of farmers (null if never scored)"""
+    if score_store is None:
+        raise HTTPException(status_code=404, detail="Score history is disabled (SHAMBA_SCORE_STORE=0)")
+    latest = await asyncio.to_thread(score_store.latest, request.farmer_ids)
+    return {"count": sum(score is not None for score in latest.values()), "scores": latest}
 
 @app.get("/features")
-def get_feature_info():
+async def get_feature_info():
     """Get information about required features"""
+    serving = model_registry.current
+    feature_names = serving.feature_names if serving is not None else []
     return {
         "features": feature_names,
         "feature_count": len(feature_names),
-        "categories": {
-            "satellite": ["mean_ndvi", "ndvi_trend", "growing_season_match"],
-            "financial": ["transaction_velocity", "savings_rate", "loan_repayment_history"],
-            "community": ["cooperative_endorsement", "chama_participation", "neighbor_vouches"],
-            "agricultural": ["fertilizer_purchase_timing", "seed_quality_tier", "advisory_usage"],
-            "climate": ["drought_exposure_index", "rainfall_deviation", "temperature_anomaly"]
-        }
+        "categories": {group: list(names) for group, names in FEATURE_GROUPS.items()}
     }
 
 @app.get("/demo")
-def get_demo_data():
+async def get_demo_data():
     """Get demo farmer data for testing"""
-    return {
-        "excellent_farmer": {
-            "mean_ndvi": 0.85,
-            "ndvi_trend": 0.05,
-            "growing_season_match": 0.92,
-            "transaction_velocity": 55,
-            "savings_rate": 0.45,
-            "loan_repayment_history": 1.0,
-            "cooperative_endorsement": 5,
-            "chama_participation": 1,
-            "neighbor_vouches": 6,
-            "fertilizer_purchase_timing": 0.88,
-            "seed_quality_tier": 3,
-            "advisory_usage": 1,
-            "drought_exposure_index": 0.15,
-            "rainfall_deviation": 5.2,
-            "temperature_anomaly": 1.1
-        },
-        "average_farmer": {
-            "mean_ndvi": 0.65,
-            "ndvi_trend": 0.01,
-            "growing_season_match": 0.75,
-            "transaction_velocity": 35,
-            "savings_rate": 0.25,
-            "loan_repayment_history": 0.5,
-            "cooperative_endorsement": 3,
-            "chama_participation": 1,
-            "neighbor_vouches": 2,
-            "fertilizer_purchase_timing": 0.65,
-            "seed_quality_tier": 2,
-            "advisory_usage": 0,
-            "drought_exposure_index": 0.25,
-            "rainfall_deviation": -8.5,
-            "temperature_anomaly": 2.1
-        },
-        "struggling_farmer": {
-            "mean_ndvi": 0.35,
-            "ndvi_trend": -0.08,
-            "growing_season_match": 0.45,
-            "transaction_velocity": 15,
-            "savings_rate": 0.08,
-            "loan_repayment_history": 0.0,
-            "cooperative_endorsement": 2,
-            "chama_participation": 0,
-            "neighbor_vouches": 0,
-            "fertilizer_purchase_timing": 0.25,
-            "seed_quality_tier": 1,
-            "advisory_usage": 0,
-            "drought_exposure_index": 0.45,
-            "rainfall_deviation": -15.2,
-            "temperature_anomaly": 3.5
-        }
-    }
+    return DEMO_PROFILES
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,248 @@
+"""
+Shamba Score: Service Metrics
+Per-stage latency histograms, request counters and batch-size
+distributions, rendered in the Prometheus text format for /metrics
+
+Recording is lock-free: every thread observes into its own shard of each
+histogram (a plain list, reached through a threading.local), so an
+observation is a bisect and two list updates with no lock and no lost
+counts. A scrape sums the shards. When a thread exits its shard is folded
+into the retired totals, so servers that start a thread per request
+don't accumulate shards.
+
+Configured with environment variables:
+    SHAMBA_METRICS=0   Turn metrics (and /metrics) off
+"""
+
+import os
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Scoring stages timed by the services
+STAGES = ("parse", "features", "scale", "predict", "explain", "serialize")
+
+# Seconds; Prometheus buckets are upper bounds (value <= le)
+LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Farmers per request (or per ingest chunk)
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000)
+
+
+class _ThreadToken:
+    """Lives in one thread's local storage; its finalizer retires that thread's shard"""
+
+
+class Histogram:
+    """
+    Bucketed distribution of observed values, sharded per thread
+
+    A shard is [count per bucket..., count above the last bucket, sum].
+    """
+
+    def __init__(self, buckets: Sequence[float]):
+        self.bounds = tuple(buckets)
+        self._width = len(self.bounds) + 2
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards: List[List[float]] = []
+        self._retired = [0] * self._width
+
+    def _new_shard(self) -> List[float]:
+        shard = [0] * self._width
+        token = _ThreadToken()
+        weakref.finalize(token, self._retire, shard).atexit = False
+        with self._lock:
+            self._shards.append(shard)
+        self._local.shard = shard
+        self._local.token = token
+        return shard
+
+    def _retire(self, shard: List[float]):
+        with self._lock:
+            for i, value in enumerate(shard):
+                self._retired[i] += value
+            self._shards.remove(shard)
+
+    def observe(self, value: float):
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        shard[bisect_left(self.bounds, value)] += 1
+        shard[-1] += value
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        """(count per bucket including the overflow bucket, sum of observations)"""
+        with self._lock:
+            totals = list(self._retired)
+            for shard in self._shards:
+                for i, value in enumerate(shard):
+                    totals[i] += value
+        return totals[:-1], totals[-1]
+
+
+class HistogramFamily:
+    """Histograms of one metric, one per label combination"""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...], buckets: Sequence[float]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._children: Dict[Tuple[str, ...], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values) -> Histogram:
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, Histogram(self.buckets))
+        return child
+
+    def children(self) -> List[Tuple[Tuple[str, ...], Histogram]]:
+        with self._lock:
+            return sorted(self._children.items())
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+class ServiceMetrics:
+    """
+    Metrics for one service process
+
+    stage_seconds: shamba_stage_duration_seconds{stage}
+    request_seconds: shamba_request_duration_seconds{endpoint,status}, whose
+        counts are also exported as shamba_requests_total{endpoint,status}
+    batch_sizes: shamba_batch_size{endpoint}
+    """
+
+    def __init__(self, service: str):
+        self.service = service
+        self.stage_seconds = HistogramFamily(
+            "shamba_stage_duration_seconds", "Time spent in each scoring stage", ("stage",), LATENCY_BUCKETS)
+        self.request_seconds = HistogramFamily(
+            "shamba_request_duration_seconds", "Request latency by endpoint and status",
+            ("endpoint", "status"), LATENCY_BUCKETS)
+        self.batch_sizes = HistogramFamily(
+            "shamba_batch_size", "Farmers scored per batch request or ingest chunk", ("endpoint",),
+            BATCH_SIZE_BUCKETS)
+        self._stages = {stage: self.stage_seconds.labels(stage) for stage in STAGES}
+        self.info: Dict[str, str] = {}
+
+    def stage(self, name: str) -> Histogram:
+        """Histogram for a stage (bind .observe once on hot paths)"""
+        return self._stages.get(name) or self.stage_seconds.labels(name)
+
+    def wrap_stages(self, wrap: Callable[[str, Histogram], Any]):
+        """
+        Route the stage timers through wrap(stage, histogram), whose observe
+        must record into the histogram (e.g. profiling.ProfiledStage)
+
+        Only affects timers bound afterwards.
+        """
+        self._stages = {stage: wrap(stage, histogram) for stage, histogram in self._stages.items()}
+
+    def observe_request(self, endpoint: str, status: int, seconds: float):
+        self.request_seconds.labels(endpoint, status).observe(seconds)
+
+    def observe_batch(self, endpoint: str, size: int):
+        self.batch_sizes.labels(endpoint).observe(size)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (0.0.4)"""
+        lines = []
+        if self.info:
+            lines += ["# HELP shamba_service_info Service and model version",
+                      "# TYPE shamba_service_info gauge",
+                      "shamba_service_info" + _labels(("service",) + tuple(self.info),
+                                                      (self.service,) + tuple(self.info.values())) + " 1"]
+
+        requests = self.request_seconds.children()
+        lines += ["# HELP shamba_requests_total Requests by endpoint and status",
+                  "# TYPE shamba_requests_total counter"]
+        for values, histogram in requests:
+            counts, _ = histogram.snapshot()
+            lines.append(f"shamba_requests_total{_labels(self.request_seconds.label_names, values)} "
+                         f"{sum(counts)}")
+
+        for family in (self.request_seconds, self.stage_seconds, self.batch_sizes):
+            lines += [f"# HELP {family.name} {family.help_text}", f"# TYPE {family.name} histogram"]
+            for values, histogram in family.children():
+                counts, total = histogram.snapshot()
+                cumulative = 0
+                for bound, count in zip(family.buckets, counts):
+                    cumulative += count
+                    le = _labels(family.label_names, values, f'le="{_number(bound)}"')
+                    lines.append(f"{family.name}_bucket{le} {cumulative}")
+                cumulative += counts[-1]
+                le = _labels(family.label_names, values, 'le="+Inf"')
+                lines.append(f"{family.name}_bucket{le} {cumulative}")
+                labels = _labels(family.label_names, values)
+                lines.append(f"{family.name}_sum{labels} {_number(total)}")
+                lines.append(f"{family.name}_count{labels} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+class ASGIRequestMetrics:
+    """
+    ASGI middleware recording each HTTP request's latency and status
+
+    The endpoint label is the matched route's path template (e.g.
+    /farmers/{farmer_id}/scores), or "unmatched", so label values stay
+    bounded. Streaming responses are timed until their last chunk is sent.
+    """
+
+    def __init__(self, app, metrics: ServiceMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_and_record_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_record_status)
+        finally:
+            endpoint = getattr(scope.get("route"), "path", None) or "unmatched"
+            self.metrics.observe_request(endpoint, status, time.perf_counter() - start)
+
+
+# Content type of the Prometheus text format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def metrics_from_env(service: str) -> Optional[ServiceMetrics]:
+    """ServiceMetrics for the service, or None if SHAMBA_METRICS=0"""
+    if os.environ.get("SHAMBA_METRICS", "1") != "1":
+        return None
+    return ServiceMetrics(service)
@@ -0,0 +1,126 @@
+"""
+Shamba Score: Model Loader
+Locates and loads the model artifacts, independent of the working directory
+"""
+
+import hashlib
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# SHAMBA_MODEL_DIR overrides the repo's models/ directory
+MODELS_DIR = os.environ.get("SHAMBA_MODEL_DIR") or os.path.normpath(os.path.join(API_DIR, '..', 'models'))
+
+MODEL_FILE = 'shamba_score_model.pkl'
+SCALER_FILE = 'scaler.pkl'
+FEATURE_NAMES_FILE = 'feature_names.json'
+
+
+def artifact_paths(models_dir: str = MODELS_DIR) -> List[str]:
+    """Model, scaler and feature-name files in models_dir"""
+    return [os.path.join(models_dir, name) for name in (MODEL_FILE, SCALER_FILE, FEATURE_NAMES_FILE)]
+
+
+def artifact_version(paths: List[str]) -> str:
+    """Short content hash identifying a set of model artifacts"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+class ModelArtifacts:
+    """A loaded model, scaler and feature order plus their content version"""
+
+    def __init__(self, model, scaler, feature_names: List[str], version: str, models_dir: str):
+        self.model = model
+        self.scaler = scaler
+        self.feature_names = feature_names
+        self.version = version
+        self.models_dir = models_dir
+
+
+def load_artifacts(models_dir: str = MODELS_DIR) -> ModelArtifacts:
+    """
+    Load the artifacts from models_dir
+
+    joblib (and through it xgboost/sklearn) is imported here rather than at
+    module import, so importing the API stays cheap.
+
+    Raises:
+        FileNotFoundError: If an artifact is missing
+    """
+    import joblib
+
+    paths = artifact_paths(models_dir)
+    missing = [path for path in paths if not os.path.exists(path)]
+    if missing:
+        raise FileNotFoundError(f"Model artifacts not found: {missing}")
+
+    model_path, scaler_path, feature_names_path = paths
+    model = joblib.load(model_path)
+    scaler = joblib.load(scaler_path)
+    with open(feature_names_path, 'r') as f:
+        feature_names = json.load(f)
+
+    return ModelArtifacts(model, scaler, feature_names, artifact_version(paths), models_dir)
+
+
+def validate_artifacts(artifacts: ModelArtifacts) -> float:
+    """
+    Check that model, scaler and feature names agree, then run a smoke prediction
+
+    Args:
+        artifacts: Freshly loaded artifacts
+
+    Returns:
+        Smoke-test score for the scaler's mean farmer
+
+    Raises:
+        ValueError: If the artifacts are inconsistent or the prediction isn't finite
+    """
+    import numpy as np
+
+    n_features = len(artifacts.feature_names)
+    for name, component in (("scaler", artifacts.scaler), ("model", artifacts.model)):
+        expected = getattr(component, "n_features_in_", n_features)
+        if expected != n_features:
+            raise ValueError(f"{name} expects {expected} features, feature_names.json lists {n_features}")
+
+    scaler_names = getattr(artifacts.scaler, "feature_names_in_", None)
+    if scaler_names is not None and list(scaler_names) != list(artifacts.feature_names):
+        raise ValueError("feature_names.json order does not match the scaler")
+
+    X = np.asarray(artifacts.scaler.mean_, dtype=float).reshape(1, -1)
+    score = float(artifacts.model.predict(artifacts.scaler.transform(X))[0])
+    if not np.isfinite(score):
+        raise ValueError(f"Smoke prediction is not finite: {score}")
+    return score
+
+
+class StartupTimings:
+    """Durations of the startup phases, in milliseconds"""
+
+    def __init__(self, origin: Optional[float] = None):
+        self.origin = origin if origin is not None else time.perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round((time.perf_counter() - start) * 1000, 2)
+
+    def mark(self, name: str):
+        """Record the time elapsed since origin under name"""
+        self.phases[name] = round((time.perf_counter() - self.origin) * 1000, 2)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(self.phases)
@@ -0,0 +1,271 @@
+"""
+Shamba Score: Model Registry
+Holds the serving model and swaps in new versions without downtime
+"""
+
+import asyncio
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+from model_loader import MODELS_DIR, ModelArtifacts, artifact_paths, load_artifacts, validate_artifacts
+
+
+class ServingModel:
+    """
+    One model version with its own inference pipeline
+
+    The loaded model, scoring function and explainer come from an
+    InferenceCore; this adds the executor and micro-batcher that serve it.
+    in_flight counts the requests currently using this version, so a
+    replaced version is only torn down once they have all finished.
+    """
+
+    def __init__(self, core, inference_executor, micro_batcher=None):
+        self.core = core
+        self.artifacts = core.artifacts
+        self.model = core.model
+        self.scaler = core.scaler
+        self.feature_names = core.feature_names
+        self.version = core.version
+        self.tree_engine = core.tree_engine
+        self.predict_scores = core.predict_scores
+        self.explainer = core.explainer
+        self.inference_executor = inference_executor
+        self.micro_batcher = micro_batcher
+        self.loaded_at = datetime.now().isoformat()
+        self.in_flight = 0
+
+    async def predict_and_explain(self, X):
+        """
+        Scores and SHAP contributions for a feature matrix
+
+        Returns:
+            Array (n_rows x 1 + n_features): score, then one contribution per feature
+        """
+        scores = await self.inference_executor.predict(X)
+        contributions = await self.inference_executor.run(self.core.shap_values, X)
+        return np.column_stack([scores, contributions])
+
+    async def retire(self, timeout: float = 60.0, poll: float = 0.05):
+        """Wait for in-flight requests to finish, then release the pools"""
+        deadline = time.monotonic() + timeout
+        while self.in_flight > 0 and time.monotonic() < deadline:
+            await asyncio.sleep(poll)
+        if self.micro_batcher is not None:
+            self.micro_batcher.close()
+        await asyncio.to_thread(self.inference_executor.shutdown)
+
+
+class ModelRegistry:
+    """
+    Current ServingModel plus reload from the artifact directory
+
+    A reload loads and validates the new artifacts off the event loop,
+    builds and warms their pipeline, then replaces `current` in a single
+    assignment. Requests that already hold the old version finish on it.
+
+    load_error is why no model could be loaded (nothing is serving);
+    reload_error is why the last reload failed while an older model kept
+    serving. A successful load or reload clears both.
+    """
+
+    def __init__(self, build_fn: Callable[[ModelArtifacts], ServingModel], models_dir: str = MODELS_DIR,
+                 warm_up: Optional[Callable[[ServingModel], Awaitable[None]]] = None,
+                 on_swap: Optional[Callable[[ServingModel], None]] = None):
+        self.build_fn = build_fn
+        self.models_dir = models_dir
+        self.warm_up = warm_up
+        self.on_swap = on_swap
+
+        self.current: Optional[ServingModel] = None
+        self.load_error: Optional[str] = None
+        self.reload_error: Optional[str] = None
+        self.reloads = 0
+        self.failed_reloads = 0
+        self.history: List[Dict[str, Any]] = []
+        self._lock = None
+        self._retiring = set()
+        # Artifact mtimes/sizes as of the last load, for watch()
+        self._signature = None
+
+    @contextmanager
+    def use(self):
+        """Pin the current version for the duration of one request"""
+        serving = self.current
+        if serving is None:
+            yield None
+            return
+        serving.in_flight += 1
+        try:
+            yield serving
+        finally:
+            serving.in_flight -= 1
+
+    def _swap(self, serving: ServingModel) -> Optional[ServingModel]:
+        previous = self.current
+        self.current = serving
+        self.load_error = None
+        self.reload_error = None
+        if self.on_swap is not None:
+            self.on_swap(serving)
+        return previous
+
+    def _set_error(self, error: str):
+        if self.current is None:
+            self.load_error = error
+        else:
+            self.reload_error = error
+
+    def _record(self, event: str, version: Optional[str], elapsed: float, error: Optional[str] = None):
+        self.history.append({
+            "event": event,
+            "model_version": version,
+            "at": datetime.now().isoformat(),
+            "elapsed_ms": round(elapsed * 1000, 2),
+            "error": error
+        })
+        del self.history[:-20]
+
+    def load_sync(self, force: bool = False) -> bool:
+        """
+        Load, validate and install the artifacts without warm-up
+
+        Used at startup and by serve.py's parent, where nothing is in flight.
+
+        Args:
+            force: Reload even if a model is already installed
+
+        Returns:
+            True if a model is installed
+        """
+        if self.current is not None and not force:
+            return True
+
+        start = time.perf_counter()
+        self._signature = self._artifact_signature()
+        try:
+            artifacts = load_artifacts(self.models_dir)
+            if self.current is not None and artifacts.version == self.current.version:
+                return True
+            validate_artifacts(artifacts)
+            serving = self.build_fn(artifacts)
+        except Exception as e:
+            self._set_error(str(e))
+            self._record("load_failed", None, time.perf_counter() - start, str(e))
+            print(f"Error loading model artifacts: {e}")
+            return self.current is not None
+
+        previous = self._swap(serving)
+        if previous is not None:
+            previous.inference_executor.shutdown()
+        self._record("loaded", serving.version, time.perf_counter() - start)
+        print(f"Model {serving.version} loaded from {self.models_dir}")
+        return True
+
+    async def reload(self, force: bool = False) -> Dict[str, Any]:
+        """
+        Hot-reload the artifacts from models_dir
+
+        Args:
+            force: Rebuild even if the content version is unchanged
+
+        Returns:
+            Outcome with previous/current version and timing
+
+        Raises:
+            Exception: Whatever loading, validation or warm-up raised; the
+                current model stays in place and the new pipeline is closed
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            start = time.perf_counter()
+            previous_version = self.current.version if self.current is not None else None
+            self._signature = self._artifact_signature()
+            try:
+                artifacts = await asyncio.to_thread(load_artifacts, self.models_dir)
+                if artifacts.version == previous_version and not force:
+                    return {"reloaded": False, "model_version": previous_version,
+                            "previous_version": previous_version, "elapsed_ms": 0.0}
+                await asyncio.to_thread(validate_artifacts, artifacts)
+                serving = await asyncio.to_thread(self.build_fn, artifacts)
+                try:
+                    if self.warm_up is not None:
+                        await self.warm_up(serving)
+                except BaseException:
+                    # Never installed, so nothing is in flight on it
+                    await serving.retire()
+                    raise
+            except Exception as e:
+                self.failed_reloads += 1
+                self._set_error(str(e))
+                self._record("reload_failed", None, time.perf_counter() - start, str(e))
+                raise
+
+            previous = self._swap(serving)
+            self.reloads += 1
+            elapsed = time.perf_counter() - start
+            self._record("reloaded", serving.version, elapsed)
+            print(f"Model reloaded: {previous_version} -> {serving.version} in {elapsed * 1000:.0f} ms")
+
+            if previous is not None:
+                task = asyncio.get_running_loop().create_task(previous.retire())
+                self._retiring.add(task)
+                task.add_done_callback(self._retiring.discard)
+
+            return {"reloaded": True, "model_version": serving.version,
+                    "previous_version": previous_version, "elapsed_ms": round(elapsed * 1000, 2)}
+
+    def _artifact_signature(self):
+        signature = []
+        for path in artifact_paths(self.models_dir):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    async def watch(self, interval: float):
+        """
+        Poll the artifact files and reload when they change
+
+        A change is acted on once the files have stopped changing for one
+        interval, so a half-written set of artifacts isn't picked up.
+        """
+        pending = None
+        while True:
+            await asyncio.sleep(interval)
+            signature = self._artifact_signature()
+            if signature == self._signature:
+                pending = None
+                continue
+            if signature != pending:
+                pending = signature
+                continue
+            pending = None
+            try:
+                await self.reload()
+            except Exception as e:
+                print(f"Model reload failed, keeping {self.current.version if self.current else None}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        current = self.current
+        return {
+            "models_dir": self.models_dir,
+            "model_version": current.version if current is not None else None,
+            "loaded_at": current.loaded_at if current is not None else None,
+            "in_flight": current.in_flight if current is not None else 0,
+            "retiring": len(self._retiring),
+            "reloads": self.reloads,
+            "failed_reloads": self.failed_reloads,
+            "load_error": self.load_error,
+            "reload_error": self.reload_error,
+            "history": list(self.history)
+        }
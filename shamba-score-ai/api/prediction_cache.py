@@ -0,0 +1,113 @@
+"""
+Shamba Score: Prediction Cache
+In-process LRU + TTL cache for single-farmer predictions
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+
+def feature_key(feature_values: Sequence[float], model_version: str) -> bytes:
+    """
+    Canonical cache key for a feature vector under a model version
+
+    Values are hashed as float64 so 4 and 4.0 (and -0.0 and 0.0) share a key.
+    """
+    values = np.asarray(feature_values, dtype=np.float64) + 0.0
+    digest = hashlib.blake2b(values.tobytes(), digest_size=16)
+    digest.update(model_version.encode())
+    return digest.digest()
+
+
+class PredictionCache:
+    """Thread-safe LRU cache with optional TTL, tied to one model version"""
+
+    def __init__(self, max_size: int = 10000, ttl: Optional[float] = None, model_version: str = ""):
+        self.max_size = max_size
+        self.ttl = ttl if ttl and ttl > 0 else None
+        self.model_version = model_version
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def key(self, feature_values: Sequence[float]) -> bytes:
+        return feature_key(feature_values, self.model_version)
+
+    def get(self, key: bytes) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: bytes, value: Any):
+        """Store value under key, evicting the least recently used entry if full"""
+        if not self.enabled:
+            return
+
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def set_model_version(self, model_version: str):
+        """Switch to a new model version, dropping every cached prediction"""
+        with self._lock:
+            if model_version != self.model_version:
+                if self.model_version:
+                    self.invalidations += 1
+                self.model_version = model_version
+                self._entries.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for the health endpoint"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "model_version": self.model_version
+            }
@@ -0,0 +1,326 @@
+"""
+Shamba Score: Request Profiling
+Opt-in per-request profiles and a buffer of recent slow requests
+
+A request profile records how long the request spent in each scoring
+stage (the stage timers behind /metrics), the request's inputs reduced to
+their numeric model fields, and optionally a cProfile dump. A request is
+profiled when it sends an X-Shamba-Profile header (if allowed) or is
+sampled; profiled requests get a Server-Timing response header and are
+kept in a bounded buffer. With a slow-request threshold set, every
+request is timed by stage and those over the threshold are kept in a
+second buffer. Both buffers are read through the admin endpoints.
+
+With none of the settings on, profiler_from_env() returns None and the
+services install no hooks, so profiling costs nothing when off.
+
+Configured with environment variables:
+    SHAMBA_PROFILE_SAMPLE_RATE=0   Fraction of requests to profile (0-1)
+    SHAMBA_PROFILE_HEADER=0        Profile requests sending X-Shamba-Profile: 1
+                                   (or X-Shamba-Profile: cprofile)
+    SHAMBA_PROFILE_CPROFILE=0      Run sampled requests, and those asking for
+                                   it in the header, under cProfile
+    SHAMBA_SLOW_REQUEST_MS=0       Keep requests slower than this (0 = off)
+    SHAMBA_PROFILE_BUFFER=100      Requests kept in each buffer
+"""
+
+import cProfile
+import io
+import itertools
+import os
+import pstats
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+# Request header asking for a profile ("1", or "cprofile" for a cProfile dump too)
+PROFILE_HEADER = "X-Shamba-Profile"
+
+# Response header carrying the id of the request's entry in the profile buffer
+PROFILE_ID_HEADER = "X-Shamba-Profile-Id"
+
+# Input records kept per request (batches keep their first few)
+INPUT_RECORDS = 5
+
+# Functions listed in a cProfile dump
+CPROFILE_LINES = 30
+
+# The active request's profile; None outside profiled requests
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("shamba_request_profile", default=None)
+
+# cProfile hooks the whole thread, so only one request runs under it at a time
+_cprofile_lock = threading.Lock()
+
+
+def current_profile() -> Optional["RequestProfile"]:
+    """Profile of the request being handled in this context, if it is profiled"""
+    return _current_profile.get()
+
+
+def activate(profile: Optional["RequestProfile"]):
+    """Make profile the current one for this context; returns the token to reset it with"""
+    return _current_profile.set(profile)
+
+
+def deactivate(token):
+    _current_profile.reset(token)
+
+
+class RequestProfile:
+    """
+    Stage timings, inputs and optional cProfile run of one request
+
+    reasons says why it is profiled ("requested", "sampled"); a request
+    timed only for slow-request capture has none until it turns out slow.
+    """
+
+    def __init__(self, profile_id: int, reasons: List[str], cprofile: bool = False):
+        self.id = profile_id
+        self.reasons = reasons
+        self.timestamp = datetime.now().isoformat()
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.inputs: Optional[Dict[str, Any]] = None
+        self.cprofile_dump: Optional[str] = None
+        self._cprofile = None
+        if cprofile:
+            self._start_cprofile()
+
+    def add(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def set_inputs(self, records: Sequence[Mapping[str, Any]], fields: Sequence[str],
+                   n_records: Optional[int] = None):
+        """
+        Keep the first INPUT_RECORDS records, reduced to their numeric model fields
+
+        Anything else (farmer IDs, free text, unknown fields) is dropped.
+        """
+        self.inputs = {
+            "records": n_records if n_records is not None else len(records),
+            "sample": [
+                {field: record[field] for field in fields
+                 if isinstance(record.get(field), (int, float))}
+                for record in records[:INPUT_RECORDS]
+            ]
+        }
+
+    def _start_cprofile(self):
+        if not _cprofile_lock.acquire(blocking=False):
+            self.cprofile_dump = "skipped: another request is running under cProfile"
+            return
+        try:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        except ValueError as e:
+            # Another profiler (or debugger) already holds the thread's hook
+            _cprofile_lock.release()
+            self._cprofile = None
+            self.cprofile_dump = f"skipped: {e}"
+
+    def stop_cprofile(self):
+        if self._cprofile is None:
+            return
+        self._cprofile.disable()
+        _cprofile_lock.release()
+        out = io.StringIO()
+        pstats.Stats(self._cprofile, stream=out).sort_stats("cumulative").print_stats(CPROFILE_LINES)
+        self.cprofile_dump = out.getvalue()
+        self._cprofile = None
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: each stage so far, then the total, in ms"""
+        timings = [f"{stage};dur={seconds * 1000:.3f}" for stage, seconds in self.stages.items()]
+        timings.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.3f}")
+        return ", ".join(timings)
+
+
+class ProfiledStage:
+    """Stage histogram stand-in that also adds each observation to the current request's profile"""
+
+    def __init__(self, stage: str, histogram):
+        self.stage = stage
+        self.histogram = histogram
+
+    def observe(self, seconds: float):
+        self.histogram.observe(seconds)
+        profile = _current_profile.get()
+        if profile is not None:
+            profile.add(self.stage, seconds)
+
+
+class RequestProfiler:
+    """
+    Decides which requests to profile and keeps the finished profiles
+
+    Stage timings come from the service's stage timers (see attach), so
+    with SHAMBA_METRICS=0 profiles carry totals, inputs and cProfile
+    dumps but no stage breakdown.
+    """
+
+    def __init__(self, sample_rate: float = 0.0, honor_header: bool = False, cprofile: bool = False,
+                 slow_threshold: float = 0.0, buffer_size: int = 100):
+        self.sample_rate = sample_rate
+        self.honor_header = honor_header
+        self.cprofile = cprofile
+        self.slow_threshold = slow_threshold
+        self.profiles = deque(maxlen=buffer_size)
+        self.slow_requests = deque(maxlen=buffer_size)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+        # Counters
+        self.profiled = 0
+        self.slow = 0
+
+    def attach(self, metrics):
+        """
+        Feed the metrics' stage timers into request profiles
+
+        Call before the inference core and executor are built: they bind
+        the stage histograms when constructed.
+        """
+        if metrics is not None:
+            metrics.wrap_stages(ProfiledStage)
+
+    def begin(self, header_value: Optional[str] = None) -> Optional[RequestProfile]:
+        """Profile for a new request, or None if it is neither profiled nor timed for slow capture"""
+        reasons = []
+        wants_cprofile = False
+        if self.honor_header and header_value:
+            value = header_value.strip().lower()
+            if value in ("1", "true", "yes", "cprofile"):
+                reasons.append("requested")
+                wants_cprofile = value == "cprofile"
+        if self.sample_rate and random.random() < self.sample_rate:
+            reasons.append("sampled")
+            wants_cprofile = True
+        if not reasons and not self.slow_threshold:
+            return None
+        return RequestProfile(next(self._ids), reasons, cprofile=self.cprofile and wants_cprofile)
+
+    def finish(self, profile: RequestProfile, method: str, endpoint: str, status: int) -> Optional[Dict[str, Any]]:
+        """
+        Close a request's profile and keep it if it was profiled or slow
+
+        Returns:
+            The kept entry, or None
+        """
+        duration = time.perf_counter() - profile.started
+        profile.stop_cprofile()
+        slow = bool(self.slow_threshold) and duration >= self.slow_threshold
+        if not profile.reasons and not slow:
+            return None
+
+        entry = {
+            "id": profile.id,
+            "timestamp": profile.timestamp,
+            "method": method,
+            "endpoint": endpoint,
+            "status": status,
+            "duration_ms": round(duration * 1000, 3),
+            "reasons": profile.reasons + (["slow"] if slow else []),
+            "stages_ms": {stage: round(seconds * 1000, 3) for stage, seconds in profile.stages.items()},
+            "inputs": profile.inputs,
+            "cprofile": profile.cprofile_dump
+        }
+        with self._lock:
+            if profile.reasons:
+                self.profiles.append(entry)
+                self.profiled += 1
+            if slow:
+                self.slow_requests.append(entry)
+                self.slow += 1
+        return entry
+
+    def snapshot(self, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Settings, counters and the kept entries (newest first)"""
+        with self._lock:
+            profiles = list(reversed(self.profiles))[:limit]
+            slow_requests = list(reversed(self.slow_requests))[:limit]
+        return {
+            "settings": {
+                "sample_rate": self.sample_rate,
+                "honor_header": self.honor_header,
+                "cprofile": self.cprofile,
+                "slow_request_ms": self.slow_threshold * 1000,
+                "buffer_size": self.profiles.maxlen
+            },
+            "profiled": self.profiled,
+            "slow": self.slow,
+            "profiles": profiles,
+            "slow_requests": slow_requests
+        }
+
+
+class ASGIRequestProfiler:
+    """
+    ASGI middleware that profiles requests chosen by the profiler
+
+    The profile is current for the whole request, including a streamed
+    body. Under FastAPI the request runs on the event loop, so a cProfile
+    dump covers whatever else the loop ran meanwhile and shows model calls
+    on the inference pool as waits.
+    """
+
+    def __init__(self, app, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+        self._header = PROFILE_HEADER.lower().encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        header_value = None
+        if self.profiler.honor_header:
+            for name, value in scope["headers"]:
+                if name == self._header:
+                    header_value = value.decode("latin-1")
+                    break
+        profile = self.profiler.begin(header_value)
+        if profile is None:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if profile.reasons:
+                    message = dict(message, headers=list(message.get("headers", [])) + [
+                        (b"server-timing", profile.server_timing().encode("latin-1")),
+                        (PROFILE_ID_HEADER.lower().encode("latin-1"), str(profile.id).encode("latin-1"))
+                    ])
+            await send(message)
+
+        token = activate(profile)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            deactivate(token)
+            endpoint = getattr(scope.get("route"), "path", None) or "unmatched"
+            self.profiler.finish(profile, scope["method"], endpoint, status)
+
+
+def profiler_from_env() -> Optional[RequestProfiler]:
+    """RequestProfiler from the SHAMBA_PROFILE_* settings, or None if profiling is off"""
+    sample_rate = float(os.environ.get("SHAMBA_PROFILE_SAMPLE_RATE", "0"))
+    honor_header = os.environ.get("SHAMBA_PROFILE_HEADER", "0") == "1"
+    slow_threshold = float(os.environ.get("SHAMBA_SLOW_REQUEST_MS", "0")) / 1000
+    if not (sample_rate > 0 or honor_header or slow_threshold > 0):
+        return None
+    return RequestProfiler(
+        sample_rate=sample_rate,
+        honor_header=honor_header,
+        cprofile=os.environ.get("SHAMBA_PROFILE_CPROFILE", "0") == "1",
+        slow_threshold=slow_threshold,
+        buffer_size=int(os.environ.get("SHAMBA_PROFILE_BUFFER", "100"))
+    )
@@ -91,7 +91,6 @@ class CreditScoreResult(BaseModel):
     improvement_suggestions: List[str] = Field(..., description="Improvement recommendations")
     
     # Risk breakdown
-    farmer_performance_score: float = Field(..., description="Farmer skill score")
     climate_risk_score: float = Field(..., description="Climate risk score")
 
 class BatchScoreRequest(BaseModel):
@@ -104,6 +103,11 @@ class BatchScoreResponse(BaseModel):
     results: List[CreditScoreResult] = Field(..., description="Scoring results")
     summary: Dict[str, float] = Field(..., description="Batch summary statistics")
     processing_time: float = Field(..., description="Processing time in seconds")
+    model_version: Optional[str] = Field(None, description="Version of the model that scored the batch")
+
+class LatestScoresRequest(BaseModel):
+    """Latest-score lookup for a list of farmers"""
+    farmer_ids: List[str] = Field(..., description="Farmer identifiers")
 
 class ModelMetrics(BaseModel):
     """Model performance metrics"""
@@ -0,0 +1,297 @@
+"""
+Shamba Score: Score History Store
+Local SQLite record of the scores served, written in batches off the request path
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    id INTEGER PRIMARY KEY,
+    farmer_id TEXT NOT NULL,
+    scored_at TEXT NOT NULL,
+    credit_score REAL NOT NULL,
+    risk_category TEXT,
+    model_version TEXT,
+    source TEXT,
+    features TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_scores_farmer_time ON scores (farmer_id, scored_at);
+"""
+
+COLUMNS = ("farmer_id", "scored_at", "credit_score", "risk_category", "model_version", "source", "features")
+
+INSERT = f"INSERT INTO scores ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+# SQLite's default host-parameter limit is 999 on older builds
+MAX_IDS_PER_QUERY = 900
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    return conn
+
+
+def _row(record: Dict[str, Any]) -> tuple:
+    features = record.get("features")
+    return (
+        str(record["farmer_id"]),
+        record.get("scored_at") or datetime.now().isoformat(),
+        float(record["credit_score"]),
+        record.get("risk_category"),
+        record.get("model_version"),
+        record.get("source"),
+        json.dumps(features, separators=(",", ":")) if features is not None else None
+    )
+
+
+def _record(row: sqlite3.Row) -> Dict[str, Any]:
+    record = dict(row)
+    if record.get("features") is not None:
+        record["features"] = json.loads(record["features"])
+    return record
+
+
+class ScoreStore:
+    """
+    Score history in SQLite (WAL mode), indexed by farmer_id and time
+
+    add() only queues the record. A writer thread with its own connection
+    inserts whatever has queued up (up to batch_size rows) in a single
+    transaction, so scoring never waits on the disk. The queue holds at
+    most max_queue records (a record counts until its transaction is done);
+    when it is full records are dropped and counted rather than blocking
+    the request.
+
+    Reads use one connection per thread and, with WAL, do not block on
+    the writer. Like AuditLog, the writer starts on first use and again
+    after a fork.
+    """
+
+    def __init__(self, path: str, batch_size: int = 1000, max_queue: int = 100000):
+        self.path = path
+        self.batch_size = batch_size
+        self.max_queue = max_queue
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = _connect(path)
+        conn.executescript(SCHEMA)
+        conn.close()
+
+        self._lock = threading.Lock()
+        self._counter_lock = threading.Lock()
+        self._local = threading.local()
+        self._pending = 0
+        self._queue = None
+        self._thread = None
+        self._pid = None
+
+        # Metrics
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.write_errors = 0
+        self.transactions = 0
+        self.write_time_total = 0.0
+        self.last_error: Optional[str] = None
+
+    def _ensure_writer(self):
+        """Start the writer thread (again, if this process was forked)"""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._local = threading.local()
+            self._pending = 0
+            self._queue = queue.Queue()
+            self._thread = threading.Thread(target=self._run, name="score-store-writer", daemon=True)
+            self._thread.start()
+
+    def add(self, record: Dict[str, Any]) -> bool:
+        """
+        Queue one score for insertion
+
+        Args:
+            record: farmer_id, credit_score and optionally scored_at (ISO
+                timestamp, default now), risk_category, model_version,
+                source and features
+
+        Returns:
+            False if the record was dropped because the queue was full
+        """
+        return self._put(record, 1)
+
+    def add_many(self, records: List[Dict[str, Any]]) -> bool:
+        """
+        Queue a list of scores (e.g. a scored batch), in chunks of at most
+        batch_size records
+
+        Returns:
+            False if any chunk was dropped because the queue was full
+        """
+        size = max(1, min(self.batch_size, self.max_queue))
+        accepted = True
+        for start in range(0, len(records), size):
+            chunk = records[start:start + size]
+            accepted = self._put(chunk, len(chunk)) and accepted
+        return accepted
+
+    def _put(self, item, count: int) -> bool:
+        self._ensure_writer()
+        with self._counter_lock:
+            if self._pending + count > self.max_queue:
+                self.dropped += count
+                return False
+            self._pending += count
+            self.enqueued += count
+            self._queue.put_nowait(item)
+        return True
+
+    def _run(self):
+        conn = _connect(self.path)
+        try:
+            while True:
+                items = [self._queue.get()]
+                taken = len(items[0]) if isinstance(items[0], list) else 1
+                while taken < self.batch_size:
+                    try:
+                        items.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                    taken += len(items[-1]) if isinstance(items[-1], list) else 1
+
+                rows = []
+                for item in items:
+                    for record in (item if isinstance(item, list) else (item,)):
+                        try:
+                            rows.append(_row(record))
+                        except (KeyError, TypeError, ValueError) as e:
+                            self.write_errors += 1
+                            self.last_error = f"Invalid score record: {e}"
+
+                if rows:
+                    start = time.perf_counter()
+                    try:
+                        with conn:
+                            conn.executemany(INSERT, rows)
+                        self.written += len(rows)
+                        self.transactions += 1
+                    except sqlite3.Error as e:
+                        self.write_errors += len(rows)
+                        self.last_error = str(e)
+                    self.write_time_total += time.perf_counter() - start
+
+                with self._counter_lock:
+                    self._pending -= taken
+                for _ in items:
+                    self._queue.task_done()
+        finally:
+            conn.close()
+
+    def flush(self):
+        """Block until everything queued so far has been written"""
+        if self._thread is not None and self._pid == os.getpid():
+            self._queue.join()
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = _connect(self.path)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def history(self, farmer_id: str, limit: int = 100, since: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        A farmer's scores, newest first
+
+        Args:
+            farmer_id: Farmer identifier
+            limit: Maximum number of scores
+            since: Only scores at or after this ISO timestamp
+
+        Returns:
+            List of score records
+        """
+        query = "SELECT * FROM scores WHERE farmer_id = ?"
+        params: List[Any] = [farmer_id]
+        if since is not None:
+            query += " AND scored_at >= ?"
+            params.append(since)
+        query += " ORDER BY scored_at DESC, id DESC LIMIT ?"
+        params.append(limit)
+        return [_record(row) for row in self._reader().execute(query, params)]
+
+    def latest(self, farmer_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Most recent score for each farmer, one indexed lookup per ID
+
+        Args:
+            farmer_ids: Farmer identifiers
+
+        Returns:
+            Dictionary of farmer_id -> latest score record (None if never scored)
+        """
+        latest: Dict[str, Optional[Dict[str, Any]]] = {farmer_id: None for farmer_id in farmer_ids}
+        ids = list(latest)
+        conn = self._reader()
+        for start in range(0, len(ids), MAX_IDS_PER_QUERY):
+            chunk = ids[start:start + MAX_IDS_PER_QUERY]
+            values = ", ".join("(?)" for _ in chunk)
+            query = (
+                f"WITH ids(farmer_id) AS (VALUES {values}) "
+                "SELECT s.* FROM ids JOIN scores s ON s.id = ("
+                "SELECT id FROM scores WHERE farmer_id = ids.farmer_id "
+                "ORDER BY scored_at DESC, id DESC LIMIT 1)"
+            )
+            for row in conn.execute(query, chunk):
+                latest[row["farmer_id"]] = _record(row)
+        return latest
+
+    def close(self, timeout: float = 10.0):
+        """Write out everything queued so far"""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        done = threading.Thread(target=self._queue.join, daemon=True)
+        done.start()
+        done.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "queue_depth": self._pending,
+            "max_queue": self.max_queue,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "write_errors": self.write_errors,
+            "transactions": self.transactions,
+            "mean_rows_per_transaction": round(self.written / self.transactions, 1) if self.transactions else 0.0,
+            "write_time_ms": round(self.write_time_total * 1000, 2),
+            "last_error": self.last_error
+        }
+
+
+def score_store_from_env(default_path: str) -> Optional[ScoreStore]:
+    """
+    ScoreStore configured from the environment
+
+    SHAMBA_SCORE_STORE=0 disables it (returns None); SHAMBA_SCORE_DB
+    overrides the database path.
+    """
+    if os.environ.get("SHAMBA_SCORE_STORE", "1") != "1":
+        return None
+    return ScoreStore(os.environ.get("SHAMBA_SCORE_DB") or default_path)
@@ -0,0 +1,317 @@
+"""
+Shamba Score: Pre-fork Server
+Loads the model artifacts once, then forks uvicorn workers that share them
+
+The parent imports main and loads the model (model, scaler, feature names
+and the NumPy tree arrays), freezes the GC so those objects are never
+touched again, binds the listening socket and forks the workers. Workers
+inherit everything copy-on-write and run only the warm-up pass in their
+startup hook, so adding a worker costs its private heap rather than
+another copy of the model. With --mmap-dir the tree arrays are served from
+memory-mapped .npy files and shared through the page cache.
+
+Signals (to the parent):
+    SIGHUP      reload the artifacts in the parent, then rolling restart
+                one worker at a time
+    SIGUSR1     print the per-worker memory / cold-start report
+    SIGTERM/INT graceful shutdown
+
+Usage:
+    python serve.py [--workers 4] [--port 8000] [--mmap-dir /dev/shm/shamba]
+"""
+
+import argparse
+import gc
+import os
+import select
+import signal
+import socket
+import sys
+import time
+from typing import Callable, Dict, Optional
+
+import uvicorn
+
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def read_memory(pid: int) -> Dict[str, float]:
+    """
+    RSS, PSS and private memory (MB) of a process from /proc
+
+    PSS splits each shared page between the processes mapping it, so the
+    sum of PSS over the parent and workers is the real total footprint.
+    """
+    fields = {"Rss": 0, "Pss": 0, "Private_Clean": 0, "Private_Dirty": 0}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in fields:
+                    fields[key] = int(rest.split()[0])
+    except OSError:
+        return {}
+    return {
+        "rss_mb": round(fields["Rss"] / 1024, 1),
+        "pss_mb": round(fields["Pss"] / 1024, 1),
+        "private_mb": round((fields["Private_Clean"] + fields["Private_Dirty"]) / 1024, 1)
+    }
+
+
+class _WorkerServer(uvicorn.Server):
+    """uvicorn server that tells the parent when it is accepting requests"""
+
+    def __init__(self, config, ready_fd: int, forked_at: float):
+        super().__init__(config)
+        self.ready_fd = ready_fd
+        self.forked_at = forked_at
+
+    async def startup(self, sockets=None):
+        await super().startup(sockets=sockets)
+        cold_start_ms = (time.perf_counter() - self.forked_at) * 1000
+        os.write(self.ready_fd, f"{os.getpid()} {cold_start_ms:.2f}\n".encode())
+
+
+class PreforkServer:
+    """Supervises forked uvicorn workers sharing one listening socket"""
+
+    def __init__(self, app, host: str = "0.0.0.0", port: int = 8000, workers: int = 1,
+                 log_level: str = "warning", restart_delay: float = 1.0,
+                 on_restart: Optional[Callable[[], None]] = None):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.num_workers = workers
+        self.log_level = log_level
+        self.restart_delay = restart_delay
+        self.on_restart = on_restart
+
+        # pid -> {"started": monotonic fork time, "cold_start_ms": None until ready}
+        self.workers: Dict[int, Dict[str, Optional[float]]] = {}
+        self.socket = None
+        self._ready_r = None
+        self._ready_w = None
+        self._buffer = b""
+        self._stopping = False
+        self._restart_requested = False
+        self._report_requested = False
+
+    def bind(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        self.socket = sock
+        self._ready_r, self._ready_w = os.pipe()
+
+    def spawn(self) -> int:
+        """Fork one worker; it starts serving on the shared socket"""
+        pid = os.fork()
+        if pid == 0:
+            self._run_worker(time.perf_counter())
+        self.workers[pid] = {"started": time.monotonic(), "cold_start_ms": None}
+        return pid
+
+    def _run_worker(self, forked_at: float):
+        # Child: restore default handlers, uvicorn installs its own
+        for sig in (signal.SIGHUP, signal.SIGUSR1, signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, signal.SIG_DFL)
+        os.close(self._ready_r)
+        code = 0
+        try:
+            config = uvicorn.Config(self.app, log_level=self.log_level, lifespan="on")
+            _WorkerServer(config, self._ready_w, forked_at).run(sockets=[self.socket])
+        except BaseException as e:
+            print(f"Worker {os.getpid()} failed: {e}", file=sys.stderr)
+            code = 1
+        finally:
+            os._exit(code)
+
+    def _read_ready(self, timeout: float):
+        """Record cold-start times reported by workers"""
+        readable, _, _ = select.select([self._ready_r], [], [], timeout)
+        if not readable:
+            return
+        self._buffer += os.read(self._ready_r, 4096)
+        *lines, self._buffer = self._buffer.split(b"\n")
+        for line in lines:
+            pid, cold_start_ms = line.split()
+            if int(pid) in self.workers:
+                self.workers[int(pid)]["cold_start_ms"] = float(cold_start_ms)
+
+    def _wait_ready(self, pid: int, timeout: float = 60.0) -> bool:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and pid in self.workers:
+            if self.workers[pid]["cold_start_ms"] is not None:
+                return True
+            self._read_ready(0.05)
+            self._reap()
+        return False
+
+    def _reap(self):
+        """Collect exited workers, returning how many were unexpected"""
+        crashed = 0
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            if self.workers.pop(pid, None) is not None and not self._stopping:
+                print(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}",
+                      file=sys.stderr)
+                crashed += 1
+        return crashed
+
+    def rolling_restart(self):
+        """Replace workers one at a time: start the new one, then drain the old one"""
+        for old_pid in list(self.workers):
+            new_pid = self.spawn()
+            if not self._wait_ready(new_pid):
+                print(f"Replacement worker {new_pid} did not become ready; keeping {old_pid}",
+                      file=sys.stderr)
+                continue
+            self.stop_worker(old_pid)
+        print("Rolling restart complete")
+
+    def stop_worker(self, pid: int, timeout: float = 30.0):
+        """SIGTERM lets uvicorn finish in-flight requests before exiting"""
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            done, _ = os.waitpid(pid, os.WNOHANG)
+            if done:
+                break
+            time.sleep(0.05)
+        else:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        self.workers.pop(pid, None)
+
+    def report(self, parent_load_ms: Optional[float] = None) -> Dict[str, object]:
+        """Per-worker memory and cold start, plus the total PSS footprint"""
+        rows = []
+        total_pss = read_memory(os.getpid()).get("pss_mb", 0.0)
+        for pid, info in sorted(self.workers.items()):
+            memory = read_memory(pid)
+            total_pss += memory.get("pss_mb", 0.0)
+            rows.append({"pid": pid, "cold_start_ms": info["cold_start_ms"], **memory})
+
+        print(f"\n{'pid':>8} {'cold start ms':>14} {'rss MB':>8} {'pss MB':>8} {'private MB':>11}")
+        for row in rows:
+            cold = f"{row['cold_start_ms']:.1f}" if row["cold_start_ms"] is not None else "-"
+            print(f"{row['pid']:>8} {cold:>14} {row.get('rss_mb', 0):>8} "
+                  f"{row.get('pss_mb', 0):>8} {row.get('private_mb', 0):>11}")
+        parent = read_memory(os.getpid())
+        print(f"  parent {os.getpid()}: rss {parent.get('rss_mb')} MB, pss {parent.get('pss_mb')} MB"
+              + (f", artifact load {parent_load_ms:.1f} ms" if parent_load_ms is not None else ""))
+        print(f"  total PSS (parent + {len(rows)} workers): {total_pss:.1f} MB\n")
+        return {"workers": rows, "parent": parent, "total_pss_mb": round(total_pss, 1)}
+
+    def run(self, parent_load_ms: Optional[float] = None):
+        """Fork the workers and supervise them until SIGTERM/SIGINT"""
+        self.bind()
+
+        def request_stop(signum, frame):
+            self._stopping = True
+
+        def request_restart(signum, frame):
+            self._restart_requested = True
+
+        def request_report(signum, frame):
+            self._report_requested = True
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+        signal.signal(signal.SIGHUP, request_restart)
+        signal.signal(signal.SIGUSR1, request_report)
+
+        for _ in range(self.num_workers):
+            self._wait_ready(self.spawn())
+        print(f"Serving on http://{self.host}:{self.port} with {len(self.workers)} workers "
+              f"(parent pid {os.getpid()})")
+        self.report(parent_load_ms)
+
+        while not self._stopping:
+            self._read_ready(0.5)
+            if self._reap():
+                time.sleep(self.restart_delay)
+            while len(self.workers) < self.num_workers and not self._stopping:
+                self.spawn()
+            if self._restart_requested:
+                self._restart_requested = False
+                if self.on_restart is not None:
+                    self.on_restart()
+                self.rolling_restart()
+            if self._report_requested:
+                self._report_requested = False
+                self.report(parent_load_ms)
+
+        for pid in list(self.workers):
+            self.stop_worker(pid)
+        self.socket.close()
+        print("Shut down")
+
+
+def load_app(mmap_dir: Optional[str] = None):
+    """
+    Import main and load the model in the parent so workers inherit it
+
+    Returns:
+        (app, load time in ms)
+    """
+    if API_DIR not in sys.path:
+        sys.path.insert(0, API_DIR)
+    if mmap_dir:
+        os.environ["SHAMBA_TREE_ENGINE_MMAP_DIR"] = mmap_dir
+
+    start = time.perf_counter()
+    import main
+    if not main.load_model():
+        raise RuntimeError(f"Model could not be loaded: {main.model_registry.load_error}")
+    load_ms = (time.perf_counter() - start) * 1000
+
+    freeze_heap()
+    return main.app, load_ms
+
+
+def reload_in_parent():
+    """Pick up new artifacts before a rolling restart so new workers fork with them"""
+    import main
+    main.model_registry.load_sync(force=True)
+    freeze_heap()
+
+
+def freeze_heap():
+    # Move everything loaded so far out of the collector's reach so that
+    # collections in the workers don't write to (and un-share) those pages
+    gc.collect()
+    gc.freeze()
+
+
+def main_cli(argv=None):
+    from inference_executor import available_cpus
+
+    parser = argparse.ArgumentParser(description="Pre-fork Shamba Score API server")
+    parser.add_argument('--host', default="0.0.0.0")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=available_cpus(), help="Worker processes")
+    parser.add_argument('--mmap-dir', default=os.environ.get("SHAMBA_TREE_ENGINE_MMAP_DIR"),
+                        help="Directory for memory-mapped tree arrays")
+    parser.add_argument('--log-level', default="warning")
+    args = parser.parse_args(argv)
+
+    app, load_ms = load_app(args.mmap_dir)
+    print(f"Artifacts loaded in parent in {load_ms:.1f} ms")
+    PreforkServer(app, host=args.host, port=args.port, workers=args.workers,
+                  log_level=args.log_level, on_restart=reload_in_parent).run(parent_load_ms=load_ms)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -3,7 +3,7 @@ Shamba Score API - Climate-Adaptive Credit Scoring System
 Production-ready Flask API for the Shamba Score model
 """
 
-from flask import Flask, request, jsonify, render_template_string
+from flask import Flask, Response, g, request, jsonify, render_template_string, stream_with_context
 from flask_cors import CORS
 import pandas as pd
 import numpy as np
@@ -12,6 +12,18 @@ import json
 from datetime import datetime
 import logging
 import os
+import hmac
+import time
+import atexit
+import threading
+
+from audit_log import audit_log_from_env
+from ingest import INGEST_CHUNK_SIZE, NDJSON, iter_line_chunks, parse_lines
+from inference_core import FLASK_FIELD_MAP, core_from_env, to_flask_scale
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, metrics_from_env
+from profiling import INPUT_RECORDS, PROFILE_HEADER, PROFILE_ID_HEADER, activate, current_profile, profiler_from_env
+from score_store import score_store_from_env
+from utils import calculate_risk_categories, log_prediction
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -20,91 +32,218 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)
 
+# Audit trail of every scoring decision, written by a background thread
+# (SHAMBA_AUDIT_LOG=0 disables it; other SHAMBA_AUDIT_* settings in audit_log.py)
+audit_log = audit_log_from_env(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'audit_logs'))
+if audit_log is not None:
+    atexit.register(audit_log.close)
+
+# Score history behind /api/farmers/*/scores (SHAMBA_SCORE_STORE=0 disables it,
+# SHAMBA_SCORE_DB sets the SQLite file). Shared with the FastAPI service, so
+# rows hold the 0-100 model score and its risk tier, not the 300-850 score.
+# Opened on first use (open_score_store), not at import
+SCORE_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'score_history.sqlite3')
+_score_store = None
+_score_store_opened = False
+_score_store_lock = threading.Lock()
+
+def open_score_store():
+    """The score store, opened on first call (None if SHAMBA_SCORE_STORE=0)"""
+    global _score_store, _score_store_opened
+    if not _score_store_opened:
+        with _score_store_lock:
+            if not _score_store_opened:
+                _score_store = score_store_from_env(SCORE_DB_PATH)
+                if _score_store is not None:
+                    atexit.register(_score_store.close)
+                _score_store_opened = True
+    return _score_store
+
+# Per-stage latency histograms, request counters and batch sizes behind
+# /metrics (SHAMBA_METRICS=0 disables them)
+metrics = metrics_from_env('flask')
+
+# Opt-in request profiles and slow-request capture behind /api/admin/profiles
+# (off unless SHAMBA_PROFILE_* or SHAMBA_SLOW_REQUEST_MS is set, see profiling.py)
+profiler = profiler_from_env()
+if profiler is not None:
+    profiler.attach(metrics)
+
+# Admin endpoints (/api/admin/*) require this value in the X-Admin-Token
+# header; they are disabled when it is unset
+ADMIN_TOKEN = os.environ.get('SHAMBA_ADMIN_TOKEN')
+
+# Request fields kept (numeric values only) in request profiles
+PROFILE_FIELDS = [field for field, _, _, _ in FLASK_FIELD_MAP.values()]
+
+# Farmers scored per vectorized pass in /api/batch-score
+BATCH_CHUNK_SIZE = int(os.environ.get('SHAMBA_BATCH_CHUNK_SIZE', 5000))
+
+# (minimum credit score, category, description), highest first
+SCORE_CATEGORIES = [
+    (750, "Excellent", "Outstanding creditworthiness"),
+    (650, "Good", "Strong creditworthiness"),
+    (550, "Fair", "Moderate creditworthiness"),
+    (None, "Poor", "Limited creditworthiness")
+]
+
 # Global model variables
 shamba_model = None
 climate_separator = None
 explainer = None
 
 class ShambaScorePredictor:
-    """Production Shamba Score predictor"""
+    """
+    Production Shamba Score predictor
+    
+    Scores with the shared inference core (the FastAPI service's model):
+    request fields are mapped onto model features by FLASK_FIELD_MAP and
+    the 0-100 model score is reported on the 300-850 scale.
+    """
     
     def __init__(self):
         self.model_loaded = False
+        self.core = None
+        
+    @property
+    def model_version(self):
+        return self.core.version if self.core is not None else None
         
     def load_models(self):
         """Load pre-trained models"""
         try:
-            # In production, load from saved model files
-            # For demo, we'll create mock models
             logger.info("Loading Shamba Score models...")
+            self.core = core_from_env(metrics=metrics)
             self.model_loaded = True
-            logger.info("✅ Models loaded successfully")
+            if metrics is not None:
+                metrics.info['model_version'] = self.core.version
+            logger.info(f"✅ Models loaded successfully (version {self.core.version})")
         except Exception as e:
             logger.error(f"❌ Error loading models: {e}")
+            self.core = None
             self.model_loaded = False
     
-    def predict_credit_score(self, farmer_data):
-        """Predict credit score for a farmer"""
-        try:
-            # Mock prediction logic (replace with actual model)
-            base_score = 500
-            
-            # Satellite data impact
-            ndvi_score = farmer_data.get('ndvi_current', 0.7) * 100
-            crop_health = farmer_data.get('crop_health_score', 75)
-            
-            # M-Pesa data impact
-            income = farmer_data.get('monthly_income_avg', 20000)
-            payment_consistency = farmer_data.get('payment_consistency', 0.8) * 100
-            
-            # Community data impact
-            trust_score = farmer_data.get('community_trust_score', 70)
-            
-            # Climate risk adjustment
-            drought_risk = farmer_data.get('drought_risk_score', 30)
-            flood_risk = farmer_data.get('flood_risk_score', 20)
-            climate_penalty = (drought_risk + flood_risk) / 4
-            
-            # Calculate final score
-            performance_score = (
-                ndvi_score * 0.2 + 
-                crop_health * 0.2 + 
-                payment_consistency * 0.3 + 
-                trust_score * 0.2 +
-                min(income/1000, 50) * 0.1
-            )
-            
-            final_score = base_score + performance_score - climate_penalty
-            final_score = max(300, min(850, final_score))
+    def predict_credit_score(self, farmer_data, explain=False):
+        """
+        Predict credit score for a farmer
+        
+        Args:
+            farmer_data: Farmer record from the request
+            explain: Also return the model's top contributing factors
             
-            return {
-                'credit_score': round(final_score),
-                'farmer_performance': round(performance_score),
-                'climate_risk': round(climate_penalty),
-                'confidence': 85
+        Returns:
+            Dictionary of scores, the 0-100 model score and its risk tier
+            ('model_score', 'risk_category') and the model feature vector
+            used ('features', by feature name) (None if the record can't be
+            scored)
+        """
+        try:
+            scores = self.predict_credit_scores([farmer_data], explain=explain)
+            if not scores['ok'][0]:
+                return None
+            result = {
+                'credit_score': int(scores['credit_score'][0]),
+                'farmer_performance': int(scores['farmer_performance'][0]),
+                'climate_risk': int(scores['climate_risk'][0]),
+                'confidence': int(scores['confidence'][0]),
+                'model_score': float(scores['model_score'][0]),
+                'risk_category': scores['risk_category'][0],
+                'features': self.model_features(scores['X'][0])
             }
+            if explain:
+                result['top_factors'] = scores['top_factors'][0]
+            return result
             
         except Exception as e:
             logger.error(f"Prediction error: {e}")
             return None
     
+    def predict_credit_scores(self, farmers, explain=False):
+        """
+        Score a list of farmer records in one vectorized pass
+        
+        A row fails (ok=False) if the record isn't an object or a field it
+        supplies is non-numeric or infinite, or if no model is loaded.
+        
+        Args:
+            farmers: List of farmer dicts
+            explain: Also return top_factors (list per farmer)
+            
+        Returns:
+            Dictionary of arrays: credit_score (300-850), farmer_performance
+            (model score, 0-100), climate_risk (drought exposure, 0-100),
+            confidence (0-100) (all int64), model_score (the 0-100 score,
+            one decimal) and risk_category (its utils.RISK_TIERS name), ok
+            (bool) and X (the model feature matrix, in core.feature_names order)
+        """
+        n = len(farmers)
+        if self.core is None:
+            zeros = np.zeros(n, dtype=np.int64)
+            result = {'credit_score': zeros, 'farmer_performance': zeros, 'climate_risk': zeros,
+                      'confidence': zeros, 'model_score': np.zeros(n), 'risk_category': np.full(n, None),
+                      'ok': np.zeros(n, dtype=bool), 'X': np.empty((n, 0))}
+            if explain:
+                result['top_factors'] = [[] for _ in range(n)]
+            return result
+        
+        scored = self.core.score_records(farmers, FLASK_FIELD_MAP, explain=explain)
+        ok = scored['ok']
+        drought = scored['X'][:, self.core.feature_names.index('drought_exposure_index')]
+        
+        def rounded(values):
+            return np.where(ok, np.rint(np.where(ok, values, 0)), 0).astype(np.int64)
+        
+        # Banded after rounding, as the FastAPI service does
+        model_score = np.where(ok, scored['scores'], 0).round(1)
+        
+        result = {
+            'credit_score': np.where(ok, to_flask_scale(scored['scores']), 0),
+            'farmer_performance': rounded(scored['scores']),
+            'climate_risk': rounded(drought * 100),
+            'confidence': rounded(scored['confidence'] * 100),
+            'model_score': model_score,
+            'risk_category': calculate_risk_categories(model_score)[0],
+            'ok': ok,
+            'X': scored['X']
+        }
+        if explain:
+            result['top_factors'] = scored['top_factors']
+        return result
+    
+    def model_features(self, row):
+        """
+        One row of the model feature matrix by feature name
+        
+        This is what the audit log and score store keep, rather than the
+        request record (which can carry names, phone numbers and other
+        fields the model never sees).
+        """
+        return dict(zip(self.core.feature_names, row.tolist()))
+    
+    def score_categories(self, credit_scores):
+        """
+        Vectorized score category lookup over SCORE_CATEGORIES
+        
+        Returns:
+            Tuple of object arrays (categories, descriptions)
+        """
+        tiers = SCORE_CATEGORIES[::-1]
+        thresholds = np.array([t[0] for t in tiers[1:]], dtype=float)
+        credit_scores = np.asarray(credit_scores, dtype=float)
+        idx = np.searchsorted(thresholds, credit_scores, side='right')
+        # searchsorted sorts NaN past every threshold; a missing score is 'Poor'
+        idx[np.isnan(credit_scores)] = 0
+        categories = np.array([t[1] for t in tiers], dtype=object)
+        descriptions = np.array([t[2] for t in tiers], dtype=object)
+        return categories[idx], descriptions[idx]
+    
     def generate_explanation(self, farmer_data, scores):
         """Generate explanation for the credit score"""
         credit_score = scores['credit_score']
         
         # Score category
-        if credit_score >= 750:
-            category = "Excellent"
-            description = "Outstanding creditworthiness"
-        elif credit_score >= 650:
-            category = "Good" 
-            description = "Strong creditworthiness"
-        elif credit_score >= 550:
-            category = "Fair"
-            description = "Moderate creditworthiness"
-        else:
-            category = "Poor"
-            description = "Limited creditworthiness"
+        categories, descriptions = self.score_categories([credit_score])
+        category, description = categories[0], descriptions[0]
         
         # Identify strengths
         strengths = []
@@ -186,6 +325,64 @@ class ShambaScorePredictor:
 predictor = ShambaScorePredictor()
 predictor.load_models()
 
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+def record_request_metrics(response):
+    """Count the request by route and status (streamed responses are timed until their body is sent)"""
+    start = g.get('request_start')
+    if start is not None:
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        status = response.status_code
+        if response.is_streamed:
+            response.call_on_close(
+                lambda: metrics.observe_request(endpoint, status, time.perf_counter() - start)
+            )
+        else:
+            metrics.observe_request(endpoint, status, time.perf_counter() - start)
+    return response
+
+if metrics is not None:
+    app.before_request(start_request_timer)
+    app.after_request(record_request_metrics)
+
+def start_request_profile():
+    # Set for every request, so a thread never carries a finished request's profile
+    g.profile = profiler.begin(request.headers.get(PROFILE_HEADER))
+    activate(g.profile)
+
+def finish_request_profile(response):
+    """Keep the request's profile if it was profiled or slow (streamed responses once their body is sent)"""
+    profile = g.get('profile')
+    if profile is not None:
+        if profile.reasons:
+            response.headers['Server-Timing'] = profile.server_timing()
+            response.headers[PROFILE_ID_HEADER] = str(profile.id)
+        method = request.method
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        status = response.status_code
+        if response.is_streamed:
+            response.call_on_close(lambda: profiler.finish(profile, method, endpoint, status))
+        else:
+            profiler.finish(profile, method, endpoint, status)
+    return response
+
+if profiler is not None:
+    app.before_request(start_request_profile)
+    app.after_request(finish_request_profile)
+
+def profile_inputs(farmers):
+    """Keep the request's farmer records on its profile, if it has one"""
+    profile = current_profile()
+    if profile is not None:
+        profile.set_inputs([f for f in farmers[:INPUT_RECORDS] if isinstance(f, dict)], PROFILE_FIELDS,
+                           n_records=len(farmers))
+
+def observe_stage(stage, start):
+    """Record a stage that began at start (perf_counter) if metrics are on"""
+    if metrics is not None:
+        metrics.stage(stage).observe(time.perf_counter() - start)
+
 @app.route('/')
 def home():
     """API documentation"""
@@ -196,8 +393,13 @@ def home():
     <h3>Endpoints:</h3>
     <ul>
         <li><strong>POST /api/score</strong> - Score a single farmer</li>
-        <li><strong>POST /api/batch-score</strong> - Score multiple farmers</li>
+        <li><strong>POST /api/batch-score</strong> - Score multiple farmers (<code>?stream=true</code> for NDJSON)</li>
+        <li><strong>POST /api/batch-score/ingest</strong> - Score an NDJSON upload (one farmer per line), streamed back as NDJSON</li>
+        <li><strong>GET /api/farmers/&lt;farmer_id&gt;/scores</strong> - Score history for a farmer</li>
+        <li><strong>POST /api/scores/latest</strong> - Latest score for a list of farmers</li>
         <li><strong>GET /api/health</strong> - API health check</li>
+        <li><strong>GET /metrics</strong> - Stage latency histograms and request counters (Prometheus text format)</li>
+        <li><strong>GET /api/admin/profiles</strong> - Profiled and slow requests (X-Admin-Token required)</li>
     </ul>
     
     <h3>Sample Request:</h3>
@@ -223,19 +425,45 @@ def home():
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """API health check"""
+    score_store = open_score_store()
     return jsonify({
         'status': 'healthy',
         'model_loaded': predictor.model_loaded,
         'timestamp': datetime.now().isoformat(),
-        'version': '1.0.0'
+        'version': '1.0.0',
+        'model_version': predictor.model_version,
+        'audit_log': audit_log.stats() if audit_log is not None else None,
+        'score_store': score_store.stats() if score_store is not None else None
     })
 
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Per-stage latency histograms, request counters and batch sizes (Prometheus text format)"""
+    if metrics is None:
+        return jsonify({'error': 'Metrics are disabled (SHAMBA_METRICS=0)'}), 404
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/api/admin/profiles', methods=['GET'])
+def request_profiles():
+    """Recent profiled requests and slow requests, newest first (needs X-Admin-Token)"""
+    if not ADMIN_TOKEN:
+        return jsonify({'error': 'Admin endpoints are disabled (set SHAMBA_ADMIN_TOKEN)'}), 403
+    token = request.headers.get('X-Admin-Token')
+    if not token or not hmac.compare_digest(token, ADMIN_TOKEN):
+        return jsonify({'error': 'Invalid admin token'}), 401
+    if profiler is None:
+        return jsonify({'error': 'Profiling is disabled (set SHAMBA_PROFILE_SAMPLE_RATE, '
+                                 'SHAMBA_PROFILE_HEADER or SHAMBA_SLOW_REQUEST_MS)'}), 404
+    return jsonify(profiler.snapshot(limit=max(request.args.get('limit', 20, type=int), 0)))
+
 @app.route('/api/score', methods=['POST'])
 def score_farmer():
     """Score a single farmer"""
     try:
         # Get farmer data from request
+        start = time.perf_counter()
         farmer_data = request.get_json()
+        observe_stage('parse', start)
         
         if not farmer_data:
             return jsonify({'error': 'No farmer data provided'}), 400
@@ -248,9 +476,11 @@ def score_farmer():
             return jsonify({
                 'error': f'Missing required fields: {missing_fields}'
             }), 400
+        if profiler is not None:
+            profile_inputs([farmer_data])
         
         # Predict credit score
-        scores = predictor.predict_credit_score(farmer_data)
+        scores = predictor.predict_credit_score(farmer_data, explain=True)
         
         if not scores:
             return jsonify({'error': 'Prediction failed'}), 500
@@ -271,15 +501,38 @@ def score_farmer():
             'confidence_score': scores['confidence'],
             'explanation': {
                 'strengths': explanation['strengths'],
-                'improvement_areas': explanation['improvements']
+                'improvement_areas': explanation['improvements'],
+                'top_factors': scores['top_factors']
             },
             'recommendations': recommendations,
-            'model_version': '1.0.0'
+            'model_version': predictor.model_version
         }
         
         logger.info(f"Scored farmer {farmer_data['farmer_id']}: {scores['credit_score']}")
+        if audit_log is not None:
+            log_prediction(
+                farmer_data['farmer_id'], scores['features'], scores['credit_score'],
+                audit_log=audit_log,
+                source='/api/score',
+                model_version=response['model_version'],
+                score_category=explanation['category']
+            )
+        score_store = open_score_store()
+        if score_store is not None:
+            score_store.add({
+                'farmer_id': farmer_data['farmer_id'],
+                'scored_at': response['timestamp'],
+                'credit_score': scores['model_score'],
+                'risk_category': scores['risk_category'],
+                'model_version': response['model_version'],
+                'source': '/api/score',
+                'features': scores['features']
+            })
         
-        return jsonify(response)
+        start = time.perf_counter()
+        response = jsonify(response)
+        observe_stage('serialize', start)
+        return response
         
     except Exception as e:
         logger.error(f"Error in score_farmer: {e}")
@@ -288,61 +541,164 @@ def score_farmer():
             'message': str(e)
         }), 500
 
+def score_batch_chunk(farmers_data):
+    """
+    Score and explain a list of farmers in one vectorized pass
+    
+    Rows fail independently: a failed row gets status "failed" and an
+    error, the rest of the chunk is unaffected.
+    
+    Args:
+        farmers_data: List of farmer records from the request
+        
+    Returns:
+        List of per-farmer results, in input order
+    """
+    scores = predictor.predict_credit_scores(farmers_data)
+    categories, _ = predictor.score_categories(scores['credit_score'])
+    
+    columns = zip(
+        farmers_data,
+        scores['ok'].tolist(),
+        scores['credit_score'].tolist(),
+        categories.tolist(),
+        scores['farmer_performance'].tolist(),
+        scores['climate_risk'].tolist(),
+        scores['confidence'].tolist()
+    )
+    results = []
+    for farmer_data, ok, credit_score, category, performance, climate_risk, confidence in columns:
+        if type(farmer_data) is not dict:
+            results.append({'farmer_id': 'unknown', 'status': 'failed', 'error': 'Farmer record must be an object'})
+        elif ok:
+            results.append({
+                'farmer_id': farmer_data.get('farmer_id', 'unknown'),
+                'credit_score': credit_score,
+                'score_category': category,
+                'farmer_performance_score': performance,
+                'climate_risk_score': climate_risk,
+                'confidence_score': confidence,
+                'status': 'success'
+            })
+        else:
+            results.append({
+                'farmer_id': farmer_data.get('farmer_id', 'unknown'),
+                'status': 'failed',
+                'error': 'Prediction failed'
+            })
+    
+    score_store = open_score_store()
+    scored = [
+        (farmer_data, predictor.model_features(row), result, model_score, risk_category)
+        for farmer_data, row, result, model_score, risk_category in zip(
+            farmers_data, scores['X'], results, scores['model_score'].tolist(), scores['risk_category'].tolist())
+        if result['status'] == 'success'
+    ] if audit_log is not None or score_store is not None else []
+    if audit_log is not None and scored:
+        timestamp = datetime.now().isoformat()
+        audit_log.record_many([
+            {
+                'farmer_id': result['farmer_id'],
+                'timestamp': timestamp,
+                'score': result['credit_score'],
+                'features': features,
+                'source': '/api/batch-score',
+                'model_version': predictor.model_version,
+                'score_category': result['score_category']
+            }
+            for _, features, result, _, _ in scored
+        ])
+    if score_store is not None and scored:
+        scored_at = datetime.now().isoformat()
+        score_store.add_many([
+            {
+                'farmer_id': result['farmer_id'],
+                'scored_at': scored_at,
+                'credit_score': model_score,
+                'risk_category': risk_category,
+                'model_version': predictor.model_version,
+                'source': '/api/batch-score',
+                'features': features
+            }
+            for farmer_data, features, result, model_score, risk_category in scored
+            if 'farmer_id' in farmer_data
+        ])
+    
+    return results
+
+def stream_batch_results(farmers_data, chunk_size=None):
+    """
+    NDJSON lines for a batch: one result per line as each chunk is scored,
+    then a final {"summary": {...}} line with the counts
+    """
+    chunk_size = chunk_size or BATCH_CHUNK_SIZE
+    successful = 0
+    for start in range(0, len(farmers_data), chunk_size):
+        results = score_batch_chunk(farmers_data[start:start + chunk_size])
+        successful += sum(result['status'] == 'success' for result in results)
+        serialize_start = time.perf_counter()
+        content = ''.join(json.dumps(result) + '\n' for result in results)
+        observe_stage('serialize', serialize_start)
+        yield content
+    
+    yield json.dumps({'summary': {
+        'timestamp': datetime.now().isoformat(),
+        'total_farmers': len(farmers_data),
+        'successful_scores': successful,
+        'failed_scores': len(farmers_data) - successful
+    }}) + '\n'
+
+def wants_ndjson():
+    """Streaming requested via ?stream=true or Accept: application/x-ndjson"""
+    if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return True
+    return request.accept_mimetypes.best == 'application/x-ndjson'
+
 @app.route('/api/batch-score', methods=['POST'])
 def batch_score_farmers():
-    """Score multiple farmers"""
+    """
+    Score multiple farmers
+    
+    Farmers are scored in vectorized chunks of BATCH_CHUNK_SIZE. With
+    ?stream=true (or Accept: application/x-ndjson) results are streamed
+    as NDJSON while later chunks are still being scored.
+    """
     try:
         # Get farmers data from request
+        start = time.perf_counter()
         request_data = request.get_json()
         farmers_data = request_data.get('farmers', [])
+        observe_stage('parse', start)
         
         if not farmers_data:
             return jsonify({'error': 'No farmers data provided'}), 400
+        if not isinstance(farmers_data, list):
+            return jsonify({'error': 'farmers must be a list'}), 400
+        if metrics is not None:
+            metrics.observe_batch('/api/batch-score', len(farmers_data))
+        if profiler is not None:
+            profile_inputs(farmers_data)
         
-        results = []
+        if wants_ndjson():
+            return Response(stream_batch_results(farmers_data), mimetype='application/x-ndjson')
         
-        for farmer_data in farmers_data:
-            try:
-                # Score individual farmer
-                scores = predictor.predict_credit_score(farmer_data)
-                
-                if scores:
-                    explanation = predictor.generate_explanation(farmer_data, scores)
-                    
-                    result = {
-                        'farmer_id': farmer_data.get('farmer_id', 'unknown'),
-                        'credit_score': scores['credit_score'],
-                        'score_category': explanation['category'],
-                        'farmer_performance_score': scores['farmer_performance'],
-                        'climate_risk_score': scores['climate_risk'],
-                        'confidence_score': scores['confidence'],
-                        'status': 'success'
-                    }
-                else:
-                    result = {
-                        'farmer_id': farmer_data.get('farmer_id', 'unknown'),
-                        'status': 'failed',
-                        'error': 'Prediction failed'
-                    }
-                
-                results.append(result)
-                
-            except Exception as e:
-                results.append({
-                    'farmer_id': farmer_data.get('farmer_id', 'unknown'),
-                    'status': 'failed',
-                    'error': str(e)
-                })
+        results = []
+        for start in range(0, len(farmers_data), BATCH_CHUNK_SIZE):
+            results.extend(score_batch_chunk(farmers_data[start:start + BATCH_CHUNK_SIZE]))
+        successful = sum(result['status'] == 'success' for result in results)
         
         response = {
             'timestamp': datetime.now().isoformat(),
             'total_farmers': len(farmers_data),
-            'successful_scores': len([r for r in results if r['status'] == 'success']),
-            'failed_scores': len([r for r in results if r['status'] == 'failed']),
+            'successful_scores': successful,
+            'failed_scores': len(results) - successful,
             'results': results
         }
         
-        return jsonify(response)
+        start = time.perf_counter()
+        response = jsonify(response)
+        observe_stage('serialize', start)
+        return response
         
     except Exception as e:
         logger.error(f"Error in batch_score_farmers: {e}")
@@ -351,6 +707,88 @@ def batch_score_farmers():
             'message': str(e)
         }), 500
 
+def stream_ingest_results(stream, chunk_size=None):
+    """
+    NDJSON results for an NDJSON upload, read and scored chunk by chunk
+    
+    Results carry the upload line number; unparseable lines fail with
+    their JSON error. Ends with a {"summary": {...}} line.
+    """
+    total = successful = 0
+    for numbers, lines in iter_line_chunks(stream, chunk_size or INGEST_CHUNK_SIZE):
+        start = time.perf_counter()
+        records, errors = parse_lines(lines)
+        observe_stage('parse', start)
+        if metrics is not None:
+            metrics.observe_batch('/api/batch-score/ingest', len(records))
+        parsed = [i for i in range(len(records)) if i not in errors]
+        scored = iter(score_batch_chunk([records[i] for i in parsed] if errors else records))
+        
+        results = []
+        for i, line in enumerate(numbers):
+            if i in errors:
+                result = {'farmer_id': 'unknown', 'status': 'failed', 'error': errors[i]}
+            else:
+                result = next(scored)
+            result['line'] = line
+            results.append(result)
+        
+        total += len(results)
+        successful += sum(result['status'] == 'success' for result in results)
+        start = time.perf_counter()
+        content = ''.join(json.dumps(result) + '\n' for result in results)
+        observe_stage('serialize', start)
+        yield content
+    
+    yield json.dumps({'summary': {
+        'timestamp': datetime.now().isoformat(),
+        'total_farmers': total,
+        'successful_scores': successful,
+        'failed_scores': total - successful
+    }}) + '\n'
+
+@app.route('/api/batch-score/ingest', methods=['POST'])
+def ingest_batch_score():
+    """
+    Score an NDJSON upload of farmer records (one /api/score record per line)
+    
+    The body is read, parsed and scored INGEST_CHUNK_SIZE lines at a time
+    and results are streamed back as NDJSON while the upload is still
+    being read, so memory stays flat whatever the upload size.
+    """
+    return Response(stream_with_context(stream_ingest_results(request.stream)), mimetype=NDJSON)
+
+@app.route('/api/farmers/<farmer_id>/scores', methods=['GET'])
+def score_history(farmer_id):
+    """
+    A farmer's score history, newest first (?limit=&since=ISO timestamp)
+    
+    Scores are on the model's 0-100 scale with its risk tiers, whichever
+    service produced them.
+    """
+    score_store = open_score_store()
+    if score_store is None:
+        return jsonify({'error': 'Score history is disabled (SHAMBA_SCORE_STORE=0)'}), 404
+    
+    limit = max(1, min(request.args.get('limit', 100, type=int), 1000))
+    scores = score_store.history(farmer_id, limit=limit, since=request.args.get('since'))
+    return jsonify({'farmer_id': farmer_id, 'count': len(scores), 'scores': scores})
+
+@app.route('/api/scores/latest', methods=['POST'])
+def latest_scores():
+    """Latest 0-100 score for each farmer in {"farmer_ids": [...]} (null if never scored)"""
+    score_store = open_score_store()
+    if score_store is None:
+        return jsonify({'error': 'Score history is disabled (SHAMBA_SCORE_STORE=0)'}), 404
+    
+    request_data = request.get_json(silent=True) or {}
+    farmer_ids = request_data.get('farmer_ids')
+    if not isinstance(farmer_ids, list) or not all(isinstance(i, str) for i in farmer_ids):
+        return jsonify({'error': 'farmer_ids must be a list of strings'}), 400
+    
+    latest = score_store.latest(farmer_ids)
+    return jsonify({'count': sum(score is not None for score in latest.values()), 'scores': latest})
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('DEBUG', 'False').lower() == 'true'
@@ -0,0 +1,266 @@
+"""
+Shamba Score: NumPy Tree Ensemble
+Evaluates the trained XGBoost trees without building a DMatrix
+"""
+
+import json
+import os
+from typing import Optional
+
+import numpy as np
+
+
+class TreeEnsemble:
+    """XGBoost tree ensemble flattened into contiguous NumPy node arrays"""
+
+    def __init__(self, feature, threshold, left, right, default_left, value,
+                 roots, base_score, max_depth, chunk_size=256, cover=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.base_score = base_score
+        self.max_depth = max_depth
+        self.chunk_size = chunk_size
+        # Training hessian sum per node (used by TreeSHAP); None if unavailable
+        self.cover = cover
+        # XGBoost allocates siblings together (right == left + 1), which lets
+        # traversal skip a gather; leaves never go right so they are exempt
+        is_leaf = left == np.arange(len(left))
+        self.paired_children = bool(np.all(is_leaf | (right == left + 1)))
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    @classmethod
+    def from_xgboost(cls, model, scaler=None, chunk_size: int = 256) -> "TreeEnsemble":
+        """
+        Build the ensemble from an XGBRegressor (or Booster)
+
+        Args:
+            model: Trained XGBRegressor or xgboost.Booster
+            scaler: Optional fitted StandardScaler; its mean/scale are folded
+                into the split thresholds so raw features can be fed directly
+            chunk_size: Rows evaluated per pass when predicting large batches
+
+        Returns:
+            TreeEnsemble
+        """
+        booster = model.get_booster() if hasattr(model, "get_booster") else model
+        learner = json.loads(booster.save_raw("json"))["learner"]
+
+        objective = learner["objective"]["name"]
+        if objective != "reg:squarederror":
+            raise ValueError(f"Unsupported objective: {objective}")
+
+        # Newer XGBoost stores base_score as "[8.5E1]"
+        base_score = float(learner["learner_model_param"]["base_score"].strip("[]"))
+        trees = learner["gradient_booster"]["model"]["trees"]
+
+        features, thresholds, lefts, rights, defaults, values, roots = [], [], [], [], [], [], []
+        covers = []
+        max_depth = 0
+        offset = 0
+
+        for tree in trees:
+            left = np.asarray(tree["left_children"], dtype=np.int32)
+            right = np.asarray(tree["right_children"], dtype=np.int32)
+            split = np.asarray(tree["split_conditions"], dtype=np.float64)
+            is_leaf = left == -1
+            node_ids = np.arange(len(left), dtype=np.int32)
+
+            # Leaves always "go left" to themselves so extra traversal steps are no-ops
+            features.append(np.where(is_leaf, 0, tree["split_indices"]).astype(np.int32))
+            thresholds.append(np.where(is_leaf, np.inf, split))
+            lefts.append(np.where(is_leaf, node_ids, left) + offset)
+            rights.append(np.where(is_leaf, node_ids, right) + offset)
+            defaults.append(is_leaf | np.asarray(tree["default_left"], dtype=bool))
+            values.append(np.where(is_leaf, split, 0.0))
+            covers.append(np.asarray(tree["sum_hessian"], dtype=np.float64))
+            roots.append(offset)
+
+            max_depth = max(max_depth, _tree_depth(left, right))
+            offset += len(left)
+
+        feature = np.concatenate(features)
+        threshold = np.concatenate(thresholds)
+        is_split = np.isfinite(threshold)
+        threshold[is_split] = _fold_thresholds(
+            threshold[is_split].astype(np.float32),
+            feature[is_split],
+            getattr(scaler, "mean_", None),
+            getattr(scaler, "scale_", None)
+        )
+
+        return cls(
+            feature=feature,
+            threshold=threshold,
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            default_left=np.concatenate(defaults),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.int32),
+            base_score=base_score,
+            max_depth=max_depth,
+            chunk_size=chunk_size,
+            cover=np.concatenate(covers)
+        )
+
+    ARRAYS = ("feature", "threshold", "left", "right", "default_left", "value", "roots")
+
+    def save(self, directory: str):
+        """Write the node arrays as .npy files (plus metadata) so they can be memory-mapped"""
+        os.makedirs(directory, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        if self.cover is not None:
+            np.save(os.path.join(directory, "cover.npy"), self.cover)
+        with open(os.path.join(directory, "meta.json"), "w") as f:
+            json.dump({"base_score": self.base_score, "max_depth": self.max_depth,
+                       "chunk_size": self.chunk_size}, f)
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: Optional[str] = "r") -> "TreeEnsemble":
+        """
+        Load arrays written by save()
+
+        With mmap_mode="r" the arrays are read-only views of the page cache,
+        so every process that maps the same files shares one physical copy.
+        """
+        with open(os.path.join(directory, "meta.json"), "r") as f:
+            meta = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+            for name in cls.ARRAYS
+        }
+        cover_path = os.path.join(directory, "cover.npy")
+        if os.path.exists(cover_path):
+            arrays["cover"] = np.load(cover_path, mmap_mode=mmap_mode)
+        return cls(**arrays, **meta)
+
+    def predict(self, X) -> np.ndarray:
+        """
+        Predict scores for a feature matrix
+
+        Args:
+            X: Feature matrix (n_rows x n_features), or a single row
+
+        Returns:
+            Array of raw model outputs (one per row)
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        if len(X) <= self.chunk_size:
+            return self._predict_chunk(X)
+
+        out = np.empty(len(X), dtype=np.float64)
+        for start in range(0, len(X), self.chunk_size):
+            stop = start + self.chunk_size
+            out[start:stop] = self._predict_chunk(X[start:stop])
+        return out
+
+    def _predict_chunk(self, X: np.ndarray) -> np.ndarray:
+        """Walk every tree for every row, one depth level per step"""
+        n_rows, n_features = X.shape
+        has_missing = np.isnan(X).any()
+        flat_X = np.ascontiguousarray(X).ravel()
+        row_offset = (np.arange(n_rows, dtype=np.intp) * n_features)[:, None]
+        node = np.broadcast_to(self.roots, (n_rows, self.n_trees))
+
+        for _ in range(self.max_depth):
+            x = flat_X.take(row_offset + self.feature.take(node))
+            go_left = x < self.threshold.take(node)
+            if has_missing:
+                go_left = np.where(np.isnan(x), self.default_left.take(node), go_left)
+            if self.paired_children:
+                node = self.left.take(node) + ~go_left
+            else:
+                node = np.where(go_left, self.left.take(node), self.right.take(node))
+
+        return self.value.take(node).sum(axis=1) + self.base_score
+
+
+def _tree_depth(left: np.ndarray, right: np.ndarray, node: int = 0) -> int:
+    """Depth of a tree given its child arrays"""
+    if left[node] == -1:
+        return 0
+    return 1 + max(_tree_depth(left, right, left[node]), _tree_depth(left, right, right[node]))
+
+
+def _fold_thresholds(threshold: np.ndarray, feature: np.ndarray, mean=None, scale=None) -> np.ndarray:
+    """
+    Convert float32 split thresholds on scaled features into raw-feature thresholds
+
+    XGBoost tests float32((x - mean) / scale) < threshold, so a plain
+    threshold * scale + mean is off by rounding for rows that sit exactly on a
+    split (common for discrete features). Instead find, for every split, the
+    smallest float64 x that goes right; then x < T routes exactly like XGBoost.
+
+    Args:
+        threshold: float32 split thresholds (one per node)
+        feature: Split feature index per node
+        mean: Optional per-feature scaler mean
+        scale: Optional per-feature scaler scale
+
+    Returns:
+        float64 thresholds on raw features
+    """
+    mean = np.zeros(feature.max() + 1) if mean is None else np.asarray(mean, dtype=np.float64)
+    scale = np.ones(feature.max() + 1) if scale is None else np.asarray(scale, dtype=np.float64)
+    m, sc = mean[feature], scale[feature]
+
+    def goes_right(x):
+        return ((x - m) / sc).astype(np.float32) >= threshold
+
+    approx = threshold.astype(np.float64) * sc + m
+    width = (np.abs(approx) + sc) * 1e-6
+    lo, hi = approx - width, approx + width
+    while True:
+        bad_lo, bad_hi = goes_right(lo), ~goes_right(hi)
+        if not (bad_lo.any() or bad_hi.any()):
+            break
+        width *= 2
+        lo = np.where(bad_lo, approx - width, lo)
+        hi = np.where(bad_hi, approx + width, hi)
+
+    # Bisect until lo and hi are adjacent doubles; hi is then the boundary
+    for _ in range(128):
+        mid = lo + (hi - lo) / 2
+        if np.all((mid == lo) | (mid == hi)):
+            break
+        right = goes_right(mid)
+        hi = np.where(right, mid, hi)
+        lo = np.where(right, lo, mid)
+
+    return hi
+
+
+def load_tree_ensemble(model, scaler=None, mmap_dir: Optional[str] = None) -> Optional[TreeEnsemble]:
+    """
+    Build a TreeEnsemble, returning None if the model can't be converted
+
+    If mmap_dir is given, the arrays are saved there on first use and then
+    served memory-mapped from it. The directory should be specific to the
+    model version.
+    """
+    if model is None:
+        return None
+    try:
+        if mmap_dir is None:
+            return TreeEnsemble.from_xgboost(model, scaler)
+        if not os.path.exists(os.path.join(mmap_dir, "meta.json")):
+            TreeEnsemble.from_xgboost(model, scaler).save(mmap_dir)
+        return TreeEnsemble.load(mmap_dir, mmap_mode="r")
+    except Exception as e:
+        print(f"Error building NumPy tree ensemble: {e}")
+        return None
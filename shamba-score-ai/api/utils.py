@@ -8,12 +8,34 @@ import pandas as pd
 from typing import Dict, List, Tuple, Any
 import json
 import logging
+import warnings
 from datetime import datetime
 
+from features import FEATURE_GROUP
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# The contribution helpers below weight raw feature values by fixed
+# multipliers; they don't reflect the model. Real per-farmer contributions
+# come from explain.py (SHAP values, via InferenceCore.explain)
+_CONTRIBUTIONS_DEPRECATED = (
+    "{} returns fixed-weight heuristics, not model contributions, and will be removed; "
+    "use InferenceCore.explain or explain.top_contributing_factors (SHAP) instead"
+)
+
+RISK_TIERS = [
+    # (minimum score, category, loan_amount, interest_rate, approval_probability)
+    (85, "Excellent", 150000, 10.5, 0.98),
+    (75, "Very Good", 100000, 12.0, 0.95),
+    (65, "Good", 75000, 14.0, 0.88),
+    (55, "Fair", 50000, 16.5, 0.75),
+    (45, "Poor", 25000, 19.0, 0.60),
+    (35, "Very Poor", 15000, 22.0, 0.45),
+    (None, "High Risk", 10000, 25.0, 0.25),
+]
+
 def calculate_risk_category(score: float) -> Tuple[str, int, float, float]:
     """
     Calculate risk category and loan terms based on credit score
@@ -24,25 +46,18 @@ def calculate_risk_category(score: float) -> Tuple[str, int, float, float]:
     Returns:
         Tuple of (category, loan_amount, interest_rate, approval_probability)
     """
-    if score >= 85:
-        return "Excellent", 150000, 10.5, 0.98
-    elif score >= 75:
-        return "Very Good", 100000, 12.0, 0.95
-    elif score >= 65:
-        return "Good", 75000, 14.0, 0.88
-    elif score >= 55:
-        return "Fair", 50000, 16.5, 0.75
-    elif score >= 45:
-        return "Poor", 25000, 19.0, 0.60
-    elif score >= 35:
-        return "Very Poor", 15000, 22.0, 0.45
-    else:
-        return "High Risk", 10000, 25.0, 0.25
+    # A NaN score compares false against every minimum and lands in the last tier
+    for minimum, category, loan_amount, interest_rate, approval_prob in RISK_TIERS:
+        if minimum is None or score >= minimum:
+            return category, loan_amount, interest_rate, approval_prob
 
 def calculate_feature_contributions(features: Dict[str, float], weights: Dict[str, float] = None) -> List[Dict[str, Any]]:
     """
     Calculate individual feature contributions to credit score
     
+    Deprecated: fixed-weight heuristic, not the model's contributions. Use
+    InferenceCore.explain or explain.top_contributing_factors instead.
+    
     Args:
         features: Dictionary of feature values
         weights: Optional feature weights
@@ -50,6 +65,8 @@ def calculate_feature_contributions(features: Dict[str, float], weights: Dict[st
     Returns:
         List of contributing factors with scores
     """
+    warnings.warn(_CONTRIBUTIONS_DEPRECATED.format("calculate_feature_contributions"),
+                  DeprecationWarning, stacklevel=2)
     if weights is None:
         # Default weights based on model importance
         weights = {
@@ -103,18 +120,7 @@ def format_feature_name(feature: str) -> str:
 
 def get_feature_category(feature: str) -> str:
     """Get category for a feature"""
-    categories = {
-        "satellite": ["mean_ndvi", "ndvi_trend", "growing_season_match"],
-        "financial": ["transaction_velocity", "savings_rate", "loan_repayment_history"],
-        "community": ["cooperative_endorsement", "chama_participation", "neighbor_vouches"],
-        "agricultural": ["fertilizer_purchase_timing", "seed_quality_tier", "advisory_usage"],
-        "climate": ["drought_exposure_index", "rainfall_deviation", "temperature_anomaly"]
-    }
-    
-    for category, features in categories.items():
-        if feature in features:
-            return category
-    return "other"
+    return FEATURE_GROUP.get(feature, "other")
 
 def generate_improvement_suggestions(features: Dict[str, float], score: float) -> List[str]:
     """
@@ -171,6 +177,25 @@ def generate_improvement_suggestions(features: Dict[str, float], score: float) -
     
     return suggestions
 
+# Valid (min, max) range per feature, inclusive
+FEATURE_RANGES = {
+    "mean_ndvi": (0, 1),
+    "ndvi_trend": (-1, 1),
+    "growing_season_match": (0, 1),
+    "transaction_velocity": (0, 200),
+    "savings_rate": (0, 1),
+    "loan_repayment_history": (0, 1),
+    "cooperative_endorsement": (1, 5),
+    "chama_participation": (0, 1),
+    "neighbor_vouches": (0, 20),
+    "fertilizer_purchase_timing": (0, 1),
+    "seed_quality_tier": (1, 3),
+    "advisory_usage": (0, 1),
+    "drought_exposure_index": (0, 1),
+    "rainfall_deviation": (-50, 50),
+    "temperature_anomaly": (-10, 10)
+}
+
 def validate_feature_ranges(features: Dict[str, float]) -> Dict[str, str]:
     """
     Validate feature values are within expected ranges
@@ -183,28 +208,9 @@ def validate_feature_ranges(features: Dict[str, float]) -> Dict[str, str]:
     """
     errors = {}
     
-    # Define valid ranges
-    ranges = {
-        "mean_ndvi": (0, 1),
-        "ndvi_trend": (-1, 1),
-        "growing_season_match": (0, 1),
-        "transaction_velocity": (0, 200),
-        "savings_rate": (0, 1),
-        "loan_repayment_history": (0, 1),
-        "cooperative_endorsement": (1, 5),
-        "chama_participation": (0, 1),
-        "neighbor_vouches": (0, 20),
-        "fertilizer_purchase_timing": (0, 1),
-        "seed_quality_tier": (1, 3),
-        "advisory_usage": (0, 1),
-        "drought_exposure_index": (0, 1),
-        "rainfall_deviation": (-50, 50),
-        "temperature_anomaly": (-10, 10)
-    }
-    
     for feature, value in features.items():
-        if feature in ranges:
-            min_val, max_val = ranges[feature]
+        if feature in FEATURE_RANGES:
+            min_val, max_val = FEATURE_RANGES[feature]
             if not (min_val <= value <= max_val):
                 errors[feature] = f"Value {value} outside valid range [{min_val}, {max_val}]"
     
@@ -238,7 +244,8 @@ def calculate_confidence_score(features: Dict[str, float], model_uncertainty: fl
     
     return min(1.0, confidence)
 
-def log_prediction(farmer_id: str, features: Dict[str, float], score: float, timestamp: datetime = None):
+def log_prediction(farmer_id: str, features: Dict[str, float], score: float, timestamp: datetime = None,
+                   audit_log=None, **fields):
     """
     Log prediction for monitoring and audit purposes
     
@@ -247,6 +254,9 @@ def log_prediction(farmer_id: str, features: Dict[str, float], score: float, tim
         features: Input features
         score: Predicted score
         timestamp: Prediction timestamp
+        audit_log: Optional audit_log.AuditLog; the record is queued there
+            instead of being written to the application log
+        **fields: Extra fields for the record (model version, risk category, ...)
     """
     if timestamp is None:
         timestamp = datetime.now()
@@ -255,9 +265,14 @@ def log_prediction(farmer_id: str, features: Dict[str, float], score: float, tim
         "farmer_id": farmer_id,
         "timestamp": timestamp.isoformat(),
         "score": score,
-        "features": features
+        "features": features,
+        **fields
     }
     
+    if audit_log is not None:
+        audit_log.record(log_entry)
+        return
+    
     logger.info(f"Prediction logged: {json.dumps(log_entry)}")
 
 def format_currency(amount: int, currency: str = "KES") -> str:
@@ -278,4 +293,341 @@ def calculate_batch_statistics(scores: List[float]) -> Dict[str, float]:
         "max": np.max(scores),
         "q25": np.percentile(scores, 25),
         "q75": np.percentile(scores, 75)
-    }
\ No newline at end of file
+    }
+
+# Batch (array) helpers used by the vectorized scoring paths
+
+def calculate_risk_categories(scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Vectorized calculate_risk_category over an array of scores
+    
+    Args:
+        scores: Array of credit scores (0-100)
+        
+    Returns:
+        Tuple of arrays (categories, loan_amounts, interest_rates, approval_probabilities)
+    """
+    scores = np.asarray(scores, dtype=float)
+    
+    # Tiers ordered from lowest to highest so searchsorted gives the tier index
+    tiers = RISK_TIERS[::-1]
+    thresholds = np.array([t[0] for t in tiers[1:]], dtype=float)
+    idx = np.searchsorted(thresholds, scores, side="right")
+    # searchsorted sorts NaN past every threshold; band it like the scalar path does
+    idx[np.isnan(scores)] = 0
+    
+    categories = np.array([t[1] for t in tiers], dtype=object)
+    loan_amounts = np.array([t[2] for t in tiers], dtype=np.int64)
+    interest_rates = np.array([t[3] for t in tiers], dtype=float)
+    approval_probs = np.array([t[4] for t in tiers], dtype=float)
+    
+    return categories[idx], loan_amounts[idx], interest_rates[idx], approval_probs[idx]
+
+DEFAULT_CONTRIBUTION_WEIGHTS = {
+    "growing_season_match": 0.25,
+    "cooperative_endorsement": 0.20,
+    "loan_repayment_history": 0.15,
+    "savings_rate": 0.12,
+    "mean_ndvi": 0.10,
+    "chama_participation": 0.08,
+    "transaction_velocity": 0.05,
+    "fertilizer_purchase_timing": 0.05
+}
+
+def _round_tenths(values: np.ndarray) -> np.ndarray:
+    """
+    Python's round(value, 1) for every element of a float array
+    
+    np.round rounds the already-rounded product value * 10, so near a
+    decimal tie (x.x5) it can go the other way from round(), which works on
+    the exact binary value. Here value * 10 = 8v + 2v is summed with its
+    rounding error kept (TwoSum), which decides the side of the tie exactly.
+    """
+    eight = values * 8
+    two = values * 2
+    tenths = eight + two
+    back = tenths - eight
+    error = (eight - (tenths - back)) + (two - back)
+    
+    down = np.floor(tenths)
+    frac = tenths - down
+    # Off an exact .5 the error (under half an ulp) can't change the side
+    up = (frac > 0.5) | ((frac == 0.5) & ((error > 0) | ((error == 0) & (down % 2 == 1))))
+    return (down + up) / 10
+
+def calculate_feature_contributions_array(X: np.ndarray, feature_names: List[str],
+                                          weights: Dict[str, float] = None,
+                                          top_k: int = 5) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Array-out calculate_feature_contributions over a feature matrix
+    
+    Top-k is a partial sort (argpartition) on an integer key that orders by
+    contribution, then by column, so ties break the way the scalar
+    version's stable sort does. Rows must not contain NaN.
+    
+    Deprecated: the same fixed-weight heuristic as
+    calculate_feature_contributions; use InferenceCore.explain instead.
+    
+    Args:
+        X: Feature matrix (n_rows x n_features) in feature_names order
+        feature_names: Column names of X
+        weights: Optional feature weights
+        top_k: Number of factors to return per row
+        
+    Returns:
+        Tuple of (weighted feature names, factor index into them (n x k),
+        contributions (n x k), raw values (n x k)), best first
+    """
+    warnings.warn(_CONTRIBUTIONS_DEPRECATED.format("calculate_feature_contributions_array"),
+                  DeprecationWarning, stacklevel=2)
+    return _feature_contributions_array(X, feature_names, weights, top_k)
+
+def _feature_contributions_array(X: np.ndarray, feature_names: List[str], weights: Dict[str, float],
+                                 top_k: int) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+    if weights is None:
+        weights = DEFAULT_CONTRIBUTION_WEIGHTS
+    
+    X = np.asarray(X, dtype=float)
+    cols = [i for i, name in enumerate(feature_names) if name in weights]
+    names = [feature_names[i] for i in cols]
+    k = min(top_k, len(cols))
+    if k <= 0:
+        empty = np.empty((len(X), 0))
+        return names, empty.astype(np.intp), empty, empty
+    
+    raw = X[:, cols]
+    w = np.array([weights[name] for name in names], dtype=float)
+    contrib = _round_tenths(raw * w * 100)
+    
+    # Contributions have one decimal, so tenths are exact integers; the low
+    # digits carry the reversed column so earlier columns win ties
+    n_cols = len(cols)
+    key = np.rint(contrib * 10).astype(np.int64) * n_cols + (n_cols - 1 - np.arange(n_cols))
+    if k < n_cols:
+        top = np.argpartition(-key, k - 1, axis=1)[:, :k]
+    else:
+        top = np.broadcast_to(np.arange(n_cols), key.shape)
+    order = np.take_along_axis(top, np.argsort(-np.take_along_axis(key, top, axis=1), axis=1), axis=1)
+    
+    return (
+        names,
+        order,
+        np.take_along_axis(contrib, order, axis=1),
+        np.take_along_axis(raw, order, axis=1)
+    )
+
+def calculate_feature_contributions_batch(X: np.ndarray, feature_names: List[str],
+                                          weights: Dict[str, float] = None,
+                                          top_k: int = 5) -> List[List[Dict[str, Any]]]:
+    """
+    Vectorized calculate_feature_contributions over a feature matrix
+    
+    Deprecated: the same fixed-weight heuristic as
+    calculate_feature_contributions; use InferenceCore.explain instead.
+    
+    Args:
+        X: Feature matrix (n_rows x n_features) in feature_names order
+        feature_names: Column names of X
+        weights: Optional feature weights
+        top_k: Number of factors to return per row
+        
+    Returns:
+        List (one entry per row) of contributing factors with scores
+    """
+    warnings.warn(_CONTRIBUTIONS_DEPRECATED.format("calculate_feature_contributions_batch"),
+                  DeprecationWarning, stacklevel=2)
+    names, order, values, raw = _feature_contributions_array(X, feature_names, weights, top_k)
+    labels = [(format_feature_name(name), get_feature_category(name)) for name in names]
+    
+    return [
+        [
+            {
+                "factor": labels[c][0],
+                "contribution": value,
+                "category": labels[c][1],
+                "raw_value": raw_value
+            }
+            for c, value, raw_value in zip(row_order, row_values, row_raw)
+        ]
+        for row_order, row_values, row_raw in zip(order.tolist(), values.tolist(), raw.tolist())
+    ]
+
+# (feature, comparison, threshold, message) in generate_improvement_suggestions order;
+# a missing feature counts as 0 like features.get(name, 0)
+SUGGESTION_RULES = [
+    ("chama_participation", "eq", 0,
+     "Join a savings group (chama) to improve community trust (+8-12 points)"),
+    ("savings_rate", "lt", 0.2,
+     "Increase your savings rate to at least 20% of income (+5-8 points)"),
+    ("advisory_usage", "eq", 0,
+     "Utilize agricultural extension services for better farming practices (+3-5 points)"),
+    ("cooperative_endorsement", "lt", 4,
+     "Improve participation in farmer cooperatives (+4-7 points)"),
+    ("loan_repayment_history", "lt", 0.8,
+     "Maintain consistent loan repayments to build credit history (+10-15 points)"),
+    ("seed_quality_tier", "lt", 2,
+     "Invest in higher quality seeds for better crop yields (+2-4 points)"),
+    ("fertilizer_purchase_timing", "lt", 0.6,
+     "Improve timing of agricultural input purchases (+3-6 points)"),
+    ("mean_ndvi", "lt", 0.5,
+     "Consider drought-resistant crops or improved irrigation (+5-10 points)"),
+]
+
+# Suggestions kept per score band: (minimum score, limit), highest band first
+SUGGESTION_LIMITS = [(80, 2), (60, 4), (None, 6)]
+
+def generate_improvement_suggestion_codes(X: np.ndarray, feature_names: List[str],
+                                          scores: np.ndarray) -> Tuple[np.ndarray, List[Tuple[str, ...]]]:
+    """
+    Array-out generate_improvement_suggestions over a feature matrix
+    
+    Each row's fired rules and band limit are packed into one integer
+    code; the message tuple is built once per distinct code and shared by
+    every row with that code.
+    
+    Args:
+        X: Feature matrix (n_rows x n_features) in feature_names order
+        feature_names: Column names of X
+        scores: Array of credit scores
+        
+    Returns:
+        Tuple of (index per row into the lookup, lookup of message tuples)
+    """
+    X = np.asarray(X, dtype=float)
+    index = {name: i for i, name in enumerate(feature_names)}
+    zeros = np.zeros(len(X))
+    
+    code = np.zeros(len(X), dtype=np.int64)
+    for bit, (feature, comparison, threshold, _) in enumerate(SUGGESTION_RULES):
+        values = X[:, index[feature]] if feature in index else zeros
+        fired = values == threshold if comparison == "eq" else values < threshold
+        code |= fired.astype(np.int64) << bit
+    
+    scores = np.asarray(scores, dtype=float)
+    # Band index = number of band minimums the score falls below
+    band = np.zeros(len(scores), dtype=np.int64)
+    for minimum, _ in SUGGESTION_LIMITS[:-1]:
+        band += scores < minimum
+    code = code * len(SUGGESTION_LIMITS) + band
+    
+    unique_codes, inverse = np.unique(code, return_inverse=True)
+    lookup = []
+    for value in unique_codes.tolist():
+        fired, band_index = divmod(value, len(SUGGESTION_LIMITS))
+        messages = tuple(
+            rule[3] for bit, rule in enumerate(SUGGESTION_RULES) if fired >> bit & 1
+        )
+        lookup.append(messages[:SUGGESTION_LIMITS[band_index][1]])
+    
+    return inverse.ravel(), lookup
+
+def generate_improvement_suggestions_batch(X: np.ndarray, feature_names: List[str],
+                                           scores: np.ndarray) -> List[Tuple[str, ...]]:
+    """
+    Vectorized generate_improvement_suggestions over a feature matrix
+    
+    Args:
+        X: Feature matrix (n_rows x n_features) in feature_names order
+        feature_names: Column names of X
+        scores: Array of credit scores
+        
+    Returns:
+        List (one entry per row) of improvement suggestions; rows with the
+        same suggestions share one tuple
+    """
+    inverse, lookup = generate_improvement_suggestion_codes(X, feature_names, scores)
+    return [lookup[k] for k in inverse.tolist()]
+
+def validate_feature_matrix(X: np.ndarray, feature_names: List[str]) -> np.ndarray:
+    """
+    Vectorized validate_feature_ranges over a feature matrix
+    
+    Every column is checked against FEATURE_RANGES in one pass. NaN fails
+    its range, as it does in the scalar version.
+    
+    Args:
+        X: Feature matrix (n_rows x n_features) in feature_names order
+        feature_names: Column names of X (at most 63)
+        
+    Returns:
+        Per-row error bitmask (int64); bit j set means column j is out of
+        range, so failing rows are np.flatnonzero(mask)
+    """
+    if len(feature_names) > 63:
+        raise ValueError(f"Error bitmask holds at most 63 features, got {len(feature_names)}")
+    
+    X = np.asarray(X, dtype=float)
+    lo = np.array([FEATURE_RANGES.get(name, (-np.inf, np.inf))[0] for name in feature_names], dtype=float)
+    hi = np.array([FEATURE_RANGES.get(name, (-np.inf, np.inf))[1] for name in feature_names], dtype=float)
+    checked = np.array([name in FEATURE_RANGES for name in feature_names])
+    
+    invalid = ~((X >= lo) & (X <= hi)) & checked
+    bits = np.int64(1) << np.arange(len(feature_names), dtype=np.int64)
+    return invalid @ bits
+
+def feature_validation_errors(X: np.ndarray, feature_names: List[str], error_mask: np.ndarray,
+                              rows: List[int] = None) -> Dict[int, Dict[str, str]]:
+    """
+    Expand validate_feature_matrix bitmasks into validate_feature_ranges messages
+    
+    Args:
+        X: Feature matrix the mask was computed for
+        feature_names: Column names of X
+        error_mask: Bitmask from validate_feature_matrix
+        rows: Row indices to expand (default: every failing row)
+        
+    Returns:
+        Dictionary of row index -> {feature: message} for rows with errors
+    """
+    error_mask = np.asarray(error_mask)
+    if rows is None:
+        rows = np.flatnonzero(error_mask).tolist()
+    
+    errors = {}
+    for i in rows:
+        mask = int(error_mask[i])
+        if not mask:
+            continue
+        row = {}
+        for j, name in enumerate(feature_names):
+            if mask >> j & 1:
+                min_val, max_val = FEATURE_RANGES[name]
+                value = float(X[i, j])
+                # Requests send whole numbers as ints; print them as validate_feature_ranges would
+                if value.is_integer():
+                    value = int(value)
+                row[name] = f"Value {value} outside valid range [{min_val}, {max_val}]"
+        errors[i] = row
+    return errors
+
+def calculate_confidence_scores(X: np.ndarray, feature_names: List[str],
+                                model_uncertainty: float = 0.05) -> np.ndarray:
+    """
+    Vectorized calculate_confidence_score over a feature matrix
+    
+    Args:
+        X: Feature matrix (n_rows x n_features) in feature_names order
+        feature_names: Column names of X
+        model_uncertainty: Base model uncertainty
+        
+    Returns:
+        Array of confidence scores (0-1)
+    """
+    X = np.asarray(X, dtype=float)
+    confidence = np.full(len(X), 0.85)
+    
+    # Penalties are subtracted column by column in feature order, the same
+    # sequence of float operations as the scalar loop
+    for j, name in enumerate(feature_names):
+        values = X[:, j]
+        missing = np.isnan(values)
+        penalty = 0.1 * missing
+        if name == "mean_ndvi":
+            penalty += 0.05 * (~missing & ((values < 0.1) | (values > 0.95)))
+        elif name == "savings_rate":
+            penalty += 0.03 * (~missing & (values > 0.8))
+        if penalty.any():
+            confidence -= penalty
+    
+    confidence = np.maximum(0.1, confidence - model_uncertainty)
+    return np.minimum(1.0, confidence)
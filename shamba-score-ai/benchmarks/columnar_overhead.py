@@ -0,0 +1,139 @@
+"""
+Shamba Score: Batch Format Overhead
+Per-row cost of /predict/batch with a JSON body vs columnar .npy/.npz bodies
+
+Each format is timed end to end through httpx's ASGI transport (client
+encoding, request, validation, scoring, response encoding and client
+decoding) and compared with the model call alone on the same matrix;
+the difference is the per-row overhead of the format. JSON requests skip
+explanations so every format does the same work. The audit log and score
+history are off.
+
+    python benchmarks/columnar_overhead.py [--rows 1 100 10000 100000] [--repeat 5]
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import logging
+import os
+import sys
+import time
+
+os.environ.setdefault("SHAMBA_AUDIT_LOG", "0")
+os.environ.setdefault("SHAMBA_SCORE_STORE", "0")
+
+import httpx
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+API_DIR = os.path.join(ROOT, 'api')
+sys.path.insert(0, API_DIR)
+
+from features import FEATURE_GROUPS  # noqa: E402
+
+INT_FEATURES = {"transaction_velocity", "cooperative_endorsement", "chama_participation",
+                "neighbor_vouches", "seed_quality_tier", "advisory_usage"}
+
+
+def load_app():
+    import main
+    main.load_model()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    return main
+
+
+def sample_rows(feature_names, n, seed=0):
+    data = pd.read_csv(os.path.join(ROOT, 'farmers_training_data.csv'))[feature_names]
+    X = data.sample(n, replace=True, random_state=seed).to_numpy(float)
+    # Keep within the API's ranges (the CSV has a few outliers)
+    X[:, feature_names.index("neighbor_vouches")] = np.minimum(X[:, feature_names.index("neighbor_vouches")], 20)
+    return X
+
+
+def json_body(X, feature_names):
+    farmers = []
+    for row in X.tolist():
+        values = dict(zip(feature_names, row))
+        farmers.append({
+            group: {name: int(values[name]) if name in INT_FEATURES else values[name] for name in names}
+            for group, names in FEATURE_GROUPS.items()
+        })
+    return {"farmers": farmers, "include_explanations": False}
+
+
+async def run_format(client, fmt, X, feature_names):
+    """One request in the given format; returns the decoded scores"""
+    if fmt == "json":
+        response = await client.post('/predict/batch', json=json_body(X, feature_names))
+        return np.array([r["credit_score"] for r in response.json()["results"]])
+
+    out = io.BytesIO()
+    if fmt.startswith("npy"):
+        np.save(out, X)
+        content_type = "application/x-npy"
+    else:
+        np.savez(out, features=X)
+        content_type = "application/x-npz"
+    headers = {"content-type": content_type}
+    if fmt.endswith("npz"):
+        headers["accept"] = "application/x-npz"
+    response = await client.post('/predict/batch', content=out.getvalue(), headers=headers)
+    response.raise_for_status()
+    if response.headers["content-type"] == "application/x-npz":
+        return np.load(io.BytesIO(response.content))["credit_score"]
+    return np.array(response.json()["columns"]["credit_score"])
+
+
+async def benchmark(main, rows, repeat):
+    serving = main.model_registry.current
+    feature_names = serving.feature_names
+    formats = ["json", "npy->json", "npy->npz", "npz->npz"]
+
+    print(f"{'rows':>8} {'model us/row':>13} " + " ".join(f"{f + ' us/row':>15}" for f in formats))
+    print(f"{'':>8} {'':>13} " + " ".join(f"{'(overhead)':>15}" for _ in formats))
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url='http://bench',
+                                 timeout=None) as client:
+        for n in rows:
+            X = sample_rows(feature_names, n)
+            model_times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                expected = serving.predict_scores(X).round(1)
+                model_times.append(time.perf_counter() - start)
+            model = np.median(model_times) / n * 1e6
+
+            totals = []
+            for fmt in formats:
+                if fmt == "json" and n > 10_000:
+                    totals.append(None)
+                    continue
+                times = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    scores = await run_format(client, fmt, X, feature_names)
+                    times.append(time.perf_counter() - start)
+                assert np.array_equal(scores, expected), fmt
+                totals.append(np.median(times) / n * 1e6)
+
+            print(f"{n:>8,} {model:>13.2f} " + " ".join(
+                f"{'-':>15}" if t is None else f"{t:>15.2f}" for t in totals))
+            print(f"{'':>8} {'':>13} " + " ".join(
+                f"{'':>15}" if t is None else f"{'(' + format(t - model, '.2f') + ')':>15}" for t in totals))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-row overhead of the /predict/batch formats")
+    parser.add_argument('--rows', type=int, nargs='+', default=[1, 100, 10_000, 100_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    app_main = load_app()
+    print(json.dumps({"engine": app_main.INFERENCE_ENGINE, "model_version": app_main.model_registry.current.version}))
+    asyncio.run(benchmark(app_main, args.rows, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
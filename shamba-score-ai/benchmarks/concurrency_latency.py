@@ -0,0 +1,91 @@
+"""
+Shamba Score: Concurrency Latency Benchmark
+Measures /predict p50/p99 latency at several client concurrency levels
+
+Runs api/main.py in-process through httpx's ASGI transport, so no server
+is needed. Configure the service with the usual SHAMBA_* environment
+variables, e.g.
+
+    SHAMBA_INFERENCE_BACKEND=process python benchmarks/concurrency_latency.py
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+import httpx
+import numpy as np
+
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api')
+
+
+def load_app():
+    """Import api/main.py and load the model (ASGITransport doesn't run the lifespan hook)"""
+    sys.path.insert(0, API_DIR)
+    import main
+    main.load_model()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    return main.app
+
+
+async def run_level(app, concurrency, n_requests, seed=0):
+    """Send n_requests /predict calls with at most `concurrency` in flight"""
+    rng = np.random.default_rng(seed)
+    transport = httpx.ASGITransport(app=app)
+    latencies = []
+    errors = 0
+
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+        demo = list((await client.get('/demo')).json().values())
+        payloads = []
+        for i in range(n_requests):
+            farmer = dict(demo[i % len(demo)])
+            # Vary one feature so the prediction cache can't answer
+            farmer['rainfall_deviation'] = round(float(rng.normal(0, 10)), 4)
+            payloads.append(farmer)
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(payload):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post('/predict', json=payload)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*[one(p) for p in payloads])
+        elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1000
+    return {
+        "concurrency": concurrency,
+        "requests": n_requests,
+        "errors": errors,
+        "throughput_rps": n_requests / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99))
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure /predict latency under concurrency")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 16, 128])
+    parser.add_argument('--requests', type=int, default=1000, help="Requests per level")
+    args = parser.parse_args(argv)
+
+    app = load_app()
+    print(f"{'clients':>8} {'rps':>8} {'p50 (ms)':>10} {'p99 (ms)':>10} {'errors':>7}")
+    for level in args.concurrency:
+        result = asyncio.run(run_level(app, level, args.requests, seed=level))
+        print(f"{result['concurrency']:>8} {result['throughput_rps']:>8.0f} "
+              f"{result['p50_ms']:>10.2f} {result['p99_ms']:>10.2f} {result['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Shamba Score: Explanation Overhead Benchmark
+Cost of SHAP contributions relative to scoring, for batch sizes 1 to 10k
+
+Compares the tabulated TreeSHAP in api/explain.py with XGBoost's own
+pred_contribs, on rows drawn from farmers_training_data.csv.
+
+    python benchmarks/explanation_overhead.py [--sizes 1 10 100 1000 10000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'api'))
+
+from explain import TreeShapExplainer, XGBoostContribExplainer  # noqa: E402
+from model_loader import load_artifacts  # noqa: E402
+from tree_engine import TreeEnsemble  # noqa: E402
+
+
+def best_time(fn, X, min_seconds=0.2):
+    """Best-of-repeats wall time of fn(X) in seconds"""
+    fn(X)
+    best = float("inf")
+    spent = 0.0
+    while spent < min_seconds:
+        start = time.perf_counter()
+        fn(X)
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        spent += elapsed
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure SHAP explanation overhead")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 100, 1000, 10000])
+    args = parser.parse_args(argv)
+
+    artifacts = load_artifacts()
+    model, scaler, feature_names = artifacts.model, artifacts.scaler, artifacts.feature_names
+    ensemble = TreeEnsemble.from_xgboost(model, scaler)
+
+    start = time.perf_counter()
+    tree_shap = TreeShapExplainer(ensemble, feature_names)
+    print(f"TreeSHAP tables built in {(time.perf_counter() - start) * 1000:.1f} ms")
+    xgb_shap = XGBoostContribExplainer(model, scaler, feature_names)
+
+    data = pd.read_csv(os.path.join(ROOT, 'farmers_training_data.csv'))[feature_names].to_numpy(float)
+    rng = np.random.default_rng(0)
+
+    print(f"{'rows':>7} {'predict ms':>11} {'treeshap ms':>12} {'us/row':>8} "
+          f"{'xgb contribs ms':>16} {'us/row':>8} {'overhead x':>11}")
+    for n in args.sizes:
+        X = data[rng.integers(0, len(data), n)]
+        predict = best_time(lambda A: model.predict(scaler.transform(A)), X)
+        ours = best_time(tree_shap.shap_values, X)
+        theirs = best_time(xgb_shap.shap_values, X)
+        print(f"{n:>7} {predict * 1000:>11.3f} {ours * 1000:>12.3f} {ours / n * 1e6:>8.1f} "
+              f"{theirs * 1000:>16.3f} {theirs / n * 1e6:>8.1f} {ours / predict:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Shamba Score: NDJSON Ingest Throughput
+Uploads N farmer records to /predict/ingest (FastAPI, under uvicorn) or
+/api/batch-score/ingest (Flask, under the Werkzeug server) and reports
+records/s, time to the first result and the server's peak RSS
+
+The server runs in a subprocess so its peak RSS (VmHWM) covers the upload
+alone. The client sends the chunked upload from one thread while reading
+the streamed results on another, as a streaming ingest client has to:
+results start coming back long before the upload is finished.
+
+Records are resampled from farmers_training_data.csv. The audit log and
+score history are off unless --persist is given (then in a temp dir).
+
+    python benchmarks/ingest_throughput.py [--service fastapi|flask] [--records 1000000 100000]
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+API_DIR = os.path.join(ROOT, 'api')
+sys.path.insert(0, API_DIR)
+
+from inference_core import FLASK_FIELD_MAP  # noqa: E402
+from model_loader import MODELS_DIR  # noqa: E402
+
+SERVICES = {
+    "fastapi": {
+        "path": "/predict/ingest",
+        "command": [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+                    "--port", "{port}", "--log-level", "warning"],
+        "ready": "/ready"
+    },
+    "flask": {
+        "path": "/api/batch-score/ingest",
+        "command": [sys.executable, "-c",
+                    "import logging, shamba_score_api as s; logging.getLogger('werkzeug').setLevel(logging.ERROR); "
+                    "s.app.run(host='127.0.0.1', port={port}, threaded=True)"],
+        "ready": "/api/health"
+    }
+}
+
+BLOCK_RECORDS = 10_000
+
+
+def record_block(service, seed=0):
+    """NDJSON bytes for BLOCK_RECORDS records in the service's field names"""
+    with open(os.path.join(MODELS_DIR, 'feature_names.json'), 'r') as f:
+        feature_names = json.load(f)
+    data = pd.read_csv(os.path.join(ROOT, 'farmers_training_data.csv'))[feature_names]
+    rows = data.sample(BLOCK_RECORDS, replace=True, random_state=seed).to_dict('records')
+
+    lines = []
+    for i, row in enumerate(rows):
+        if service == "flask":
+            record = {'farmer_id': f"KE_{i:06d}"}
+            for feature, (field, _, scale, offset) in FLASK_FIELD_MAP.items():
+                record[field] = round((row[feature] - offset) / scale, 4)
+        else:
+            record = dict(row, farmer_id=f"KE_{i:06d}")
+        lines.append(json.dumps(record))
+    return ("\n".join(lines) + "\n").encode()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(service, port, env):
+    spec = SERVICES[service]
+    command = [part.replace("{port}", str(port)) for part in spec["command"]]
+    process = subprocess.Popen(command, cwd=API_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1) as s:
+                s.sendall(f"GET {spec['ready']} HTTP/1.1\r\nHost: bench\r\nConnection: close\r\n\r\n".encode())
+                if s.recv(64).split(b" ")[1:2] == [b"200"]:
+                    return process
+        except OSError:
+            pass
+        time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{service} server did not become ready")
+
+
+def peak_rss_mb(pid):
+    with open(f"/proc/{pid}/status", "r") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def upload(port, path, block, n_records):
+    """Chunked upload on a sender thread; count result lines as they stream back"""
+    sock = socket.create_connection(("127.0.0.1", port))
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    lines_per_block = block.count(b"\n")
+
+    def send():
+        sock.sendall(
+            f"POST {path} HTTP/1.1\r\nHost: bench\r\nContent-Type: application/x-ndjson\r\n"
+            "Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n".encode()
+        )
+        remaining = n_records
+        while remaining > 0:
+            data = block if remaining >= lines_per_block else b"".join(block.splitlines(True)[:remaining])
+            sock.sendall(b"%x\r\n%s\r\n" % (len(data), data))
+            remaining -= lines_per_block
+        sock.sendall(b"0\r\n\r\n")
+
+    start = time.perf_counter()
+    sender = threading.Thread(target=send, daemon=True)
+    sender.start()
+
+    reader = sock.makefile("rb")
+    status = reader.readline()
+    headers = {}
+    while True:
+        line = reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        key, _, value = line.decode().partition(":")
+        headers[key.strip().lower()] = value.strip()
+    chunked = headers.get("transfer-encoding", "").lower() == "chunked"
+
+    first_result = None
+    results = 0
+    summary = b""
+    while True:
+        if chunked:
+            size = int(reader.readline().split(b";")[0], 16)
+            if size == 0:
+                break
+            data = reader.read(size)
+            reader.readline()
+        else:
+            data = reader.read(1 << 16)
+            if not data:
+                break
+        if first_result is None:
+            first_result = time.perf_counter() - start
+        results += data.count(b"\n")
+        summary = (summary + data)[-4096:]
+    elapsed = time.perf_counter() - start
+    sender.join()
+    sock.close()
+
+    return {
+        "status": status.decode().strip(),
+        "result_lines": results,
+        "summary": json.loads(summary.rstrip(b"\n").rsplit(b"\n", 1)[-1]).get("summary"),
+        "first_result_s": first_result,
+        "elapsed_s": elapsed
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure NDJSON ingest throughput and memory")
+    parser.add_argument('--service', choices=sorted(SERVICES), nargs='+', default=["fastapi", "flask"])
+    parser.add_argument('--records', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--persist', action='store_true', help="Keep the audit log and score history on")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="shamba-ingest-")
+    env = dict(os.environ, SHAMBA_WARMUP="1")
+    if args.persist:
+        env.update(SHAMBA_AUDIT_LOG_DIR=os.path.join(workdir, "audit"),
+                   SHAMBA_SCORE_DB=os.path.join(workdir, "scores.sqlite3"))
+    else:
+        env.update(SHAMBA_AUDIT_LOG="0", SHAMBA_SCORE_STORE="0")
+
+    print(f"{'service':<8} {'records':>10} {'upload MB':>10} {'first s':>8} {'total s':>8} "
+          f"{'records/s':>10} {'idle RSS MB':>12} {'peak RSS MB':>12}")
+    for service in args.service:
+        block = record_block(service)
+        for n_records in args.records:
+            port = free_port()
+            process = start_server(service, port, env)
+            try:
+                idle = peak_rss_mb(process.pid)
+                result = upload(port, SERVICES[service]["path"], block, n_records)
+                peak = peak_rss_mb(process.pid)
+            finally:
+                process.terminate()
+                process.wait()
+
+            assert result["status"].endswith("200 OK"), result["status"]
+            assert result["result_lines"] == n_records + 1, result
+            upload_mb = n_records / BLOCK_RECORDS * len(block) / 1e6
+            print(f"{service:<8} {n_records:>10,} {upload_mb:>10.0f} {result['first_result_s']:>8.2f} "
+                  f"{result['elapsed_s']:>8.1f} {n_records / result['elapsed_s']:>10,.0f} "
+                  f"{idle:>12.0f} {peak:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""
+Shamba Score: Load Test
+Throughput, p50/p95/p99 latency and errors for both scoring APIs under
+configurable concurrency and batch sizes, with JSON baselines
+
+The FastAPI service (api/main.py) runs in-process through httpx's ASGI
+transport with up to `concurrency` requests in flight on one event loop.
+The Flask service (api/shamba_score_api.py) runs through its test client
+on `concurrency` threads. Batch size 1 hits the single-farmer endpoint
+(/predict, /api/score); larger sizes hit the batch endpoint
+(/predict/batch, /api/batch-score) with that many farmers per request.
+Payloads are drawn from generate_farmer_data, so nearly every request
+misses the prediction cache.
+
+Configure the services with the usual SHAMBA_* environment variables; the
+audit log and score history are off unless set. Save a baseline, then
+check later runs against it. A run fails (exit status 1) if any scenario's
+throughput drops, or its p95 latency grows, by more than --threshold, or
+if it has errors the baseline didn't:
+
+    python benchmarks/load_test.py --save-baseline benchmarks/baselines/local.json
+    python benchmarks/load_test.py --baseline benchmarks/baselines/local.json [--threshold 0.25]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+os.environ.setdefault("SHAMBA_AUDIT_LOG", "0")
+os.environ.setdefault("SHAMBA_SCORE_STORE", "0")
+
+import httpx
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+API_DIR = os.path.join(ROOT, 'api')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, API_DIR)
+
+from features import FEATURE_GROUPS, FEATURE_NAMES  # noqa: E402
+from generate_farmer_data import generate_farmer_chunk  # noqa: E402
+from inference_core import FLASK_FIELD_MAP  # noqa: E402
+
+SERVICES = ("fastapi", "flask")
+
+ENDPOINTS = {
+    ("fastapi", False): "/predict",
+    ("fastapi", True): "/predict/batch",
+    ("flask", False): "/api/score",
+    ("flask", True): "/api/batch-score"
+}
+
+# Metrics gated against the baseline: name -> True if higher is better
+GATED_METRICS = {"throughput_rps": True, "p95_ms": False}
+
+
+def generate_farmers(n, seed=0):
+    """n farmer records (farmer_id plus the model features) from generate_farmer_data"""
+    data = generate_farmer_chunk(n, np.random.default_rng(seed))
+    # Keep within the API's ranges (the Poisson draws have a long tail)
+    data["neighbor_vouches"] = data["neighbor_vouches"].clip(upper=20)
+    return data[["farmer_id"] + FEATURE_NAMES].to_dict("records")
+
+
+def fastapi_farmer(record):
+    return {name: record[name] for name in ["farmer_id"] + FEATURE_NAMES}
+
+
+def flask_farmer(record):
+    farmer = {"farmer_id": record["farmer_id"]}
+    for feature, (field, _, scale, offset) in FLASK_FIELD_MAP.items():
+        farmer[field] = round((float(record[feature]) - offset) / scale, 4)
+    return farmer
+
+
+def make_payloads(service, batch_size, n_requests, seed=0):
+    """Request bodies for one scenario"""
+    records = generate_farmers(batch_size * n_requests, seed=seed)
+    if service == "fastapi":
+        farmers = [fastapi_farmer(record) for record in records]
+        if batch_size == 1:
+            return farmers
+        grouped = [{group: {name: farmer[name] for name in names} for group, names in FEATURE_GROUPS.items()}
+                   for farmer in farmers]
+        return [{"farmers": grouped[i:i + batch_size], "include_explanations": False}
+                for i in range(0, len(grouped), batch_size)]
+
+    farmers = [flask_farmer(record) for record in records]
+    if batch_size == 1:
+        return farmers
+    return [{"farmers": farmers[i:i + batch_size]} for i in range(0, len(farmers), batch_size)]
+
+
+def summarize(latencies, errors, elapsed, batch_size):
+    latencies = np.array(latencies) * 1000
+    n_requests = len(latencies)
+    return {
+        "requests": n_requests,
+        "errors": errors,
+        "error_rate": errors / n_requests if n_requests else 0.0,
+        "throughput_rps": n_requests / elapsed,
+        "farmers_per_s": n_requests * batch_size / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99))
+    }
+
+
+async def run_fastapi(app, path, payloads, warmup, concurrency, batch_size):
+    """Send the warm-up payloads, then time the payloads with at most `concurrency` in flight"""
+    latencies = []
+    errors = 0
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://bench',
+                                 timeout=None) as client:
+        for payload in warmup:
+            await client.post(path, json=payload)
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(payload):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(path, json=payload)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*[one(p) for p in payloads])
+        elapsed = time.perf_counter() - start
+
+    return summarize(latencies, errors, elapsed, batch_size)
+
+
+def run_flask(app, path, payloads, warmup, concurrency, batch_size):
+    """Send the warm-up payloads, then time the payloads from `concurrency` threads (one test client each)"""
+    local = threading.local()
+    lock = threading.Lock()
+    latencies = []
+    errors = 0
+
+    def one(payload):
+        nonlocal errors
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app.test_client()
+        start = time.perf_counter()
+        response = client.post(path, json=payload)
+        latency = time.perf_counter() - start
+        with lock:
+            latencies.append(latency)
+            if response.status_code != 200:
+                errors += 1
+
+    warmup_client = app.test_client()
+    for payload in warmup:
+        warmup_client.post(path, json=payload)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start = time.perf_counter()
+        list(pool.map(one, payloads))
+        elapsed = time.perf_counter() - start
+
+    return summarize(latencies, errors, elapsed, batch_size)
+
+
+def load_service(service):
+    if service == "fastapi":
+        import main
+        main.load_model()
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+        return main.app
+    import shamba_score_api
+    return shamba_score_api.app
+
+
+def scenario_key(service, batch_size, concurrency):
+    return f"{service} {ENDPOINTS[(service, batch_size > 1)]} batch={batch_size} concurrency={concurrency}"
+
+
+def run_scenarios(services, batch_sizes, concurrency_levels, n_requests, n_batch_requests, warmup, seed=0):
+    """Run every (service, batch size, concurrency) scenario; returns key -> metrics"""
+    results = {}
+    for service in services:
+        app = load_service(service)
+        for batch_size in batch_sizes:
+            path = ENDPOINTS[(service, batch_size > 1)]
+            count = n_requests if batch_size == 1 else n_batch_requests
+            for concurrency in concurrency_levels:
+                # Fresh farmers per scenario so earlier scenarios don't warm the prediction cache
+                payloads = make_payloads(service, batch_size, warmup + count, seed=seed + concurrency)
+                run = run_fastapi if service == "fastapi" else run_flask
+                result = run(app, path, payloads[warmup:], payloads[:warmup], concurrency, batch_size)
+                if service == "fastapi":
+                    result = asyncio.run(result)
+                key = scenario_key(service, batch_size, concurrency)
+                results[key] = result
+                print_result(key, result)
+    return results
+
+
+def machine_info():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "shamba_env": {k: v for k, v in sorted(os.environ.items()) if k.startswith("SHAMBA_")}
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Regressions of results against a baseline's results
+
+    Returns:
+        List of (scenario, metric, baseline value, current value) for every
+        gated metric worse than the baseline by more than threshold, and
+        for every scenario with errors the baseline didn't have
+    """
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        for metric, higher_is_better in GATED_METRICS.items():
+            before, after = previous[metric], current[metric]
+            if higher_is_better:
+                worse = after < before * (1 - threshold)
+            else:
+                worse = after > before * (1 + threshold)
+            if worse:
+                regressions.append((key, metric, before, after))
+        if current["error_rate"] > previous["error_rate"]:
+            regressions.append((key, "error_rate", previous["error_rate"], current["error_rate"]))
+    return regressions
+
+
+def print_header():
+    print(f"{'scenario':<52} {'req/s':>8} {'farmers/s':>10} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'errors':>7}")
+
+
+def print_result(key, result):
+    print(f"{key:<52} {result['throughput_rps']:>8.1f} {result['farmers_per_s']:>10.0f} "
+          f"{result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f} "
+          f"{result['errors']:>7}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the FastAPI and Flask scoring services")
+    parser.add_argument('--services', nargs='+', choices=SERVICES, default=list(SERVICES))
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 16])
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 100],
+                        help="Farmers per request (1 = single-farmer endpoint)")
+    parser.add_argument('--requests', type=int, default=500, help="Requests per single-farmer scenario")
+    parser.add_argument('--batch-requests', type=int, default=50, help="Requests per batch scenario")
+    parser.add_argument('--warmup', type=int, default=20, help="Unmeasured requests before each scenario")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save-baseline', metavar='PATH', help="Write the results as a JSON baseline")
+    parser.add_argument('--baseline', metavar='PATH', help="Fail if the run regresses against this baseline")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="Allowed relative regression in throughput and p95 latency")
+    parser.add_argument('--output', metavar='PATH', help="Write the results as JSON")
+    args = parser.parse_args(argv)
+
+    print_header()
+    results = run_scenarios(args.services, args.batch_sizes, args.concurrency, args.requests,
+                            args.batch_requests, args.warmup, seed=args.seed)
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "machine": machine_info(),
+        "settings": {k: getattr(args, k) for k in ("requests", "batch_requests", "warmup", "seed")},
+        "results": results
+    }
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {path}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        if baseline["machine"]["cpu_count"] != report["machine"]["cpu_count"] or \
+                baseline["settings"] != report["settings"]:
+            print("Warning: baseline was recorded on a different machine or with different settings")
+        missing = sorted(set(results) - set(baseline["results"]))
+        if missing:
+            print(f"Not in the baseline (not checked): {missing}")
+        regressions = compare(results, baseline["results"], args.threshold)
+        if regressions:
+            print(f"\nRegressions beyond {args.threshold:.0%} against {args.baseline}:")
+            for key, metric, before, after in regressions:
+                print(f"  {key}: {metric} {before:.4g} -> {after:.4g}")
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+"""
+Shamba Score: Microbenchmarks
+Where the time goes inside a score: the inference kernel (scaler, model,
+explainer) at batch sizes 1 to 100k, the /predict contribution and
+suggestion code, every api/utils.py helper and Pydantic request parsing
+
+Each case is warmed up, then timed with timeit (garbage collection off
+during timing): the loop count is calibrated so one repeat takes at least
+--min-time, and the per-call min/median/mean/stdev over --repeat repeats
+are recorded. Inputs come from generate_farmer_data with a fixed --seed.
+--cpus pins the process to the given CPUs and --threads sets the model's
+thread count. Results are saved with the machine's details (CPU, governor,
+affinity, package versions, git commit, SHAMBA_* settings) so two runs can
+be diffed:
+
+    python benchmarks/microbench.py --cpus 2 --threads 1 --output before.json
+    python benchmarks/microbench.py --cpus 2 --threads 1 --output after.json
+    python benchmarks/microbench.py --compare before.json after.json [--threshold 0.1]
+
+--filter runs the cases whose name contains any of the given strings;
+--list prints the case names.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+import warnings
+from datetime import datetime
+from importlib import metadata
+
+os.environ.setdefault("SHAMBA_AUDIT_LOG", "0")
+os.environ.setdefault("SHAMBA_SCORE_STORE", "0")
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+API_DIR = os.path.join(ROOT, 'api')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, API_DIR)
+
+import utils  # noqa: E402
+from explain import top_contributing_factors  # noqa: E402
+from features import FEATURE_GROUPS, FEATURE_NAMES  # noqa: E402
+from generate_farmer_data import generate_farmer_chunk  # noqa: E402
+from inference_core import core_from_env  # noqa: E402
+from inference_executor import set_model_threads  # noqa: E402
+from main import FarmerFeatures  # noqa: E402
+from schemas import CreditScoreRequest  # noqa: E402
+
+BATCH_SIZES = [1, 10, 100, 1_000, 10_000, 100_000]
+
+PACKAGES = ["numpy", "pandas", "scikit-learn", "xgboost", "pydantic", "fastapi"]
+
+INT_FEATURES = {"transaction_velocity", "cooperative_endorsement", "chama_participation",
+                "neighbor_vouches", "seed_quality_tier", "advisory_usage"}
+
+
+class _ListAuditLog:
+    """Stand-in audit log that keeps records in memory"""
+
+    def __init__(self):
+        self.records = []
+
+    def record(self, entry):
+        self.records.append(entry)
+        if len(self.records) > 10_000:
+            self.records.clear()
+
+
+def make_inputs(max_rows, seed):
+    """Feature matrix and scores drawn from generate_farmer_data"""
+    data = generate_farmer_chunk(max_rows, np.random.default_rng(seed))
+    data["neighbor_vouches"] = data["neighbor_vouches"].clip(upper=20)
+    X = data[FEATURE_NAMES].to_numpy(float)
+    scores = data["credit_score"].to_numpy(float)
+    return X, scores
+
+
+def build_cases(core, X, scores, batch_sizes, shap_max_rows):
+    """(name, rows per call, fn) for every case"""
+    feature_names = core.feature_names
+    row = dict(zip(feature_names, X[0].tolist()))
+    request_row = {name: int(row[name]) if name in INT_FEATURES else row[name] for name in feature_names}
+    grouped_row = {group: {name: request_row[name] for name in names} for group, names in FEATURE_GROUPS.items()}
+    shap_row = core.explainer.shap_values(X[:1])
+    audit_log = _ListAuditLog()
+    score = float(scores[0])
+    cases = []
+
+    # Inference kernel
+    for n in batch_sizes:
+        Xn = X[:n]
+        scaled = core.scaler.transform(Xn)
+        cases += [
+            (f"kernel: scaler.transform [n={n}]", n, lambda Xn=Xn: core.scaler.transform(Xn)),
+            (f"kernel: model.predict [n={n}]", n, lambda scaled=scaled: core.model.predict(scaled)),
+            (f"kernel: predict_scores [n={n}]", n, lambda Xn=Xn: core.predict_scores(Xn)),
+        ]
+        if n <= shap_max_rows:
+            cases.append((f"kernel: explainer.shap_values [n={n}]", n,
+                          lambda Xn=Xn: core.explainer.shap_values(Xn)))
+
+    # /predict (predict_credit_score) contributions for one farmer; its
+    # suggestions are utils.generate_improvement_suggestions below
+    cases += [
+        ("predict: top_contributing_factors", 1,
+         lambda: top_contributing_factors(shap_row, X[:1], feature_names, top_k=3)),
+    ]
+
+    # api/utils.py, one farmer
+    cases += [
+        ("utils: calculate_risk_category", 1, lambda: utils.calculate_risk_category(score)),
+        ("utils: calculate_feature_contributions", 1, lambda: utils.calculate_feature_contributions(row)),
+        ("utils: format_feature_name", 1, lambda: utils.format_feature_name("neighbor_vouches")),
+        ("utils: get_feature_category", 1, lambda: utils.get_feature_category("neighbor_vouches")),
+        ("utils: generate_improvement_suggestions", 1,
+         lambda: utils.generate_improvement_suggestions(row, score)),
+        ("utils: validate_feature_ranges", 1, lambda: utils.validate_feature_ranges(row)),
+        ("utils: calculate_confidence_score", 1, lambda: utils.calculate_confidence_score(row)),
+        ("utils: log_prediction (application log)", 1, lambda: utils.log_prediction("KE_1", row, score)),
+        ("utils: log_prediction (audit log)", 1,
+         lambda: utils.log_prediction("KE_1", row, score, audit_log=audit_log)),
+        ("utils: format_currency", 1, lambda: utils.format_currency(150000)),
+    ]
+
+    # api/utils.py, batch helpers
+    for n in batch_sizes:
+        Xn, scores_n = X[:n], scores[:n]
+        score_list = scores_n.tolist()
+        # 1% of rows out of range, so there are errors to expand
+        invalid = Xn.copy()
+        invalid[::100, feature_names.index("mean_ndvi")] = 2.0
+        error_mask = utils.validate_feature_matrix(invalid, feature_names)
+        cases += [
+            (f"utils: calculate_batch_statistics [n={n}]", n,
+             lambda score_list=score_list: utils.calculate_batch_statistics(score_list)),
+            (f"utils: calculate_risk_categories [n={n}]", n,
+             lambda scores_n=scores_n: utils.calculate_risk_categories(scores_n)),
+            (f"utils: calculate_feature_contributions_array [n={n}]", n,
+             lambda Xn=Xn: utils.calculate_feature_contributions_array(Xn, feature_names)),
+            (f"utils: calculate_feature_contributions_batch [n={n}]", n,
+             lambda Xn=Xn: utils.calculate_feature_contributions_batch(Xn, feature_names)),
+            (f"utils: generate_improvement_suggestion_codes [n={n}]", n,
+             lambda Xn=Xn, scores_n=scores_n: utils.generate_improvement_suggestion_codes(Xn, feature_names,
+                                                                                          scores_n)),
+            (f"utils: generate_improvement_suggestions_batch [n={n}]", n,
+             lambda Xn=Xn, scores_n=scores_n: utils.generate_improvement_suggestions_batch(Xn, feature_names,
+                                                                                           scores_n)),
+            (f"utils: validate_feature_matrix [n={n}]", n,
+             lambda Xn=Xn: utils.validate_feature_matrix(Xn, feature_names)),
+            (f"utils: feature_validation_errors [n={n}]", n,
+             lambda invalid=invalid, error_mask=error_mask: utils.feature_validation_errors(invalid, feature_names,
+                                                                                           error_mask)),
+            (f"utils: calculate_confidence_scores [n={n}]", n,
+             lambda Xn=Xn: utils.calculate_confidence_scores(Xn, feature_names)),
+        ]
+
+    # Pydantic request parsing
+    request_json = json.dumps(request_row).encode()
+    grouped_json = json.dumps(grouped_row).encode()
+    cases += [
+        ("pydantic: FarmerFeatures.model_validate", 1, lambda: FarmerFeatures.model_validate(request_row)),
+        ("pydantic: FarmerFeatures.model_validate_json", 1,
+         lambda: FarmerFeatures.model_validate_json(request_json)),
+        ("pydantic: CreditScoreRequest.model_validate", 1,
+         lambda: CreditScoreRequest.model_validate(grouped_row)),
+        ("pydantic: CreditScoreRequest.model_validate_json", 1,
+         lambda: CreditScoreRequest.model_validate_json(grouped_json)),
+    ]
+    return cases
+
+
+def measure(fn, repeat, min_time, warmup):
+    """Per-call timings of fn (seconds)"""
+    deadline = time.perf_counter() + warmup
+    fn()
+    while time.perf_counter() < deadline:
+        fn()
+
+    timer = timeit.Timer(fn)
+    number = 1
+    while True:
+        if timer.timeit(number) >= min_time:
+            break
+        number *= 2 if number < 8 else 4
+    per_call = [t / number for t in timer.repeat(repeat, number)]
+    return {
+        "loops": number,
+        "repeat": repeat,
+        "min_s": min(per_call),
+        "median_s": statistics.median(per_call),
+        "mean_s": statistics.fmean(per_call),
+        "stdev_s": statistics.stdev(per_call) if repeat > 1 else 0.0
+    }
+
+
+def _read(path):
+    try:
+        with open(path, 'r') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def machine_info(core, args):
+    cpu_model = None
+    for line in (_read('/proc/cpuinfo') or "").splitlines():
+        if line.startswith("model name"):
+            cpu_model = line.split(":", 1)[1].strip()
+            break
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+
+    versions = {}
+    for package in PACKAGES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": f"{platform.python_implementation()} {platform.python_version()}",
+        "platform": platform.platform(),
+        "cpu_model": cpu_model or platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "cpu_affinity": sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else None,
+        "cpu_governor": _read('/sys/devices/system/cpu/cpu0/cpufreq/scaling_governor'),
+        "packages": versions,
+        "git_commit": commit,
+        "model_version": core.version,
+        "inference_engine": core.engine,
+        "shamba_env": {k: v for k, v in sorted(os.environ.items()) if k.startswith("SHAMBA_")},
+        "settings": {k: getattr(args, k) for k in ("seed", "repeat", "min_time", "warmup", "threads", "cpus")}
+    }
+
+
+def format_time(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds / 1e-9:.3g} ns"
+
+
+def compare(base_path, new_path, threshold):
+    """Print the per-case median change from base_path to new_path"""
+    with open(base_path, 'r') as f:
+        base = json.load(f)
+    with open(new_path, 'r') as f:
+        new = json.load(f)
+
+    for key in ("cpu_model", "cpu_affinity", "cpu_governor", "python", "packages", "settings", "model_version"):
+        if base["machine"].get(key) != new["machine"].get(key):
+            print(f"Warning: {key} differs: {base['machine'].get(key)} -> {new['machine'].get(key)}")
+    print(f"{base_path} ({base['machine'].get('git_commit')}) -> {new_path} ({new['machine'].get('git_commit')})")
+
+    print(f"{'case':<60} {'before':>10} {'after':>10} {'change':>8}")
+    slower = faster = 0
+    for name, after in new["results"].items():
+        before = base["results"].get(name)
+        if before is None:
+            print(f"{name:<60} {'-':>10} {format_time(after['median_s']):>10}")
+            continue
+        change = after["median_s"] / before["median_s"] - 1
+        mark = ""
+        if change > threshold:
+            mark, slower = "  slower", slower + 1
+        elif change < -threshold:
+            mark, faster = "  faster", faster + 1
+        print(f"{name:<60} {format_time(before['median_s']):>10} {format_time(after['median_s']):>10} "
+              f"{change:>+7.1%}{mark}")
+    for name in sorted(base["results"].keys() - new["results"].keys()):
+        print(f"{name:<60} {format_time(base['results'][name]['median_s']):>10} {'-':>10}")
+    print(f"{slower} slower, {faster} faster beyond {threshold:.0%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Microbenchmarks for the scoring kernel and helpers")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=BATCH_SIZES)
+    parser.add_argument('--shap-max-rows', type=int, default=10_000,
+                        help="Largest batch size for explainer.shap_values")
+    parser.add_argument('--filter', nargs='+', help="Run cases whose name contains any of these")
+    parser.add_argument('--list', action='store_true', help="List the case names and exit")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--min-time', type=float, default=0.05, help="Minimum seconds per repeat")
+    parser.add_argument('--warmup', type=float, default=0.1, help="Seconds of warm-up calls per case")
+    parser.add_argument('--cpus', type=int, nargs='+', help="Pin the process to these CPUs")
+    parser.add_argument('--threads', type=int, help="Model thread count (default: the service's setting)")
+    parser.add_argument('--output', metavar='PATH', help="Write the results as JSON")
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help="Diff two result files and exit")
+    parser.add_argument('--threshold', type=float, default=0.1, help="Change reported as slower/faster")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare, args.threshold)
+        return
+
+    if args.cpus:
+        os.sched_setaffinity(0, args.cpus)
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+    # The fixed-weight contribution helpers are deprecated but still timed
+    warnings.filterwarnings("ignore", category=DeprecationWarning, message="calculate_feature_contributions")
+    logging.getLogger(utils.__name__).setLevel(logging.WARNING)
+
+    core = core_from_env(explain=True)
+    if args.threads:
+        set_model_threads(core.model, args.threads)
+    X, scores = make_inputs(max(args.batch_sizes), args.seed)
+    cases = build_cases(core, X, scores, sorted(args.batch_sizes), args.shap_max_rows)
+    if args.filter:
+        cases = [case for case in cases if any(f in case[0] for f in args.filter)]
+    if args.list:
+        print("\n".join(name for name, _, _ in cases))
+        return
+
+    info = machine_info(core, args)
+    print(json.dumps({k: info[k] for k in ("cpu_model", "cpu_affinity", "python", "git_commit", "model_version")}))
+    print(f"{'case':<60} {'median':>10} {'min':>10} {'stdev':>8} {'per row':>10}")
+    results = {}
+    for name, rows, fn in cases:
+        result = measure(fn, args.repeat, args.min_time, args.warmup)
+        result["rows"] = rows
+        result["median_per_row_s"] = result["median_s"] / rows
+        results[name] = result
+        print(f"{name:<60} {format_time(result['median_s']):>10} {format_time(result['min_s']):>10} "
+              f"{result['stdev_s'] / result['median_s']:>7.1%} {format_time(result['median_per_row_s']):>10}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"machine": info, "results": results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
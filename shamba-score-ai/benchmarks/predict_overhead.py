@@ -0,0 +1,133 @@
+"""
+Shamba Score: /predict Framework Overhead
+Per-request cost of the Pydantic /predict path vs the fast path (fast_path.py)
+
+Requests go one at a time through httpx's ASGI transport. "cached" repeats
+one body, so the prediction cache answers and the time is all framework:
+decoding, validation, cache lookup and encoding. "scored" varies one
+feature per request, so every request also runs the model and TreeSHAP;
+"model" is that scoring call on its own. The component rows time each
+step of the two paths in isolation.
+
+    python benchmarks/predict_overhead.py [--requests 3000]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+import timeit
+
+os.environ.setdefault("SHAMBA_AUDIT_LOG", "0")
+os.environ.setdefault("SHAMBA_SCORE_STORE", "0")
+
+import httpx
+import numpy as np
+
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api')
+
+
+def load_app():
+    sys.path.insert(0, API_DIR)
+    import main
+    main.load_model()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    return main
+
+
+async def time_requests(client, bodies):
+    latencies = []
+    for body in bodies:
+        start = time.perf_counter()
+        response = await client.post('/predict', content=body, headers={"content-type": "application/json"})
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.text
+    return np.array(latencies) * 1e6
+
+
+def component_times(main, body, response, n=20000):
+    """Microseconds per call for each step of the two paths"""
+    from fast_path import dumps, feature_validator, loads
+    from fastapi.encoders import jsonable_encoder
+
+    serving = main.model_registry.current
+    validator = feature_validator(main.FarmerFeatures, tuple(serving.feature_names))
+    data = json.loads(body)
+    features = main.FarmerFeatures(**data)
+
+    def pydantic_response():
+        model = main.CreditScoreResponse(**response)
+        return json.dumps(jsonable_encoder(model), ensure_ascii=False, allow_nan=False,
+                          separators=(",", ":")).encode()
+
+    steps = [
+        ("decode: json.loads", lambda: json.loads(body)),
+        ("decode: fast loads", lambda: loads(body)),
+        ("validate: FarmerFeatures", lambda: main.FarmerFeatures.model_validate(data)),
+        ("validate: fast validator", lambda: validator(data)),
+        ("features: getattr list", lambda: main.farmer_feature_values(features, serving.feature_names)),
+        ("encode: response_model + json", pydantic_response),
+        ("encode: fast dumps", lambda: dumps(response)),
+    ]
+    return [(name, timeit.timeit(fn, number=n) / n * 1e6) for name, fn in steps]
+
+
+async def benchmark(main, n_requests):
+    profile = dict(next(iter(main.DEMO_PROFILES.values())))
+    rng = np.random.default_rng(0)
+    cached = [json.dumps(profile).encode()] * n_requests
+
+    serving = main.model_registry.current
+    results = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url='http://bench') as client:
+        for fast in (False, True):
+            main.FAST_PREDICT = fast
+            label = "fast" if fast else "pydantic"
+            await time_requests(client, cached[:200])
+            results[("cached", label)] = await time_requests(client, cached)
+
+            scored = [json.dumps(dict(profile, rainfall_deviation=float(rng.uniform(-40, 40)))).encode()
+                      for _ in range(n_requests)]
+            results[("scored", label)] = await time_requests(client, scored)
+        response = (await client.post('/predict', content=cached[0],
+                                      headers={"content-type": "application/json"})).json()
+
+    X = np.array([[profile[name] for name in serving.feature_names]], dtype=float)
+    model = []
+    for _ in range(n_requests):
+        X[0, serving.feature_names.index("rainfall_deviation")] = rng.uniform(-40, 40)
+        start = time.perf_counter()
+        await serving.predict_and_explain(X)
+        model.append(time.perf_counter() - start)
+    model = np.array(model) * 1e6
+
+    print(f"{'path':<28} {'mean us':>9} {'p50 us':>9} {'p99 us':>9}")
+    for (kind, label), latencies in results.items():
+        print(f"{kind + ' / ' + label:<28} {latencies.mean():>9.1f} {np.percentile(latencies, 50):>9.1f} "
+              f"{np.percentile(latencies, 99):>9.1f}")
+    print(f"{'model (score + explain)':<28} {model.mean():>9.1f} {np.percentile(model, 50):>9.1f} "
+          f"{np.percentile(model, 99):>9.1f}")
+    for kind in ("cached", "scored"):
+        slow, fast = results[(kind, "pydantic")].mean(), results[(kind, "fast")].mean()
+        print(f"{kind}: {slow - fast:.1f} us saved per request ({slow / fast:.2f}x)")
+    return cached[0], response
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-request framework overhead of /predict")
+    parser.add_argument('--requests', type=int, default=3000)
+    args = parser.parse_args(argv)
+
+    app_main = load_app()
+    body, response = asyncio.run(benchmark(app_main, args.requests))
+
+    print(f"\n{'component':<32} {'us/call':>8}")
+    for name, us in component_times(app_main, body, response):
+        print(f"{name:<32} {us:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
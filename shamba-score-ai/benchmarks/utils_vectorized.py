@@ -0,0 +1,100 @@
+"""
+Shamba Score: Vectorized Utils Benchmark
+Scalar utils helpers vs their array versions, at up to 1M rows
+
+Rows are resampled from farmers_training_data.csv. The scalar helpers are
+timed on --scalar-rows rows and extrapolated linearly, and their output is
+checked against the array versions on those rows.
+
+    python benchmarks/utils_vectorized.py [--rows 1000000] [--scalar-rows 20000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'api'))
+
+from model_loader import MODELS_DIR  # noqa: E402
+from utils import (  # noqa: E402
+    calculate_feature_contributions,
+    calculate_feature_contributions_array,
+    calculate_feature_contributions_batch,
+    calculate_risk_categories,
+    calculate_risk_category,
+    generate_improvement_suggestion_codes,
+    generate_improvement_suggestions,
+    generate_improvement_suggestions_batch
+)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized utils helpers")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--scalar-rows', type=int, default=20_000)
+    args = parser.parse_args(argv)
+    # The fixed-weight contribution helpers are deprecated but still timed
+    warnings.filterwarnings("ignore", category=DeprecationWarning, message="calculate_feature_contributions")
+
+    with open(os.path.join(MODELS_DIR, 'feature_names.json'), 'r') as f:
+        feature_names = json.load(f)
+    data = pd.read_csv(os.path.join(ROOT, 'farmers_training_data.csv'))[feature_names].to_numpy(float)
+    rng = np.random.default_rng(0)
+    X = data[rng.integers(0, len(data), args.rows)]
+    scores = np.round(rng.uniform(0, 100, args.rows), 1)
+
+    n_scalar = min(args.scalar_rows, args.rows)
+    rows = [dict(zip(feature_names, row)) for row in X[:n_scalar].tolist()]
+    scale = args.rows / n_scalar
+
+    cases = [
+        ("risk banding",
+         lambda: [calculate_risk_category(s) for s in scores[:n_scalar].tolist()],
+         lambda: calculate_risk_categories(scores),
+         None),
+        ("contributions",
+         lambda: [calculate_feature_contributions(row) for row in rows],
+         lambda: calculate_feature_contributions_array(X, feature_names),
+         lambda: calculate_feature_contributions_batch(X, feature_names)),
+        ("suggestions",
+         lambda: [generate_improvement_suggestions(row, s) for row, s in zip(rows, scores[:n_scalar].tolist())],
+         lambda: generate_improvement_suggestion_codes(X, feature_names, scores),
+         lambda: generate_improvement_suggestions_batch(X, feature_names, scores)),
+    ]
+
+    print(f"{args.rows:,} rows (scalar timed on {n_scalar:,} and extrapolated)")
+    print(f"{'helper':<14} {'scalar s':>9} {'array s':>8} {'speedup':>8} {'as lists s':>11} {'speedup':>8}")
+    for name, scalar_fn, array_fn, list_fn in cases:
+        _, scalar = timed(scalar_fn)
+        scalar *= scale
+        _, array = timed(array_fn)
+        line = f"{name:<14} {scalar:>9.2f} {array:>8.3f} {scalar / array:>7.0f}x"
+        if list_fn is not None:
+            _, as_lists = timed(list_fn)
+            line += f" {as_lists:>11.3f} {scalar / as_lists:>7.0f}x"
+        print(line)
+
+    # Parity on the scalar sample
+    head = X[:n_scalar]
+    assert calculate_feature_contributions_batch(head, feature_names) == \
+        [calculate_feature_contributions(row) for row in rows]
+    assert [list(s) for s in generate_improvement_suggestions_batch(head, feature_names, scores[:n_scalar])] == \
+        [generate_improvement_suggestions(row, s) for row, s in zip(rows, scores[:n_scalar].tolist())]
+    print("Array results match the scalar helpers on the sample")
+
+
+if __name__ == "__main__":
+    main()
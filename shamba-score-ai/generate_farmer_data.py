@@ -1,40 +1,46 @@
 """
 Shamba Score: Training Data Generator
 Generates 500 realistic farmer profiles with 15 features
+(or millions, using the vectorized sharded mode)
 """
 
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 
+FIRST_NAMES = ['John', 'Mary', 'Peter', 'Grace', 'David', 'Sarah', 'James', 'Lucy', 'Samuel', 'Faith']
+LAST_NAMES = ['Mwangi', 'Wanjiku', 'Kamau', 'Njeri', 'Kiprotich', 'Achieng', 'Maina', 'Wambui']
+
+# County profiles with climate characteristics
+COUNTY_PROFILES = {
+    'Kiambu': {'drought_risk': 0.15, 'rainfall_avg': 0},
+    'Nakuru': {'drought_risk': 0.20, 'rainfall_avg': -5},
+    'Uasin Gishu': {'drought_risk': 0.35, 'rainfall_avg': -10},
+    'Meru': {'drought_risk': 0.30, 'rainfall_avg': -8},
+    'Bungoma': {'drought_risk': 0.10, 'rainfall_avg': 5}
+}
+
+FARMER_TYPES = ['struggling', 'average', 'excellent']
+FARMER_TYPE_PROBS = [0.2, 0.6, 0.2]
+
 def generate_realistic_farmer_data(n_farmers=500, seed=42):
     """Generate synthetic farmer dataset"""
     np.random.seed(seed)
     
-    # Simple name generation
-    first_names = ['John', 'Mary', 'Peter', 'Grace', 'David', 'Sarah', 'James', 'Lucy', 'Samuel', 'Faith']
-    last_names = ['Mwangi', 'Wanjiku', 'Kamau', 'Njeri', 'Kiprotich', 'Achieng', 'Maina', 'Wambui']
-    
     farmers = []
-    
-    # County profiles with climate characteristics
-    county_profiles = {
-        'Kiambu': {'drought_risk': 0.15, 'rainfall_avg': 0},
-        'Nakuru': {'drought_risk': 0.20, 'rainfall_avg': -5},
-        'Uasin Gishu': {'drought_risk': 0.35, 'rainfall_avg': -10},
-        'Meru': {'drought_risk': 0.30, 'rainfall_avg': -8},
-        'Bungoma': {'drought_risk': 0.10, 'rainfall_avg': 5}
-    }
+    county_profiles = COUNTY_PROFILES
     
     for i in range(n_farmers):
         county = np.random.choice(list(county_profiles.keys()))
         profile = county_profiles[county]
         
         # Farmer type: 20% struggling, 60% average, 20% excellent
-        farmer_type = np.random.choice(
-            ['struggling', 'average', 'excellent'], 
-            p=[0.2, 0.6, 0.2]
-        )
+        farmer_type = np.random.choice(FARMER_TYPES, p=FARMER_TYPE_PROBS)
         
         # Generate features based on farmer type
         if farmer_type == 'struggling':
@@ -101,7 +107,7 @@ def generate_realistic_farmer_data(n_farmers=500, seed=42):
         
         farmer = {
             'farmer_id': f'FM{i:04d}',
-            'name': f"{np.random.choice(first_names)} {np.random.choice(last_names)}",
+            'name': f"{np.random.choice(FIRST_NAMES)} {np.random.choice(LAST_NAMES)}",
             'phone': f'0{np.random.randint(700000000, 799999999)}',
             'registration_date': (
                 datetime.now() - timedelta(days=np.random.randint(30, 730))
@@ -137,22 +143,261 @@ def generate_realistic_farmer_data(n_farmers=500, seed=42):
     
     return pd.DataFrame(farmers)
 
+def _draw_cohort_features(rng, farmer_type, n):
+    """Draw all type-dependent features for a cohort of n farmers in one call each"""
+    if farmer_type == 'struggling':
+        return {
+            'mean_ndvi': rng.beta(3, 5, n),
+            'ndvi_trend': rng.normal(-0.05, 0.08, n),
+            'growing_season_match': rng.uniform(0.3, 0.6, n),
+            'transaction_velocity': rng.poisson(15, n),
+            'savings_rate': rng.beta(2, 12, n),
+            'loan_repayment_history': rng.choice([0, 0.5], size=n, p=[0.6, 0.4]),
+            'cooperative_endorsement': rng.choice([1, 2], size=n, p=[0.5, 0.5]),
+            'chama_participation': np.zeros(n, dtype=int),
+            'neighbor_vouches': rng.poisson(0.5, n),
+            'fertilizer_purchase_timing': rng.uniform(0.2, 0.5, n),
+            'seed_quality_tier': np.ones(n, dtype=int),
+            'advisory_usage': np.zeros(n, dtype=int)
+        }
+    elif farmer_type == 'average':
+        return {
+            'mean_ndvi': rng.beta(6, 3, n),
+            'ndvi_trend': rng.normal(0.01, 0.08, n),
+            'growing_season_match': rng.uniform(0.6, 0.85, n),
+            'transaction_velocity': rng.poisson(35, n),
+            'savings_rate': rng.beta(3, 7, n),
+            'loan_repayment_history': rng.choice([0.5, 1.0], size=n, p=[0.3, 0.7]),
+            'cooperative_endorsement': rng.choice([3, 4], size=n, p=[0.6, 0.4]),
+            'chama_participation': rng.choice([0, 1], size=n, p=[0.4, 0.6]),
+            'neighbor_vouches': rng.poisson(2, n),
+            'fertilizer_purchase_timing': rng.uniform(0.5, 0.8, n),
+            'seed_quality_tier': rng.choice([1, 2], size=n, p=[0.3, 0.7]),
+            'advisory_usage': rng.choice([0, 1], size=n, p=[0.6, 0.4])
+        }
+    else:  # excellent
+        return {
+            'mean_ndvi': rng.beta(9, 2, n),
+            'ndvi_trend': rng.normal(0.05, 0.05, n),
+            'growing_season_match': rng.uniform(0.85, 1.0, n),
+            'transaction_velocity': rng.poisson(55, n),
+            'savings_rate': rng.beta(5, 5, n),
+            'loan_repayment_history': np.ones(n),
+            'cooperative_endorsement': rng.choice([4, 5], size=n, p=[0.5, 0.5]),
+            'chama_participation': np.ones(n, dtype=int),
+            'neighbor_vouches': rng.poisson(5, n),
+            'fertilizer_purchase_timing': rng.uniform(0.8, 1.0, n),
+            'seed_quality_tier': rng.choice([2, 3], size=n, p=[0.4, 0.6]),
+            'advisory_usage': np.ones(n, dtype=int)
+        }
+
+def generate_farmer_chunk(n_farmers, rng, start_id=0):
+    """
+    Generate n_farmers synthetic farmers with whole-array draws
+    
+    Same distributions as generate_realistic_farmer_data, but every feature
+    is drawn once per farmer_type cohort instead of once per farmer.
+    
+    Args:
+        n_farmers: Number of farmers in the chunk
+        rng: numpy Generator to draw from
+        start_id: Index of the first farmer (used for farmer_id)
+        
+    Returns:
+        DataFrame with the same columns as generate_realistic_farmer_data
+    """
+    counties = np.array(list(COUNTY_PROFILES.keys()), dtype=object)
+    drought_risk = np.array([p['drought_risk'] for p in COUNTY_PROFILES.values()])
+    rainfall_avg = np.array([p['rainfall_avg'] for p in COUNTY_PROFILES.values()], dtype=float)
+    
+    county_idx = rng.integers(0, len(counties), n_farmers)
+    type_idx = rng.choice(len(FARMER_TYPES), size=n_farmers, p=FARMER_TYPE_PROBS)
+    
+    # Draw each cohort's features as arrays and scatter them into place
+    feature_cols = {}
+    for t, farmer_type in enumerate(FARMER_TYPES):
+        rows = np.flatnonzero(type_idx == t)
+        for name, values in _draw_cohort_features(rng, farmer_type, len(rows)).items():
+            if name not in feature_cols:
+                feature_cols[name] = np.zeros(n_farmers, dtype=values.dtype)
+            feature_cols[name][rows] = values
+    
+    # Climate risk (county-specific)
+    drought_exposure_index = np.clip(rng.normal(drought_risk[county_idx], 0.1), 0, 1)
+    rainfall_deviation = rng.normal(rainfall_avg[county_idx], 10)
+    temperature_anomaly = rng.normal(1.5, 1.5, n_farmers)
+    
+    # Calculate credit score
+    credit_score = (
+        feature_cols['mean_ndvi'] * 25 +
+        feature_cols['savings_rate'] * 20 +
+        feature_cols['cooperative_endorsement'] * 10 +
+        feature_cols['loan_repayment_history'] * 20 +
+        (feature_cols['transaction_velocity'] / 60) * 15 +
+        feature_cols['chama_participation'] * 10 +
+        (1 - drought_exposure_index) * 5 +
+        feature_cols['fertilizer_purchase_timing'] * 5
+    )
+    credit_score = np.clip(credit_score + rng.normal(0, 5, n_farmers), 0, 100)
+    
+    ids = np.arange(start_id, start_id + n_farmers).astype(str)
+    names = np.char.add(
+        np.char.add(rng.choice(FIRST_NAMES, n_farmers), ' '),
+        rng.choice(LAST_NAMES, n_farmers)
+    )
+    registration = np.datetime64(datetime.now().date()) - rng.integers(30, 730, n_farmers).astype('timedelta64[D]')
+    
+    return pd.DataFrame({
+        'farmer_id': np.char.add('FM', np.char.zfill(ids, 4)),
+        'name': names,
+        'phone': np.char.add('0', rng.integers(700000000, 799999999, n_farmers).astype(str)),
+        'registration_date': registration.astype(str),
+        'age': rng.integers(25, 65, n_farmers),
+        'gender': rng.choice(['M', 'F'], size=n_farmers, p=[0.6, 0.4]),
+        'county': counties[county_idx],
+        'farm_size_acres': np.round(rng.lognormal(1.2, 0.8, n_farmers), 2),
+        
+        # 15 INPUT FEATURES
+        'mean_ndvi': np.round(feature_cols['mean_ndvi'], 3),
+        'ndvi_trend': np.round(feature_cols['ndvi_trend'], 3),
+        'growing_season_match': np.round(feature_cols['growing_season_match'], 3),
+        'transaction_velocity': feature_cols['transaction_velocity'].astype(int),
+        'savings_rate': np.round(feature_cols['savings_rate'], 3),
+        'loan_repayment_history': np.round(feature_cols['loan_repayment_history'], 1),
+        'cooperative_endorsement': feature_cols['cooperative_endorsement'].astype(int),
+        'chama_participation': feature_cols['chama_participation'].astype(int),
+        'neighbor_vouches': feature_cols['neighbor_vouches'].astype(int),
+        'fertilizer_purchase_timing': np.round(feature_cols['fertilizer_purchase_timing'], 3),
+        'seed_quality_tier': feature_cols['seed_quality_tier'].astype(int),
+        'advisory_usage': feature_cols['advisory_usage'].astype(int),
+        'drought_exposure_index': np.round(drought_exposure_index, 3),
+        'rainfall_deviation': np.round(rainfall_deviation, 2),
+        'temperature_anomaly': np.round(temperature_anomaly, 2),
+        
+        # TARGET VARIABLE
+        'credit_score': np.round(credit_score, 1),
+        'farmer_type': np.array(FARMER_TYPES, dtype=object)[type_idx]
+    })
+
+def _write_chunk(df, path, file_format, writer=None):
+    """Append a chunk to a CSV file or an open Parquet writer"""
+    if file_format == 'parquet':
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(path, table.schema)
+        writer.write_table(table)
+        return writer
+    
+    df.to_csv(path, mode='a', header=not os.path.exists(path), index=False)
+    return writer
+
+def _generate_shard(args):
+    """Generate one shard chunk by chunk, writing each chunk as it is produced"""
+    seed_seq, n_farmers, start_id, path, file_format, chunk_size = args
+    rng = np.random.default_rng(seed_seq)
+    
+    if os.path.exists(path):
+        os.remove(path)
+    
+    writer = None
+    try:
+        for offset in range(0, n_farmers, chunk_size):
+            n = min(chunk_size, n_farmers - offset)
+            writer = _write_chunk(generate_farmer_chunk(n, rng, start_id + offset), path, file_format, writer)
+    finally:
+        if writer is not None:
+            writer.close()
+    
+    return path, n_farmers
+
+def generate_farmer_data_sharded(n_farmers, output_dir, seed=42, n_shards=8,
+                                 file_format='csv', chunk_size=100_000, workers=None):
+    """
+    Generate a large synthetic dataset as shard files using a process pool
+    
+    Each shard gets an independent random stream spawned from the seed, so
+    output is deterministic for a given seed, shard count and chunk size
+    regardless of worker count. Memory per worker is bounded by chunk_size.
+    
+    Args:
+        n_farmers: Total number of farmers
+        output_dir: Directory for the shard files
+        seed: Base random seed
+        n_shards: Number of shard files
+        file_format: 'csv' or 'parquet' (requires pyarrow)
+        chunk_size: Rows generated and written per step
+        workers: Process pool size (defaults to min(n_shards, CPU count))
+        
+    Returns:
+        List of (shard_path, row_count)
+    """
+    if file_format not in ('csv', 'parquet'):
+        raise ValueError(f"Unsupported format: {file_format}")
+    if file_format == 'parquet':
+        import pyarrow  # noqa: F401 - fail fast before starting workers
+    
+    os.makedirs(output_dir, exist_ok=True)
+    seed_seqs = np.random.SeedSequence(seed).spawn(n_shards)
+    
+    base, extra = divmod(n_farmers, n_shards)
+    tasks = []
+    start_id = 0
+    for shard, seed_seq in enumerate(seed_seqs):
+        n = base + (1 if shard < extra else 0)
+        path = os.path.join(output_dir, f'farmers-{shard:05d}.{file_format}')
+        tasks.append((seed_seq, n, start_id, path, file_format, chunk_size))
+        start_id += n
+    
+    workers = workers or min(n_shards, os.cpu_count() or 1)
+    if workers == 1:
+        return [_generate_shard(task) for task in tasks]
+    
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_generate_shard, tasks))
+
 if __name__ == "__main__":
-    print("Generating Shamba Score Training Data...\n")
-    
-    # Generate data
-    df = generate_realistic_farmer_data(n_farmers=500, seed=42)
-    
-    # Save to CSV
-    output_file = 'farmers_training_data.csv'
-    df.to_csv(output_file, index=False)
-    
-    # Print summary
-    print(f"Generated {len(df)} farmer profiles")
-    print(f"Data saved to '{output_file}'")
-    print(f"\nSummary Statistics:")
-    print(f"   Mean Credit Score: {df['credit_score'].mean():.2f}")
-    print(f"   Score Range: {df['credit_score'].min():.1f} - {df['credit_score'].max():.1f}")
-    print(f"\n   Farmer Types:")
-    print(df['farmer_type'].value_counts())
-    print("\nReady for model training!")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate synthetic farmer training data")
+    parser.add_argument('--n-farmers', type=int, default=500, help="Number of farmers")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed")
+    parser.add_argument('--sharded', action='store_true',
+                        help="Use the vectorized generator and write shard files")
+    parser.add_argument('--output-dir', default='data/generated', help="Shard output directory")
+    parser.add_argument('--shards', type=int, default=8, help="Number of shards")
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv', help="Shard file format")
+    parser.add_argument('--chunk-size', type=int, default=100_000, help="Rows per write")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes")
+    args = parser.parse_args()
+    
+    if args.sharded:
+        print(f"Generating {args.n_farmers:,} farmers in {args.shards} shards...\n")
+        start = time.perf_counter()
+        shards = generate_farmer_data_sharded(
+            args.n_farmers, args.output_dir, seed=args.seed, n_shards=args.shards,
+            file_format=args.format, chunk_size=args.chunk_size, workers=args.workers
+        )
+        elapsed = time.perf_counter() - start
+        for path, rows in shards:
+            print(f"   {path}: {rows:,} rows")
+        print(f"\nGenerated {args.n_farmers:,} farmer profiles in {elapsed:.1f}s "
+              f"({args.n_farmers / elapsed:,.0f} rows/s)")
+    else:
+        print("Generating Shamba Score Training Data...\n")
+    
+        # Generate data
+        df = generate_realistic_farmer_data(n_farmers=args.n_farmers, seed=args.seed)
+    
+        # Save to CSV
+        output_file = 'farmers_training_data.csv'
+        df.to_csv(output_file, index=False)
+    
+        # Print summary
+        print(f"Generated {len(df)} farmer profiles")
+        print(f"Data saved to '{output_file}'")
+        print(f"\nSummary Statistics:")
+        print(f"   Mean Credit Score: {df['credit_score'].mean():.2f}")
+        print(f"   Score Range: {df['credit_score'].min():.1f} - {df['credit_score'].max():.1f}")
+        print(f"\n   Farmer Types:")
+        print(df['farmer_type'].value_counts())
+        print("\nReady for model training!")
\ No newline at end of file
@@ -1,11 +1,23 @@
 """
 Shamba Score: Model Training Script
 Trains XGBoost model on farmer data
+
+With --search, hyperparameters are first chosen by k-fold cross-validation
+on the training split (see search_hyperparameters):
+
+    python train_model.py [--search] [--folds 5] [--workers N] [--compare-serial]
 """
 
+import argparse
+import itertools
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import Array
+from multiprocessing.shared_memory import SharedMemory
+
 import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import KFold, train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import mean_absolute_error, r2_score, mean_squared_error
 import xgboost as xgb
@@ -13,20 +25,48 @@ import joblib
 import matplotlib.pyplot as plt
 import json
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+from features import FEATURE_NAMES
+
+# Model settings when no search is run (and the base for searched configs)
+DEFAULT_PARAMS = {
+    'objective': 'reg:squarederror',
+    'tree_method': 'hist',
+    'n_estimators': 100,
+    'max_depth': 5,
+    'learning_rate': 0.1,
+    'subsample': 0.8,
+    'colsample_bytree': 0.8
+}
+
+# --search cross-validates every combination
+SEARCH_SPACE = {
+    'max_depth': [2, 3, 4, 5],
+    'learning_rate': [0.05, 0.1],
+    'min_child_weight': [1, 5],
+    'subsample': [0.8],
+    'colsample_bytree': [0.8, 1.0],
+    'reg_lambda': [1.0, 10.0]
+}
+
+# Boosting rounds per fold: at most MAX_ROUNDS, stopping once validation
+# RMSE hasn't improved for EARLY_STOPPING_ROUNDS
+MAX_ROUNDS = 1000
+EARLY_STOPPING_ROUNDS = 30
+
+# A config is dropped once its mean RMSE over the folds so far is this much
+# worse than the best finished config's on the same folds (inf = no pruning)
+PRUNE_MARGIN = 0.05
 
 def load_and_prepare_data(filepath):
     """Load data and prepare features"""
     print("Loading data...")
     df = pd.read_csv(filepath)
     
-    # Select feature columns (15 features)
-    feature_cols = [
-        'mean_ndvi', 'ndvi_trend', 'growing_season_match',
-        'transaction_velocity', 'savings_rate', 'loan_repayment_history',
-        'cooperative_endorsement', 'chama_participation', 'neighbor_vouches',
-        'fertilizer_purchase_timing', 'seed_quality_tier', 'advisory_usage',
-        'drought_exposure_index', 'rainfall_deviation', 'temperature_anomaly'
-    ]
+    # Feature columns, in the order the services use (api/features.py)
+    feature_cols = list(FEATURE_NAMES)
     
     X = df[feature_cols]
     y = df['credit_score']
@@ -34,8 +74,8 @@ def load_and_prepare_data(filepath):
     print(f"Loaded {len(df)} samples with {len(feature_cols)} features")
     return X, y, feature_cols, df
 
-def train_model(X, y, test_size=0.2, random_state=42):
-    """Train XGBoost model"""
+def train_model(X, y, test_size=0.2, random_state=42, params=None):
+    """Train XGBoost model (params override DEFAULT_PARAMS, e.g. with searched ones)"""
     print("\nSplitting data...")
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=test_size, random_state=random_state
@@ -53,12 +93,7 @@ def train_model(X, y, test_size=0.2, random_state=42):
     # Train XGBoost
     print("\nTraining XGBoost model...")
     model = xgb.XGBRegressor(
-        objective='reg:squarederror',
-        n_estimators=100,
-        max_depth=5,
-        learning_rate=0.1,
-        subsample=0.8,
-        colsample_bytree=0.8,
+        **{**DEFAULT_PARAMS, **(params or {})},
         random_state=random_state,
         verbosity=0
     )
@@ -93,6 +128,155 @@ def train_model(X, y, test_size=0.2, random_state=42):
     
     return model, scaler, X_train_scaled, X_test_scaled, y_train, y_test, metrics
 
+def share_array(array):
+    """Copy an array into shared memory once; returns (SharedMemory, spec to attach it by)"""
+    shm = SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
+
+def attach_array(spec):
+    """(SharedMemory, array view) for a share_array spec, without copying"""
+    name, shape, dtype = spec
+    shm = SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+# Set in each search worker by init_search_worker
+_search = {}
+
+def init_search_worker(x_spec, y_spec, fold_of, best_folds, nthread):
+    """Attach the shared training data; fold matrices are built on first use"""
+    x_shm, X = attach_array(x_spec)
+    y_shm, y = attach_array(y_spec)
+    _search.update(X=X, y=y, fold_of=fold_of, best_folds=best_folds, nthread=nthread,
+                   shm=(x_shm, y_shm), folds={})
+
+def close_search_worker():
+    """Drop the views of the shared data and detach from it"""
+    shms = _search.pop('shm', ())
+    _search.clear()
+    for shm in shms:
+        shm.close()
+
+def fold_matrices(k):
+    """Quantized (train, validation) DMatrix pair for fold k, built once per worker"""
+    if k not in _search['folds']:
+        X, y, validation = _search['X'], _search['y'], _search['fold_of'] == k
+        dtrain = xgb.QuantileDMatrix(X[~validation], y[~validation], nthread=_search['nthread'])
+        dval = xgb.QuantileDMatrix(X[validation], y[validation], ref=dtrain, nthread=_search['nthread'])
+        _search['folds'][k] = (dtrain, dval)
+    return _search['folds'][k]
+
+def evaluate_config(config, prune_margin=PRUNE_MARGIN, random_state=42):
+    """
+    Cross-validate one config, fold by fold, in a search worker
+    
+    Each fold trains with tree_method='hist' and stops early on its
+    validation fold. After each fold but the last, the config is pruned if
+    its mean RMSE so far is prune_margin worse than the best finished
+    config's mean over the same folds (folds differ in difficulty, so the
+    comparison is paired).
+    
+    Returns:
+        Dict with the config, per-fold RMSE and best rounds, mean RMSE and
+        whether it was pruned
+    """
+    params = {
+        **{k: v for k, v in DEFAULT_PARAMS.items() if k != 'n_estimators'},
+        **config,
+        'eval_metric': 'rmse',
+        'nthread': _search['nthread'],
+        'seed': random_state
+    }
+    best_folds = _search['best_folds']
+    n_folds = int(_search['fold_of'].max()) + 1
+    
+    rmses, rounds = [], []
+    for k in range(n_folds):
+        dtrain, dval = fold_matrices(k)
+        booster = xgb.train(params, dtrain, num_boost_round=MAX_ROUNDS, evals=[(dval, 'validation')],
+                            early_stopping_rounds=EARLY_STOPPING_ROUNDS, verbose_eval=False)
+        rmses.append(booster.best_score)
+        rounds.append(booster.best_iteration + 1)
+        if k < n_folds - 1 and np.mean(rmses) > np.mean(best_folds[:k + 1]) * (1 + prune_margin):
+            return {'config': config, 'fold_rmse': rmses, 'fold_rounds': rounds,
+                    'mean_rmse': float(np.mean(rmses)), 'pruned': True}
+    
+    mean_rmse = float(np.mean(rmses))
+    with best_folds.get_lock():
+        if mean_rmse < np.mean(best_folds[:]):
+            best_folds[:] = rmses
+    return {'config': config, 'fold_rmse': rmses, 'fold_rounds': rounds, 'mean_rmse': mean_rmse,
+            'pruned': False}
+
+def search_configs(search_space):
+    """Every combination of the search space, as param dicts"""
+    names = list(search_space)
+    return [dict(zip(names, values)) for values in itertools.product(*(search_space[n] for n in names))]
+
+def search_hyperparameters(X, y, search_space=None, n_folds=5, workers=None, prune_margin=PRUNE_MARGIN,
+                           test_size=0.2, random_state=42):
+    """
+    Choose hyperparameters by k-fold cross-validation over a process pool
+    
+    Runs on the same training split train_model uses, so the test set stays
+    unseen; features are scaled as train_model scales them. The training
+    data is copied into shared memory once and every worker reads it from
+    there. Workers split the cores (nthread = cores // workers), cache each
+    fold's quantized matrices and evaluate one config at a time; with
+    workers=1 the configs run serially in this process on all cores.
+    
+    Returns:
+        (best params including n_estimators, per-config results best first,
+        wall-clock seconds)
+    """
+    X_train, _, y_train, _ = train_test_split(X, y, test_size=test_size, random_state=random_state)
+    X_train = StandardScaler().fit_transform(X_train).astype(np.float32)
+    y_train = np.asarray(y_train, dtype=np.float32)
+    
+    fold_of = np.empty(len(X_train), dtype=np.int8)
+    for k, (_, validation) in enumerate(KFold(n_folds, shuffle=True, random_state=random_state).split(X_train)):
+        fold_of[validation] = k
+    
+    configs = search_configs(search_space or SEARCH_SPACE)
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+    workers = max(1, min(workers or cpus, len(configs)))
+    nthread = max(1, cpus // workers)
+    # Per-fold RMSE of the best finished config, shared with the workers for pruning
+    best_folds = Array('d', [float('inf')] * n_folds)
+    
+    print(f"\nSearching {len(configs)} configs with {n_folds}-fold CV "
+          f"({workers} worker(s) x {nthread} thread(s))...")
+    x_shm, x_spec = share_array(X_train)
+    y_shm, y_spec = share_array(y_train)
+    start = time.perf_counter()
+    try:
+        if workers == 1:
+            init_search_worker(x_spec, y_spec, fold_of, best_folds, nthread)
+            try:
+                results = [evaluate_config(config, prune_margin, random_state) for config in configs]
+            finally:
+                close_search_worker()
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_search_worker,
+                                     initargs=(x_spec, y_spec, fold_of, best_folds, nthread)) as pool:
+                futures = [pool.submit(evaluate_config, config, prune_margin, random_state) for config in configs]
+                results = [future.result() for future in as_completed(futures)]
+    finally:
+        for shm in (x_shm, y_shm):
+            shm.close()
+            shm.unlink()
+    elapsed = time.perf_counter() - start
+    
+    results.sort(key=lambda r: (r['pruned'], r['mean_rmse']))
+    best = results[0]
+    params = {**best['config'], 'n_estimators': int(round(np.mean(best['fold_rounds'])))}
+    
+    pruned = sum(r['pruned'] for r in results)
+    fits = sum(len(r['fold_rmse']) for r in results)
+    print(f"   {elapsed:.1f}s, {fits} of {len(configs) * n_folds} fold fits ({pruned} configs pruned)")
+    print(f"   Best CV RMSE: {best['mean_rmse']:.3f} with {params}")
+    return params, results, elapsed
+
 def analyze_feature_importance(model, feature_names):
     """Analyze and plot feature importance"""
     print("\nAnalyzing feature importance...")
@@ -153,8 +337,9 @@ def test_fairness(model, scaler, df, feature_cols):
     
     return fairness_results
 
-def save_model_artifacts(model, scaler, metrics, feature_importance, fairness_results, feature_names):
-    """Save all model artifacts"""
+def save_model_artifacts(model, scaler, metrics, feature_importance, fairness_results, feature_names,
+                         search=None):
+    """Save all model artifacts (search: hyperparameter search summary, if one was run)"""
     print("\nSaving model artifacts...")
     
     # Save model and scaler
@@ -174,20 +359,51 @@ def save_model_artifacts(model, scaler, metrics, feature_importance, fairness_re
         'fairness': fairness_results,
         'feature_importance': feature_importance.to_dict('records')
     }
+    if search is not None:
+        all_metrics['hyperparameter_search'] = search
     with open('model_metrics.json', 'w') as f:
         json.dump(all_metrics, f, indent=2)
     print("   Saved: model_metrics.json")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the Shamba Score model")
+    parser.add_argument('--data', default='../data/farmers_training_data.csv')
+    parser.add_argument('--search', action='store_true', help="Choose hyperparameters by k-fold CV first")
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=0, help="Search processes (0 = one per core)")
+    parser.add_argument('--prune-margin', type=float, default=PRUNE_MARGIN,
+                        help="Drop configs this much worse than the best on the same folds (inf = never)")
+    parser.add_argument('--compare-serial', action='store_true',
+                        help="Also run the search serially and report the wall-clock speedup")
+    args = parser.parse_args()
+    
     print("="*70)
     print("SHAMBA SCORE: MODEL TRAINING")
     print("="*70)
     
     # Load data
-    X, y, feature_names, df = load_and_prepare_data('../data/farmers_training_data.csv')
+    X, y, feature_names, df = load_and_prepare_data(args.data)
+    
+    # Hyperparameter search
+    params, search = None, None
+    if args.search:
+        params, results, elapsed = search_hyperparameters(X, y, n_folds=args.folds, workers=args.workers or None,
+                                                          prune_margin=args.prune_margin)
+        search = {
+            'folds': args.folds,
+            'prune_margin': args.prune_margin,
+            'best_params': params,
+            'wall_clock_s': round(elapsed, 2),
+            'results': results
+        }
+        if args.compare_serial:
+            _, _, serial = search_hyperparameters(X, y, n_folds=args.folds, workers=1,
+                                                  prune_margin=args.prune_margin)
+            search['serial_wall_clock_s'] = round(serial, 2)
+            print(f"\nSpeedup over a serial search: {serial / elapsed:.2f}x ({serial:.1f}s -> {elapsed:.1f}s)")
     
     # Train model
-    model, scaler, X_train_scaled, X_test_scaled, y_train, y_test, metrics = train_model(X, y)
+    model, scaler, X_train_scaled, X_test_scaled, y_train, y_test, metrics = train_model(X, y, params=params)
     
     # Feature importance
     feature_importance = analyze_feature_importance(model, feature_names)
@@ -196,7 +412,8 @@ if __name__ == "__main__":
     fairness_results = test_fairness(model, scaler, df, feature_names)
     
     # Save everything
-    save_model_artifacts(model, scaler, metrics, feature_importance, fairness_results, feature_names)
+    save_model_artifacts(model, scaler, metrics, feature_importance, fairness_results, feature_names,
+                         search=search)
     
     print("\n" + "="*70)
     print("TRAINING COMPLETE!")
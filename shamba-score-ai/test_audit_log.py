@@ -0,0 +1,88 @@
+"""
+Checks for the batched audit log writer and its segment reader
+"""
+
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, 'api'))
+
+from audit_log import DROP, AuditLog, audit_log_from_env, audit_segments, read_audit_log
+
+
+def test_records_rotate_and_replay_in_order(tmp_path):
+    audit_log = AuditLog(str(tmp_path), segment_bytes=4096)
+    for i in range(500):
+        audit_log.record({"farmer_id": f"KE_{i:06d}", "score": i / 10})
+    audit_log.record_many([{"farmer_id": "batch", "score": float(i)} for i in range(50)])
+    audit_log.close()
+
+    records = list(read_audit_log(str(tmp_path)))
+    assert [r["farmer_id"] for r in records[:500]] == [f"KE_{i:06d}" for i in range(500)]
+    assert len(records) == 550
+    assert len(audit_segments(str(tmp_path))) > 1
+    assert audit_log.stats()["written"] == 550
+
+
+def test_drop_policy_counts_instead_of_blocking(tmp_path):
+    audit_log = AuditLog(str(tmp_path), max_queue=10, policy="drop")
+    accepted = sum(audit_log.record({"i": i}) for i in range(5000))
+    audit_log.close()
+
+    stats = audit_log.stats()
+    assert accepted + stats["dropped"] == 5000
+    assert stats["written"] == accepted == len(list(read_audit_log(str(tmp_path))))
+
+
+def test_reader_skips_truncated_tail(tmp_path):
+    audit_log = AuditLog(str(tmp_path))
+    audit_log.record({"i": 1})
+    audit_log.close()
+    with open(audit_segments(str(tmp_path))[-1], "ab") as f:
+        f.write(b'{"i": 2')
+
+    assert list(read_audit_log(str(tmp_path))) == [{"i": 1}]
+
+
+def test_queue_bound_counts_records_not_batches(tmp_path):
+    audit_log = AuditLog(str(tmp_path), max_queue=100, batch_size=50, policy="drop")
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1.0)  # keep the writer from draining mid-call
+    try:
+        audit_log.record_many([{"i": i} for i in range(1000)])
+        assert audit_log.stats()["queue_depth"] <= 100
+    finally:
+        sys.setswitchinterval(interval)
+    audit_log.close()
+    stats = audit_log.stats()
+    assert stats["written"] + stats["dropped"] == 1000 and stats["dropped"] > 0
+
+    # Blocking waits for room chunk by chunk, so a batch larger than the queue still gets through
+    audit_log = AuditLog(str(tmp_path / "block"), max_queue=100, batch_size=50, block_timeout=None)
+    assert audit_log.record_many([{"i": i} for i in range(1000)])
+    audit_log.close()
+    assert audit_log.stats()["written"] == 1000
+
+
+def test_dead_writer_is_restarted_and_its_error_kept(tmp_path):
+    directory = tmp_path / 'audit'
+    directory.write_text("a file where the directory should be")
+    audit_log = AuditLog(str(directory))
+    audit_log.record({"farmer_id": "KE_1"})
+    audit_log._thread.join(5)
+    assert "Audit writer stopped" in audit_log.stats()["last_error"]
+
+    directory.unlink()
+    assert audit_log.record({"farmer_id": "KE_2"})
+    audit_log.close()
+
+    assert [r["farmer_id"] for r in read_audit_log(str(directory))] == ["KE_2"]
+    assert audit_log.stats()["dropped"] == 1
+
+
+def test_callers_can_pin_the_queue_full_policy(monkeypatch):
+    monkeypatch.setenv('SHAMBA_AUDIT_LOG', '1')
+    monkeypatch.setenv('SHAMBA_AUDIT_POLICY', 'block')
+    assert audit_log_from_env('unused', policy=DROP).policy == DROP
+    assert audit_log_from_env('unused').policy == 'block'
@@ -0,0 +1,85 @@
+"""
+Checks for the /predict micro-batcher (batching.py)
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, 'api'))
+
+from batching import MicroBatcher
+
+
+class RowSums:
+    """predict_fn returning each row's sum, recording the batch sizes it saw"""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    async def __call__(self, X):
+        self.batch_sizes.append(len(X))
+        await asyncio.sleep(0)
+        return X.sum(axis=1)
+
+
+def test_batches_are_flushed_at_max_batch_size():
+    predict = RowSums()
+    batcher = MicroBatcher(predict, max_batch_size=4, max_wait=0)
+
+    async def run():
+        try:
+            return await asyncio.gather(*(batcher.submit([i, 1]) for i in range(10)))
+        finally:
+            batcher.close()
+
+    assert asyncio.run(run()) == [i + 1 for i in range(10)]
+    assert predict.batch_sizes == [4, 4, 2]
+
+
+def test_concurrent_traffic_holds_a_batch_open_until_the_deadline():
+    predict = RowSums()
+    batcher = MicroBatcher(predict, max_batch_size=64, max_wait=0.05)
+
+    async def run():
+        try:
+            # A concurrent burst marks traffic as concurrent, so the next batch waits
+            await asyncio.gather(*(batcher.submit([i]) for i in range(8)))
+            start = time.perf_counter()
+            first = asyncio.ensure_future(batcher.submit([1]))
+            await asyncio.sleep(0.01)
+            second = await batcher.submit([2])
+            return await first, second, time.perf_counter() - start
+        finally:
+            batcher.close()
+
+    first, second, elapsed = asyncio.run(run())
+    assert (first, second) == (1, 2)
+    assert predict.batch_sizes == [8, 2]
+    assert 0.04 <= elapsed < 1.0
+
+
+def test_a_failed_batch_fails_each_of_its_requests():
+    calls = []
+
+    async def failing(X):
+        calls.append(len(X))
+        if len(calls) == 1:
+            raise ValueError("model unavailable")
+        return X.sum(axis=1)
+
+    batcher = MicroBatcher(failing, max_batch_size=8, max_wait=0)
+
+    async def run():
+        try:
+            failed = await asyncio.gather(*(batcher.submit([i]) for i in range(3)), return_exceptions=True)
+            return failed, await batcher.submit([5])
+        finally:
+            batcher.close()
+
+    failed, later = asyncio.run(run())
+    assert calls[0] == 3
+    assert all(isinstance(e, ValueError) and str(e) == "model unavailable" for e in failed)
+    assert later == 5
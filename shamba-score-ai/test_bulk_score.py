@@ -0,0 +1,55 @@
+"""
+Checks for the bulk scoring CLI (bulk_score.py)
+"""
+
+import os
+import sys
+import warnings
+
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, 'api'))
+
+from bulk_score import load_artifacts, score_chunk, score_file
+
+
+def test_chunked_and_parallel_runs_match_a_single_pass(tmp_path):
+    data = pd.read_csv(os.path.join(BASE_DIR, 'data', 'farmers_training_data.csv'), dtype=str).head(50)
+    data['phone'] = [f"0712{i:06d}" for i in range(len(data))]
+    data.to_csv(tmp_path / 'in.csv', index=False)
+
+    single = score_file(str(tmp_path / 'in.csv'), str(tmp_path / 'single.csv'), chunk_size=1000)
+    chunked = score_file(str(tmp_path / 'in.csv'), str(tmp_path / 'chunked.csv'), chunk_size=7, workers=2)
+
+    assert single['rows'] == chunked['rows'] == 50
+    expected = pd.read_csv(tmp_path / 'single.csv', dtype=str)
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / 'chunked.csv', dtype=str), expected)
+    assert expected['farmer_id'].tolist() == data['farmer_id'].tolist()
+    assert expected['phone'].tolist() == data['phone'].tolist()
+    assert expected['predicted_credit_score'].astype(float).between(0, 100).all()
+
+
+def test_non_numeric_cells_are_reported_not_fatal(tmp_path):
+    data = pd.read_csv(os.path.join(BASE_DIR, 'data', 'farmers_training_data.csv'), dtype=str).head(20)
+    data.loc[3, 'savings_rate'] = 'abc'
+    data.loc[7, 'mean_ndvi'] = '1.5'
+    data.to_csv(tmp_path / 'in.csv', index=False)
+
+    summary = score_file(str(tmp_path / 'in.csv'), str(tmp_path / 'out.csv'), chunk_size=8)
+
+    scored = pd.read_csv(tmp_path / 'out.csv', keep_default_na=False)
+    assert summary['rows'] == 20 and summary['invalid_row_indices'] == [3, 7]
+    assert scored.loc[3, 'validation_errors'] == "savings_rate: Not a number: 'abc'"
+    assert scored.loc[7, 'validation_errors'].startswith("mean_ndvi: Value 1.5 outside valid range")
+    assert scored['predicted_credit_score'].notna().all()
+
+
+def test_scoring_a_chunk_raises_no_feature_name_warning():
+    data = pd.read_csv(os.path.join(BASE_DIR, 'data', 'farmers_training_data.csv'), dtype=str).head(10)
+    artifacts = load_artifacts()
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        scored = score_chunk(data, *artifacts)
+    assert len(scored) == 10
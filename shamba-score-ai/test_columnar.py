@@ -0,0 +1,69 @@
+"""
+Checks for the columnar (.npy/.npz) /predict/batch format
+"""
+
+import io
+import os
+import sys
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, 'api'))
+os.environ.setdefault('SHAMBA_AUDIT_LOG', '0')
+os.environ.setdefault('SHAMBA_SCORE_STORE', '0')
+
+from fastapi.testclient import TestClient
+
+import main
+from columnar import NPY, NPZ, decode_matrix
+from features import FEATURE_GROUPS
+
+FEATURE_NAMES = [f"f{i}" for i in range(15)]
+
+
+def npy_bytes(X):
+    out = io.BytesIO()
+    np.save(out, X)
+    return out.getvalue()
+
+
+def test_decode_wraps_body_without_copying():
+    X = np.random.default_rng(0).random((50, 15))
+    body = npy_bytes(X)
+    decoded, farmer_ids = decode_matrix(body, NPY, FEATURE_NAMES)
+    assert np.array_equal(decoded, X) and farmer_ids is None
+    assert np.shares_memory(decoded, np.frombuffer(body, dtype=np.uint8))
+
+    out = io.BytesIO()
+    np.savez(out, farmer_id=np.array([f"KE_{i}" for i in range(50)]),
+             **{name: X[:, j] for j, name in enumerate(FEATURE_NAMES)})
+    decoded, farmer_ids = decode_matrix(out.getvalue(), NPZ, FEATURE_NAMES)
+    assert np.array_equal(decoded, X) and farmer_ids[3] == "KE_3"
+
+
+def test_columnar_batch_matches_json_batch():
+    with TestClient(main.app) as client:
+        feature_names = main.model_registry.current.feature_names
+        profiles = list(main.DEMO_PROFILES.values())
+        X = np.array([[profile[name] for name in feature_names] for profile in profiles], dtype=float)
+
+        as_json = client.post('/predict/batch', json={
+            "farmers": [
+                {group: {name: profile[name] for name in names} for group, names in FEATURE_GROUPS.items()}
+                for profile in profiles
+            ],
+            "include_explanations": False
+        }).json()["results"]
+        as_npz = client.post('/predict/batch', content=npy_bytes(X),
+                             headers={"content-type": NPY, "accept": NPZ})
+        columns = np.load(io.BytesIO(as_npz.content))
+
+        assert as_npz.headers["content-type"] == NPZ
+        for name in ("credit_score", "risk_category", "recommended_loan_amount", "interest_rate",
+                     "approval_probability", "confidence_score", "climate_risk_score"):
+            assert columns[name].tolist() == [result[name] for result in as_json]
+
+        X[0, 0] = 2.0
+        rejected = client.post('/predict/batch', content=npy_bytes(X), headers={"content-type": NPY})
+        assert rejected.status_code == 422 and rejected.json()["detail"]["invalid_rows"] == 1
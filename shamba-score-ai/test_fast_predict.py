@@ -0,0 +1,73 @@
+"""
+Checks for the /predict fast path (fast_path.py) against the Pydantic path
+"""
+
+import json
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, 'api'))
+os.environ.setdefault('SHAMBA_AUDIT_LOG', '0')
+os.environ.setdefault('SHAMBA_SCORE_STORE', '0')
+os.environ['SHAMBA_CACHE_SIZE'] = '0'
+
+from fastapi.testclient import TestClient
+
+import main
+import schemas
+from features import FEATURE_GROUPS, FEATURE_NAMES
+
+
+def test_fast_path_matches_pydantic_path():
+    profile = dict(main.DEMO_PROFILES["excellent_farmer"], farmer_id="KE_1")
+    bodies = [
+        profile,
+        dict(profile, mean_ndvi=1.5),          # out of range
+        dict(profile, neighbor_vouches=3.0),   # float for an int field
+        dict(profile, savings_rate=True),
+        dict(profile, savings_rate="0.4"),
+        {k: v for k, v in profile.items() if k != "mean_ndvi"},
+        dict(profile, farmer_id=5),
+        [profile],
+    ]
+    with TestClient(main.app) as client:
+        responses = {}
+        for fast in (False, True):
+            main.FAST_PREDICT = fast
+            responses[fast] = [client.post('/predict', json=body) for body in bodies]
+            responses[fast].append(client.post('/predict', content=b'{bad',
+                                               headers={"content-type": "application/json"}))
+        main.FAST_PREDICT = True
+    for slow, fast in zip(responses[False], responses[True]):
+        assert (slow.status_code, slow.json()) == (fast.status_code, fast.json())
+    assert responses[True][0].status_code == 200
+    assert responses[True][1].status_code == 422 and responses[True][-1].status_code == 422
+
+
+def test_request_schemas_follow_feature_groups():
+    with open(os.path.join(BASE_DIR, 'models', 'feature_names.json')) as f:
+        assert json.load(f) == FEATURE_NAMES
+    for group, names in FEATURE_GROUPS.items():
+        model = schemas.CreditScoreRequest.model_fields[group].annotation
+        assert tuple(model.model_fields) == names
+
+
+def test_predict_and_batch_agree_on_risk_terms_and_suggestions():
+    struggling = dict(main.DEMO_PROFILES["excellent_farmer"], chama_participation=0, advisory_usage=0,
+                      savings_rate=0.1, cooperative_endorsement=2, loan_repayment_history=0.5,
+                      seed_quality_tier=1, fertilizer_purchase_timing=0.3, mean_ndvi=0.4)
+    profiles = list(main.DEMO_PROFILES.values()) + [struggling]
+    terms = ("credit_score", "risk_category", "recommended_loan_amount", "interest_rate", "approval_probability",
+             "improvement_suggestions")
+    with TestClient(main.app) as client:
+        single = [client.post('/predict', json=profile).json() for profile in profiles]
+        batch = client.post('/predict/batch', json={
+            "farmers": [
+                {group: {name: profile[name] for name in names} for group, names in FEATURE_GROUPS.items()}
+                for profile in profiles
+            ]
+        }).json()["results"]
+    assert len(single[-1]["improvement_suggestions"]) >= 4
+    for one, many in zip(single, batch):
+        assert {k: one[k] for k in terms} == {k: many[k] for k in terms}
@@ -0,0 +1,173 @@
+"""
+Parity checks for the vectorized Flask /api/batch-score path
+"""
+
+import io
+import json
+import os
+import sys
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, 'api'))
+os.environ.setdefault('SHAMBA_AUDIT_LOG', '0')
+os.environ.setdefault('SHAMBA_SCORE_STORE', '0')
+
+import shamba_score_api
+from inference_core import FLASK_FIELD_MAP
+from utils import calculate_risk_category
+from shamba_score_api import app, predictor, score_batch_chunk
+
+# Flask request fields and their defaults
+FIELDS = {field: default for field, default, _, _ in FLASK_FIELD_MAP.values()}
+
+
+def scalar_result(farmer_data):
+    """What the per-farmer loop returned for one record"""
+    scores = predictor.predict_credit_score(farmer_data)
+    if not scores:
+        return {'farmer_id': farmer_data.get('farmer_id', 'unknown'), 'status': 'failed',
+                'error': 'Prediction failed'}
+    return {
+        'farmer_id': farmer_data.get('farmer_id', 'unknown'),
+        'credit_score': scores['credit_score'],
+        'score_category': predictor.generate_explanation(farmer_data, scores)['category'],
+        'farmer_performance_score': scores['farmer_performance'],
+        'climate_risk_score': scores['climate_risk'],
+        'confidence_score': scores['confidence'],
+        'status': 'success'
+    }
+
+
+def make_farmers(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    odd_values = [None, "0.5", True, float('nan'), float('inf'), -float('inf'), 10 ** 6, 0]
+    farmers = []
+    for i in range(n):
+        farmer = {'farmer_id': f"KE_{i:06d}"}
+        for field, default in FIELDS.items():
+            roll = rng.random()
+            if roll < 0.1:
+                continue
+            if roll < 0.13:
+                farmer[field] = odd_values[rng.integers(len(odd_values))]
+            elif isinstance(default, int):
+                farmer[field] = int(rng.integers(0, 2 * default + 1))
+            else:
+                farmer[field] = round(float(rng.uniform(0, 1.2)), 3)
+        farmers.append(farmer)
+    return farmers
+
+
+def test_vectorized_batch_matches_per_farmer_scoring():
+    farmers = make_farmers()
+    results = score_batch_chunk(farmers)
+    assert any(r['status'] == 'failed' for r in results)
+    assert results == [scalar_result(f) for f in farmers]
+
+
+def test_explanation_category_follows_score_categories():
+    for minimum, category, description in shamba_score_api.SCORE_CATEGORIES[:-1]:
+        explanation = predictor.generate_explanation({}, {'credit_score': minimum})
+        assert (explanation['category'], explanation['description']) == (category, description)
+        assert predictor.generate_explanation({}, {'credit_score': minimum - 0.1})['category'] != category
+    assert predictor.generate_explanation({}, {'credit_score': float('nan')})['category'] == 'Poor'
+
+
+def test_streamed_batch_matches_json_response(monkeypatch):
+    farmers = make_farmers(500) + ["not a record"]
+    client = app.test_client()
+    monkeypatch.setattr(shamba_score_api, 'BATCH_CHUNK_SIZE', 64)
+
+    body = client.post('/api/batch-score', json={'farmers': farmers}).get_json()
+    streamed = client.post('/api/batch-score?stream=true', json={'farmers': farmers})
+    lines = [json.loads(line) for line in streamed.get_data(as_text=True).splitlines()]
+
+    assert streamed.mimetype == 'application/x-ndjson'
+    assert lines[:-1] == body['results']
+    assert lines[-1]['summary']['failed_scores'] == body['failed_scores']
+    assert body['results'][-1] == {'farmer_id': 'unknown', 'status': 'failed',
+                                   'error': 'Farmer record must be an object'}
+
+
+def test_ingest_matches_batch_results():
+    farmers = make_farmers(700)
+    body = "\n".join(json.dumps(f) for f in farmers) + "\n\n{not json\n"
+    stream = shamba_score_api.stream_ingest_results(io.BytesIO(body.encode()), chunk_size=128)
+    lines = [json.loads(line) for chunk in stream for line in chunk.splitlines()]
+
+    assert [line.pop('line') for line in lines[:-2]] == list(range(1, 701))
+    assert lines[:700] == score_batch_chunk(farmers)
+    assert lines[700]['line'] == 702 and lines[700]['error'].startswith('Invalid JSON')
+    assert lines[-1]['summary']['total_farmers'] == 701
+
+
+class Recorder:
+    """Stands in for the audit log and score store"""
+
+    def __init__(self):
+        self.records = []
+
+    def record_many(self, records):
+        self.records.extend(records)
+
+    add_many = record_many
+
+    def record(self, record):
+        self.records.append(record)
+
+    add = record
+
+
+def test_only_model_features_are_persisted(monkeypatch):
+    audit, store = Recorder(), Recorder()
+    monkeypatch.setattr(shamba_score_api, 'audit_log', audit)
+    monkeypatch.setattr(shamba_score_api, 'open_score_store', lambda: store)
+    farmer = dict(make_farmers(1)[0], name='Jane Wanjiru', phone='+254700000000',
+                  location='Nakuru', farm_size=2.5)
+    client = app.test_client()
+
+    client.post('/api/score', json=farmer)
+    client.post('/api/batch-score', json={'farmers': [farmer]})
+
+    assert len(audit.records) == len(store.records) == 2
+    for record in audit.records + store.records:
+        assert list(record['features']) == predictor.core.feature_names
+
+
+def test_history_holds_model_scores_and_opens_on_first_use(tmp_path, monkeypatch):
+    db = tmp_path / 'scores.sqlite3'
+    monkeypatch.setenv('SHAMBA_SCORE_STORE', '1')
+    monkeypatch.setenv('SHAMBA_SCORE_DB', str(db))
+    monkeypatch.setattr(shamba_score_api, '_score_store', None)
+    monkeypatch.setattr(shamba_score_api, '_score_store_opened', False)
+    farmer = make_farmers(1)[0]
+    client = app.test_client()
+
+    assert not db.exists()
+    response = client.post('/api/score', json=farmer).get_json()
+    shamba_score_api.open_score_store().flush()
+    history = client.get(f"/api/farmers/{farmer['farmer_id']}/scores").get_json()['scores']
+
+    # Shared with the FastAPI service: 0-100 model score and risk tier, not 300-850
+    expected = predictor.predict_credit_score(farmer)
+    assert response['credit_score'] >= 300
+    assert (history[0]['credit_score'], history[0]['risk_category']) == \
+        (expected['model_score'], calculate_risk_category(expected['model_score'])[0])
+
+
+def test_complete_request_is_not_penalized_for_features_flask_cannot_send():
+    # The documented sample request: every Flask field the model uses is present
+    farmer = {
+        "farmer_id": "KE_000001", "ndvi_current": 0.75, "crop_health_score": 85,
+        "monthly_income_avg": 25000, "payment_consistency": 0.95, "community_trust_score": 88,
+        "drought_risk_score": 35, "flood_risk_score": 20, "savings_rate": 0.15
+    }
+    client = app.test_client()
+
+    single = client.post('/api/score', json=farmer).get_json()
+    batch = client.post('/api/batch-score', json={'farmers': [farmer]}).get_json()
+
+    # Base 0.85 less the 0.05 model uncertainty, with nothing missing or extreme
+    assert single['confidence_score'] == batch['results'][0]['confidence_score'] == 80
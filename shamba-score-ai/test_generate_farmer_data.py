@@ -0,0 +1,72 @@
+"""
+Checks for the vectorized, sharded training data generator
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+from generate_farmer_data import (
+    FARMER_TYPE_PROBS,
+    FARMER_TYPES,
+    generate_farmer_chunk,
+    generate_farmer_data_sharded,
+    generate_realistic_farmer_data,
+)
+
+DISCRETE_FEATURES = ['loan_repayment_history', 'cooperative_endorsement', 'chama_participation',
+                     'seed_quality_tier', 'advisory_usage']
+CONTINUOUS_FEATURES = ['mean_ndvi', 'ndvi_trend', 'growing_season_match', 'transaction_velocity',
+                       'savings_rate', 'neighbor_vouches', 'fertilizer_purchase_timing',
+                       'drought_exposure_index', 'rainfall_deviation', 'temperature_anomaly',
+                       'credit_score']
+
+
+def test_shards_do_not_depend_on_worker_count(tmp_path):
+    outputs = {}
+    for workers in (1, 2):
+        output_dir = tmp_path / f'workers-{workers}'
+        shards = generate_farmer_data_sharded(50, str(output_dir), seed=7, n_shards=3,
+                                              chunk_size=7, workers=workers)
+        assert sum(rows for _, rows in shards) == 50
+        outputs[workers] = [open(path, 'rb').read() for path, _ in shards]
+
+    assert outputs[1] == outputs[2]
+
+
+def test_chunk_matches_the_scalar_generator():
+    scalar = generate_realistic_farmer_data(n_farmers=3000, seed=0)
+    chunk = generate_farmer_chunk(20000, np.random.default_rng(0))
+
+    assert list(chunk.columns) == list(scalar.columns)
+    assert chunk['farmer_id'].is_unique
+
+    # Cohort proportions
+    shares = chunk['farmer_type'].value_counts(normalize=True)
+    for farmer_type, p in zip(FARMER_TYPES, FARMER_TYPE_PROBS):
+        assert shares[farmer_type] == pytest.approx(p, abs=0.02)
+
+    # Per-cohort feature values: the same discrete levels, and continuous
+    # features with the same location, spread and range (tolerances are in
+    # units of the feature's overall spread; a cohort can be constant, e.g.
+    # excellent credit scores clipped at 100)
+    scales = scalar[CONTINUOUS_FEATURES].std()
+    for farmer_type in FARMER_TYPES:
+        ours = chunk[chunk['farmer_type'] == farmer_type]
+        theirs = scalar[scalar['farmer_type'] == farmer_type]
+        for name in DISCRETE_FEATURES:
+            assert set(ours[name]) == set(theirs[name]), (farmer_type, name)
+        for name in CONTINUOUS_FEATURES:
+            scale = scales[name]
+            assert abs(ours[name].mean() - theirs[name].mean()) < 0.2 * scale, (farmer_type, name)
+            assert abs(ours[name].std() - theirs[name].std()) < 0.1 * scale, (farmer_type, name)
+            # The larger sample may reach a little further into the tails
+            assert theirs[name].min() - 2 * scale <= ours[name].min() <= theirs[name].min() + 0.5 * scale, \
+                (farmer_type, name)
+            assert theirs[name].max() - 0.5 * scale <= ours[name].max() <= theirs[name].max() + 2 * scale, \
+                (farmer_type, name)
@@ -0,0 +1,85 @@
+"""
+Checks for the service metrics (metrics.py) and both /metrics endpoints
+"""
+
+import gc
+import os
+import sys
+import threading
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, 'api'))
+os.environ.setdefault('SHAMBA_AUDIT_LOG', '0')
+os.environ.setdefault('SHAMBA_SCORE_STORE', '0')
+os.environ.setdefault('SHAMBA_METRICS', '1')
+
+from fastapi.testclient import TestClient
+
+import main
+import shamba_score_api
+from metrics import Histogram, ServiceMetrics
+
+
+def test_histogram_keeps_counts_from_exited_threads():
+    histogram = Histogram((0.1, 1.0))
+    threads = [threading.Thread(target=lambda: [histogram.observe(0.5) for _ in range(100)]) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    del threads
+    gc.collect()
+    histogram.observe(5.0)
+
+    counts, total = histogram.snapshot()
+    assert counts == [0, 800, 1] and total == 405.0
+    assert len(histogram._shards) == 1
+
+
+def test_render_is_cumulative_prometheus_text():
+    metrics = ServiceMetrics("test")
+    metrics.observe_request("/predict", 200, 0.002)
+    metrics.observe_request("/predict", 200, 0.02)
+    metrics.observe_batch("/predict/batch", 40)
+    text = metrics.render()
+
+    assert 'shamba_requests_total{endpoint="/predict",status="200"} 2' in text
+    assert 'shamba_request_duration_seconds_bucket{endpoint="/predict",status="200",le="0.0025"} 1' in text
+    assert 'shamba_request_duration_seconds_bucket{endpoint="/predict",status="200",le="+Inf"} 2' in text
+    assert 'shamba_request_duration_seconds_count{endpoint="/predict",status="200"} 2' in text
+    assert 'shamba_batch_size_bucket{endpoint="/predict/batch",le="50"} 1' in text
+
+
+def sample(text, series):
+    """Value of one series in /metrics text (0 if absent)"""
+    for line in text.splitlines():
+        if line.startswith(series + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_both_services_export_metrics():
+    # The services' metrics are shared with other test modules, so compare before and after
+    profile = main.DEMO_PROFILES["excellent_farmer"]
+    predicted = 'shamba_requests_total{endpoint="/predict",status="200"}'
+    unmatched = 'shamba_requests_total{endpoint="unmatched",status="404"}'
+    stages = [f'shamba_stage_duration_seconds_count{{stage="{stage}"}}' for stage in ("parse", "serialize")]
+    with TestClient(main.app) as client:
+        before = client.get('/metrics').text
+        client.post('/predict', json=profile)
+        client.get('/farmers/KE_1/nothing-here')
+        after = client.get('/metrics').text
+    assert sample(after, predicted) == sample(before, predicted) + 1
+    assert sample(after, unmatched) == sample(before, unmatched) + 1
+    for series in stages:
+        assert sample(after, series) > sample(before, series)
+
+    client = shamba_score_api.app.test_client()
+    batches = 'shamba_requests_total{endpoint="/api/batch-score",status="200"}'
+    two_farmers = 'shamba_batch_size_bucket{endpoint="/api/batch-score",le="2"}'
+    before = client.get('/metrics').text
+    client.post('/api/batch-score', json={"farmers": [{"farmer_id": "KE_1"}, {"farmer_id": "KE_2"}]})
+    response = client.get('/metrics')
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    assert sample(response.text, batches) == sample(before, batches) + 1
+    assert sample(response.text, two_farmers) == sample(before, two_farmers) + 1
@@ -0,0 +1,101 @@
+"""
+Checks for hot model reload (model_registry.py)
+"""
+
+import asyncio
+import itertools
+import os
+import shutil
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, 'api'))
+
+from inference_executor import InferenceExecutor, make_predict_fn
+from model_loader import artifact_paths, load_artifacts
+from model_registry import ModelRegistry, ServingModel
+
+
+class Executor:
+    """Stands in for InferenceExecutor; only shutdown matters here"""
+
+    def __init__(self):
+        self.closed = False
+
+    def shutdown(self):
+        self.closed = True
+
+
+def make_registry(warm_up=None):
+    """Registry over the real artifacts whose pipelines are stubs, one version per build"""
+    builds = itertools.count(1)
+    swapped = []
+
+    def build(artifacts):
+        core = SimpleNamespace(artifacts=artifacts, model=artifacts.model, scaler=artifacts.scaler,
+                               feature_names=artifacts.feature_names, version=f"v{next(builds)}",
+                               tree_engine=None, predict_scores=None, explainer=None)
+        return ServingModel(core, Executor())
+
+    registry = ModelRegistry(build, warm_up=warm_up, on_swap=swapped.append)
+    assert registry.load_sync()
+    return registry, swapped
+
+
+def test_reload_swaps_while_in_flight_requests_finish_on_their_version():
+    registry, swapped = make_registry()
+
+    async def run():
+        with registry.use() as old:
+            outcome = await registry.reload(force=True)
+            assert registry.current is not old and old.in_flight == 1
+            await asyncio.sleep(0.1)
+            assert not old.inference_executor.closed
+        await asyncio.gather(*registry._retiring)
+        return old, outcome
+
+    old, outcome = asyncio.run(run())
+    assert outcome["reloaded"] and (outcome["previous_version"], outcome["model_version"]) == ("v1", "v2")
+    assert [serving.version for serving in swapped] == ["v1", "v2"]
+    assert old.in_flight == 0 and old.inference_executor.closed
+    assert not registry.current.inference_executor.closed
+
+
+def test_failed_reload_keeps_the_old_model_and_closes_the_new_one():
+    candidates = []
+
+    async def warm_up(serving):
+        candidates.append(serving)
+        raise RuntimeError("warm-up failed")
+
+    registry, _ = make_registry(warm_up)
+    current = registry.current
+
+    with pytest.raises(RuntimeError, match="warm-up failed"):
+        asyncio.run(registry.reload(force=True))
+
+    assert registry.current is current and not current.inference_executor.closed
+    assert candidates[0].inference_executor.closed
+    assert registry.load_error is None and registry.reload_error == "warm-up failed"
+    assert registry.stats()["failed_reloads"] == 1
+
+
+def test_process_workers_serve_the_executor_artifacts_after_the_files_change(tmp_path):
+    for path in artifact_paths():
+        shutil.copy(path, tmp_path)
+    artifacts = load_artifacts(str(tmp_path))
+    X = np.tile(artifacts.scaler.mean_, (4, 1)) * np.linspace(0.5, 1.5, 4)[:, None]
+    expected = make_predict_fn(artifacts.model, artifacts.scaler)(X)
+
+    # The pool starts its worker on first use, after the directory has moved on
+    executor = InferenceExecutor(None, backend="process", workers=1, artifacts=artifacts)
+    for path in artifact_paths(str(tmp_path)):
+        os.remove(path)
+    try:
+        np.testing.assert_array_equal(executor.predict_sync(X), expected)
+    finally:
+        executor.shutdown()
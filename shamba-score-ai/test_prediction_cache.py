@@ -0,0 +1,54 @@
+"""
+Checks for the /predict prediction cache (prediction_cache.py)
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, 'api'))
+
+import prediction_cache
+from prediction_cache import PredictionCache
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    clock = SimpleNamespace(now=100.0)
+    monkeypatch.setattr(prediction_cache, 'time', SimpleNamespace(monotonic=lambda: clock.now))
+    cache = PredictionCache(max_size=10, ttl=30)
+    key = cache.key([0.5, 1.0])
+    cache.put(key, "scored")
+
+    clock.now += 29.9
+    assert cache.get(key) == "scored"
+    clock.now += 0.1
+    assert cache.get(key) is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"], stats["size"]) == (1, 1, 1, 0)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PredictionCache(max_size=2)
+    a, b, c = (cache.key([value]) for value in (1.0, 2.0, 3.0))
+    cache.put(a, "a")
+    cache.put(b, "b")
+    assert cache.get(a) == "a"
+
+    cache.put(c, "c")
+    assert cache.get(b) is None
+    assert (cache.get(a), cache.get(c)) == ("a", "c")
+    assert cache.stats()["evictions"] == 1
+
+
+def test_keys_depend_on_model_version_and_a_new_version_empties_the_cache():
+    cache = PredictionCache(model_version="v1")
+    key = cache.key([4, -0.0])
+    assert key == cache.key([4.0, 0.0])
+    cache.put(key, "v1 score")
+
+    cache.set_model_version("v2")
+    assert cache.key([4, -0.0]) != key
+    assert cache.get(key) is None
+    assert cache.stats()["size"] == 0 and cache.stats()["invalidations"] == 1
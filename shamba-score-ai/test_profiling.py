@@ -0,0 +1,62 @@
+"""
+Checks for request profiling and slow-request capture (profiling.py)
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, 'api'))
+
+from metrics import ServiceMetrics
+from profiling import ASGIRequestProfiler, RequestProfiler, activate, deactivate
+
+
+def test_only_slow_requests_are_kept_with_their_stages_and_sanitized_inputs():
+    metrics = ServiceMetrics("test")
+    profiler = RequestProfiler(slow_threshold=0.01)
+    profiler.attach(metrics)
+    parse = metrics.stage("parse")
+
+    for seconds in (0.0, 0.02):
+        profile = profiler.begin()
+        token = activate(profile)
+        parse.observe(0.001)
+        profile.set_inputs([{"farmer_id": "KE_1", "name": "Jane", "savings_rate": 0.3}], ["savings_rate"])
+        time.sleep(seconds)
+        deactivate(token)
+        profiler.finish(profile, "POST", "/api/score", 200)
+    parse.observe(0.001)
+
+    snapshot = profiler.snapshot()
+    assert snapshot["profiles"] == [] and len(snapshot["slow_requests"]) == 1
+    entry = snapshot["slow_requests"][0]
+    assert entry["reasons"] == ["slow"] and entry["stages_ms"] == {"parse": 1.0}
+    assert entry["inputs"] == {"records": 1, "sample": [{"savings_rate": 0.3}]}
+    assert metrics.stage_seconds.labels("parse").snapshot()[0][-1] == 0
+    assert sum(metrics.stage_seconds.labels("parse").snapshot()[0]) == 3
+
+
+def test_middleware_profiles_requests_asking_for_it():
+    profiler = RequestProfiler(honor_header=True)
+    sent = []
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    async def send(message):
+        sent.append(message)
+
+    async def request(headers):
+        scope = {"type": "http", "method": "POST", "headers": headers}
+        await ASGIRequestProfiler(app, profiler)(scope, None, send)
+
+    asyncio.run(request([]))
+    asyncio.run(request([(b"x-shamba-profile", b"1")]))
+
+    headers = [dict(message["headers"]) for message in sent if message["type"] == "http.response.start"]
+    assert b"server-timing" not in headers[0] and headers[1][b"server-timing"].startswith(b"total;dur=")
+    assert [entry["reasons"] for entry in profiler.snapshot()["profiles"]] == [["requested"]]
@@ -0,0 +1,70 @@
+"""
+Checks for the SQLite score-history store
+"""
+
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, 'api'))
+os.environ.setdefault('SHAMBA_AUDIT_LOG', '0')
+
+from score_store import MAX_IDS_PER_QUERY, ScoreStore
+
+
+def test_history_and_latest(tmp_path):
+    store = ScoreStore(str(tmp_path / 'scores.sqlite3'))
+    store.add_many([
+        {"farmer_id": f"KE_{i % 1000:06d}", "scored_at": f"2026-01-{1 + i // 1000:02d}T00:00:00",
+         "credit_score": float(i), "risk_category": "Fair", "model_version": "v1",
+         "features": {"mean_ndvi": 0.5}}
+        for i in range(3000)
+    ])
+    store.add({"farmer_id": "KE_000007", "scored_at": "2026-01-02T12:00:00", "credit_score": 99.0})
+    store.flush()
+
+    history = store.history("KE_000007")
+    assert [r["credit_score"] for r in history] == [2007.0, 99.0, 1007.0, 7.0]
+    assert history[-1]["features"] == {"mean_ndvi": 0.5}
+    assert [r["credit_score"] for r in store.history("KE_000007", since="2026-01-02T06:00:00")] == [2007.0, 99.0]
+
+    ids = [f"KE_{i:06d}" for i in range(MAX_IDS_PER_QUERY + 50)] + ["missing"]
+    latest = store.latest(ids)
+    assert latest["missing"] is None
+    assert latest["KE_000123"]["credit_score"] == 2123.0
+    assert sum(r is not None for r in latest.values()) == 950
+    assert store.stats()["written"] == 3001
+
+
+def test_queue_bound_counts_rows_not_batches(tmp_path):
+    store = ScoreStore(str(tmp_path / 'scores.sqlite3'), batch_size=50, max_queue=100)
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1.0)  # keep the writer from draining mid-call
+    try:
+        accepted = store.add_many([{"farmer_id": f"KE_{i}", "credit_score": 50.0} for i in range(1000)])
+        assert store.stats()["queue_depth"] <= 100
+    finally:
+        sys.setswitchinterval(interval)
+    store.flush()
+
+    stats = store.stats()
+    assert not accepted and stats["written"] + stats["dropped"] == 1000 and stats["dropped"] > 0
+    assert stats["queue_depth"] == 0
+
+
+def test_service_opens_the_store_at_startup_not_import(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+    import main
+
+    db = tmp_path / 'scores.sqlite3'
+    monkeypatch.setenv('SHAMBA_SCORE_STORE', '1')
+    monkeypatch.setenv('SHAMBA_SCORE_DB', str(db))
+    assert main.score_store is None
+
+    with TestClient(main.app) as client:
+        assert db.exists()
+        client.post('/predict', json={**main.DEMO_PROFILES["excellent_farmer"], "farmer_id": "KE_1"})
+    assert main.score_store is None
+
+    history = ScoreStore(str(db)).history("KE_1")
+    assert len(history) == 1 and history[0]["source"] == "/predict"
@@ -0,0 +1,112 @@
+"""
+Parity and latency checks for the NumPy tree ensemble and TreeSHAP explainer
+"""
+
+import json
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, 'api'))
+
+from explain import TreeShapExplainer, XGBoostContribExplainer
+from tree_engine import TreeEnsemble
+
+MODELS_DIR = os.path.join(BASE_DIR, 'models')
+DATA_FILE = os.path.join(BASE_DIR, 'data', 'farmers_training_data.csv')
+
+
+def load_artifacts():
+    """Load model, scaler and the training features"""
+    model = joblib.load(os.path.join(MODELS_DIR, 'shamba_score_model.pkl'))
+    scaler = joblib.load(os.path.join(MODELS_DIR, 'scaler.pkl'))
+    with open(os.path.join(MODELS_DIR, 'feature_names.json'), 'r') as f:
+        feature_names = json.load(f)
+    X = pd.read_csv(DATA_FILE)[feature_names].to_numpy(dtype=float)
+    return model, scaler, X
+
+
+def test_parity_with_xgboost():
+    """NumPy ensemble matches model.predict on the training data"""
+    model, scaler, X = load_artifacts()
+    engine = TreeEnsemble.from_xgboost(model, scaler)
+
+    expected = model.predict(scaler.transform(X))
+    np.testing.assert_allclose(engine.predict(X), expected, atol=1e-3)
+
+    # Single rows take the same path as batches
+    for row in X[:20]:
+        expected_row = model.predict(scaler.transform(row.reshape(1, -1)))[0]
+        assert abs(engine.predict(row)[0] - expected_row) < 1e-3
+
+
+def test_parity_with_missing_values():
+    """Missing values follow XGBoost's default directions"""
+    model, scaler, X = load_artifacts()
+    engine = TreeEnsemble.from_xgboost(model, scaler)
+
+    X = X.copy()
+    X[::7, 2] = np.nan
+    X[::5, 6] = np.nan
+
+    expected = model.predict(scaler.transform(X))
+    np.testing.assert_allclose(engine.predict(X), expected, atol=1e-3)
+
+
+def test_tree_shap_matches_pred_contribs():
+    """Tabulated TreeSHAP matches XGBoost's pred_contribs, with and without NaNs"""
+    model, scaler, X = load_artifacts()
+    with open(os.path.join(MODELS_DIR, 'feature_names.json'), 'r') as f:
+        feature_names = json.load(f)
+    explainer = TreeShapExplainer(TreeEnsemble.from_xgboost(model, scaler), feature_names)
+    reference = XGBoostContribExplainer(model, scaler, feature_names)
+
+    X = X[:500].copy()
+    X_missing = X.copy()
+    X_missing[::3, 0] = np.nan
+    X_missing[::4, 9] = np.nan
+
+    for batch in (X, X_missing):
+        contributions = explainer.shap_values(batch)
+        np.testing.assert_allclose(contributions, reference.shap_values(batch), atol=1e-3)
+        # Local accuracy: contributions add up to the prediction
+        np.testing.assert_allclose(
+            contributions.sum(axis=1) + explainer.expected_value,
+            model.predict(scaler.transform(batch)),
+            atol=1e-3
+        )
+
+
+def compare_latency(batch_sizes=(1, 10, 100, 1000, 10000), repeats=200):
+    """Print per-call latency of model.predict vs the NumPy ensemble"""
+    model, scaler, X = load_artifacts()
+    engine = TreeEnsemble.from_xgboost(model, scaler)
+
+    print(f"{'batch':>8} {'xgboost (ms)':>14} {'numpy (ms)':>12} {'speedup':>9}")
+    for n in batch_sizes:
+        X_batch = np.resize(X, (n, X.shape[1]))
+        runs = max(1, repeats // max(1, n // 100))
+        timings = {}
+        for name, fn in [
+            ('xgboost', lambda: model.predict(scaler.transform(X_batch))),
+            ('numpy', lambda: engine.predict(X_batch))
+        ]:
+            fn()
+            start = time.perf_counter()
+            for _ in range(runs):
+                fn()
+            timings[name] = (time.perf_counter() - start) / runs * 1000
+        print(f"{n:>8} {timings['xgboost']:>14.3f} {timings['numpy']:>12.3f} "
+              f"{timings['xgboost'] / timings['numpy']:>8.1f}x")
+
+
+if __name__ == "__main__":
+    test_parity_with_xgboost()
+    test_parity_with_missing_values()
+    print("✅ NumPy ensemble matches model.predict")
+    compare_latency()
@@ -0,0 +1,106 @@
+"""
+Parity checks for the array versions of the utils scoring helpers
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, 'api'))
+
+from utils import (
+    calculate_confidence_score,
+    calculate_confidence_scores,
+    calculate_feature_contributions,
+    calculate_feature_contributions_batch,
+    calculate_risk_categories,
+    calculate_risk_category,
+    generate_improvement_suggestions,
+    generate_improvement_suggestions_batch,
+    feature_validation_errors,
+    validate_feature_matrix,
+    validate_feature_ranges
+)
+
+DATA_FILE = os.path.join(BASE_DIR, 'data', 'farmers_training_data.csv')
+FEATURE_NAMES_FILE = os.path.join(BASE_DIR, 'models', 'feature_names.json')
+
+
+def load_rows(n=5000, seed=0):
+    """Training rows plus scores, with some values snapped onto rule thresholds and ties"""
+    with open(FEATURE_NAMES_FILE, 'r') as f:
+        feature_names = json.load(f)
+    data = pd.read_csv(DATA_FILE)
+    rng = np.random.default_rng(seed)
+    X = data[feature_names].to_numpy(dtype=float)[rng.integers(0, len(data), n)]
+
+    # Exact rule thresholds and equal contributions exercise the boundaries
+    for name, value in (("savings_rate", 0.2), ("cooperative_endorsement", 4),
+                        ("loan_repayment_history", 0.8), ("mean_ndvi", 0.5),
+                        ("chama_participation", 0), ("advisory_usage", 0)):
+        X[rng.random(n) < 0.2, feature_names.index(name)] = value
+    tie = rng.random(n) < 0.2
+    X[tie, feature_names.index("transaction_velocity")] = X[tie, feature_names.index("fertilizer_purchase_timing")]
+
+    scores = np.round(rng.uniform(0, 100, n), 1)
+    scores[:30] = [80, 60, 85, 75, 65, 55, 45, 35, 79.9, 59.9] * 3
+    return X, feature_names, scores
+
+
+def test_risk_categories_match_scalar():
+    _, _, scores = load_rows()
+    columns = calculate_risk_categories(scores)
+    for i, score in enumerate(scores):
+        assert tuple(c[i] for c in columns) == calculate_risk_category(score)
+
+
+def test_nan_score_is_banded_in_the_lowest_tier():
+    scores = np.array([np.nan, 90.0, np.nan])
+    categories, loan_amounts, _, _ = calculate_risk_categories(scores)
+    assert list(categories) == ["High Risk", "Excellent", "High Risk"]
+    assert loan_amounts[0] == 10000
+    assert calculate_risk_category(float("nan"))[0] == "High Risk"
+
+
+def test_contributions_match_scalar():
+    X, feature_names, _ = load_rows()
+    with pytest.deprecated_call():
+        batch = calculate_feature_contributions_batch(X, feature_names)
+    with pytest.deprecated_call():
+        for row, result in zip(X.tolist(), batch):
+            assert result == calculate_feature_contributions(dict(zip(feature_names, row)))
+
+
+def test_suggestions_match_scalar():
+    X, feature_names, scores = load_rows()
+    batch = generate_improvement_suggestions_batch(X, feature_names, scores)
+    for row, score, result in zip(X.tolist(), scores.tolist(), batch):
+        assert list(result) == generate_improvement_suggestions(dict(zip(feature_names, row)), score)
+
+
+def test_validation_and_confidence_match_scalar():
+    X, feature_names, _ = load_rows()
+    rng = np.random.default_rng(1)
+    # Out-of-range, boundary and missing values
+    X[rng.random(X.shape) < 0.02] = np.nan
+    X[rng.random(X.shape) < 0.02] *= -3
+    X[:50, feature_names.index("mean_ndvi")] = np.linspace(0, 1, 50)
+    # Whole-number out-of-range values, as a JSON request would send them
+    X[50:60, feature_names.index("cooperative_endorsement")] = 250
+
+    mask = validate_feature_matrix(X, feature_names)
+    errors = feature_validation_errors(X, feature_names, mask)
+    confidence = calculate_confidence_scores(X, feature_names)
+    assert 0 < len(errors) < len(X)
+
+    for i, row in enumerate(X.tolist()):
+        features = dict(zip(feature_names, row))
+        # Messages must read the same as for the request's own ints and floats
+        request = {name: int(v) if float(v).is_integer() else v for name, v in features.items()}
+        assert errors.get(i, {}) == validate_feature_ranges(request)
+        assert confidence[i] == calculate_confidence_score(features)